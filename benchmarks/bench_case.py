@@ -0,0 +1,50 @@
+"""
+Benchmark for reading an OpenFOAM case in parallel.
+
+Writes a case with a number of time directories, each holding an ASCII
+scalar field and a binary vector field from the test data, and reads all of
+them with an increasing number of worker processes. Run from the repository
+root::
+
+    python -m benchmarks.bench_case [n_times]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from byteparsing.foam_case import FoamCase
+
+
+def make_case(path: Path, n_times: int):
+    data = Path("tests") / "data"
+    for i in range(n_times):
+        directory = path / str(i)
+        directory.mkdir()
+        shutil.copy(data / "ascii_vector", directory / "U_ascii")
+        shutil.copy(data / "binary_vector", directory / "U")
+
+
+def main():
+    n_times = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    cores = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        make_case(path, n_times)
+        print(f"{n_times} time directories, {cores} cores")
+        workers = 1
+        while workers <= cores:
+            for sidecar in path.glob("*/*.index"):
+                sidecar.unlink()
+            t0 = time.perf_counter()
+            FoamCase(path, workers=workers).read()
+            elapsed = time.perf_counter() - t0
+            print(f"{workers:>4} workers: {elapsed:.2f} s")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
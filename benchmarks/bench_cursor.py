@@ -0,0 +1,79 @@
+"""
+Allocation benchmark for cursors.
+
+Reports the memory taken by a single `Cursor`, and the number and total size
+of the allocations made while parsing a token-dense input, measured with
+`tracemalloc`. Run from the repository root::
+
+    python -m benchmarks.bench_cursor
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from byteparsing.cursor import Cursor
+from byteparsing.parsers import parse_bytes, many, tokenize, scientific_number
+
+
+def cursor_size() -> int:
+    """Size of a cursor in bytes, including its instance dictionary if it
+    has one."""
+    c = Cursor(b"", 0, 0)
+    size = sys.getsizeof(c)
+    if hasattr(c, "__dict__"):
+        size += sys.getsizeof(c.__dict__)
+    return size
+
+
+def increments(n: int):
+    """Allocations (count, bytes) for keeping `n` cursors alive."""
+    data = b"x" * n
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    c = Cursor.from_bytes(data)
+    cursors = []
+    for _ in range(n):
+        c = c.increment()
+        cursors.append(c)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return _difference(before, after)
+
+
+def parse_allocations(data: bytes):
+    """Peak memory and wall time for parsing a list of numbers."""
+    p = many(tokenize(scientific_number))
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    parse_bytes(p, data)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def _difference(before, after):
+    cursor_file = Cursor.__module__.replace(".", "/")
+    stats = [s for s in after.compare_to(before, "filename")
+             if cursor_file in s.traceback[0].filename]
+    return sum(s.count_diff for s in stats), sum(s.size_diff for s in stats)
+
+
+def main():
+    random.seed(0)
+    n = 100000
+    data = b" ".join(b"%g" % random.gauss(0, 1) for _ in range(n))
+
+    print(f"cursor size:            {cursor_size()} bytes")
+    count, size = increments(n)
+    print(f"{n} cursors:        {count} allocations, "
+          f"{size / n:.1f} bytes each")
+    peak, elapsed = parse_allocations(data)
+    print(f"parse {len(data) / 1e6:.2f} MB:         peak {peak / 1e6:.2f} MB, "
+          f"{elapsed:.2f} s (traced)")
+
+
+if __name__ == "__main__":
+    main()
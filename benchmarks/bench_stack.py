@@ -0,0 +1,49 @@
+"""
+Benchmark for the auxiliary stack.
+
+Parses a token-dense input with a grammar that pushes a value before every
+number and pops it afterwards, once with the auxiliary stack as a `list`
+and once as a persistent `Stack`. The parse starts with `depth` values
+already on the stack, as happens inside nested lists and below a config.
+Run from the repository root::
+
+    python -m benchmarks.bench_stack
+"""
+
+import random
+import time
+
+from byteparsing.cursor import Cursor
+from byteparsing.parsers import (
+    many, tokenize, scientific_number, sequence, keep_left, push, pop)
+from byteparsing.stack import Stack
+
+
+def best_time(p, data: bytes, aux, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        p(Cursor.from_bytes(data), aux).invoke()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    random.seed(0)
+    n = 20000
+    data = b" ".join(b"%g" % random.gauss(0, 1) for _ in range(n))
+    p = many(keep_left(
+        sequence(push(0), tokenize(scientific_number)), pop()))
+    mb = len(data) / 1e6
+
+    print(f"{n} tokens, {mb:.2f} MB")
+    print(f"{'depth':>8} {'list MB/s':>10} {'Stack MB/s':>11}")
+    for depth in (1, 100, 10000):
+        base = [{}] + list(range(depth - 1))
+        t_list = best_time(p, data, base)
+        t_stack = best_time(p, data, Stack(base))
+        print(f"{depth:>8} {mb / t_list:>10.3f} {mb / t_stack:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Benchmark suite for throughput and memory use.
+
+Generates synthetic inputs of given sizes: OpenFOAM fields in ASCII and
+binary (scalar, vector and symmTensor), files of nested dictionaries, and
+PPM images. Every input is parsed with its grammar in a fresh process,
+reporting the throughput (best of a few runs), the peak of memory allocated
+by Python (measured with `tracemalloc` in a separate run) and the increase
+of the peak resident set size. Run from the repository root::
+
+    python -m benchmarks.bench_suite --sizes 1K,1M,16M
+    python -m benchmarks.bench_suite --save baseline.json
+    python -m benchmarks.bench_suite --baseline baseline.json --threshold 0.2
+
+With `--baseline`, the script exits with status 1 if the throughput of any
+case dropped, or its memory use rose, by more than the threshold (a
+fraction) compared to the baseline. Sizes go up to `1G`; the inputs are
+written in chunks, so generating them takes little memory.
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+import numpy as np
+
+from byteparsing.files import map_file
+from byteparsing.foam_writer import ChunkedList, write_foam_file
+from byteparsing.openfoam import foam_file, lazy_foam_file
+from byteparsing.parsers import (
+    parse_bytes, text_literal, named_sequence, sequence, tokenize, integer,
+    optional, text_end_by, fmap, Parser)
+from byteparsing.array import array
+
+UNITS = {"K": 2**10, "M": 2**20, "G": 2**30}
+COMPONENTS = {"scalar": 1, "vector": 3, "symmTensor": 6}
+
+
+def parse_size(s: str) -> int:
+    if s[-1].upper() in UNITS:
+        return int(float(s[:-1]) * UNITS[s[-1].upper()])
+    return int(s)
+
+
+# ~~~ generators ~~~
+
+def foam_header(format: str, cls: str = "dictionary") -> Dict:
+    return {"name": "FoamFile", "content": {
+        "version": 2.0, "format": format, "class": cls,
+        "arch": "LSB;label=32;scalar=64", "object": "bench"}}
+
+
+def random_blocks(n: int, components: int, block: int = 2**16) \
+        -> Iterator[np.ndarray]:
+    rng = np.random.default_rng(0)
+    for i in range(0, n, block):
+        shape = (min(block, n - i),) + ((components,) if components > 1
+                                        else ())
+        yield rng.standard_normal(shape)
+
+
+def write_field(path: Path, size: int, kind: str, format: str):
+    """Write a field of about `size` bytes."""
+    n = COMPONENTS[kind]
+    per_cell = 8 * n if format == "binary" else 21 * n + 2
+    cells = max(1, size // per_cell)
+    content = {
+        "preamble": foam_header(format, "volField"),
+        "data": {
+            "dimensions": [0, 1, -1, 0, 0, 0, 0],
+            "internalField": ChunkedList(cells, random_blocks(cells, n),
+                                         kind),
+            "boundaryField": {"wall": {"type": "zeroGradient"}}}}
+    write_foam_file(path, content)
+
+
+def write_dictionaries(path: Path, size: int):
+    """Write about `size` bytes of nested dictionaries."""
+    rng = random.Random(0)
+
+    def entry(depth: int) -> str:
+        if depth < 3 and rng.random() < 0.3:
+            n = rng.randint(1, 4)
+            body = "".join(entry(depth + 1) for _ in range(n))
+            return f"d{rng.randint(0, 99)}\n{{\n{body}}}\n"
+        key = f"k{rng.randint(0, 999)}"
+        return rng.choice([
+            f"{key} {rng.random()!r};\n",
+            f"{key} ({rng.random()!r} {rng.random()!r} {rng.random()!r});\n",
+            f"{key} word;\n",
+            f"{key} uniform {rng.randint(0, 9)};\n"])
+
+    with open(path, "wb") as f:
+        f.write(b"FoamFile\n{\n    version 2.0;\n    format ascii;\n"
+                b"    class dictionary;\n}\n")
+        written = 0
+        while written < size:
+            chunk = f"top{written}\n{{\n{entry(1)}}}\n"
+            written += f.write(chunk.encode())
+
+
+def write_ppm(path: Path, size: int):
+    """Write a PPM image of about `size` bytes."""
+    width = max(1, int((size / 3) ** 0.5))
+    with open(path, "wb") as f:
+        f.write(b"P6 # benchmark\n%d %d\n255\n" % (width, width))
+        rng = np.random.default_rng(0)
+        for _ in range(width):
+            f.write(rng.integers(0, 256, width * 3, dtype=np.uint8).data)
+
+
+ppm_comment = sequence(text_literal("#"), text_end_by("\n"))
+
+
+def ppm_image_bytes(header: Dict) -> Parser:
+    shape = (header["height"], header["width"], 3)
+    return array(np.dtype(np.uint8), int(np.prod(shape))) \
+        >> fmap(lambda a: a.reshape(shape))
+
+
+ppm_image = named_sequence(
+    _1=tokenize(text_literal("P6")),
+    _2=optional(tokenize(ppm_comment)),
+    width=tokenize(integer),
+    height=tokenize(integer),
+    maxint=tokenize(integer)) >> ppm_image_bytes
+
+
+@dataclass
+class Case:
+    name: str
+    write: Callable[[Path, int], None]
+    grammar: str
+
+
+GRAMMARS = {
+    "foam_file": foam_file, "lazy_foam_file": lazy_foam_file,
+    "ppm_image": ppm_image}
+
+CASES: List[Case] = [
+    Case(f"{format}_{kind}",
+         lambda p, s, k=kind, f=format: write_field(p, s, k, f),
+         "foam_file")
+    for format in ["ascii", "binary"] for kind in COMPONENTS] + [
+    Case("binary_vector_lazy",
+         lambda p, s: write_field(p, s, "vector", "binary"),
+         "lazy_foam_file"),
+    Case("dictionaries", write_dictionaries, "foam_file"),
+    Case("ppm", write_ppm, "ppm_image")]
+
+
+# ~~~ measurement ~~~
+
+@dataclass
+class Result:
+    case: str
+    size: int
+    mb_per_s: float
+    alloc_peak: int
+    rss_peak: int
+
+
+def measure(path: str, grammar: str, repeat: int) -> Dict[str, float]:
+    """Runs in a fresh process."""
+    p = GRAMMARS[grammar]
+    data = map_file(path)
+    size = len(data)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        parse_bytes(p, data)
+        best = min(best, time.perf_counter() - t0)
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss \
+        - rss_before
+    tracemalloc.start()
+    parse_bytes(p, data)
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"mb_per_s": size / best / 1e6, "alloc_peak": alloc_peak,
+            "rss_peak": rss_peak * 1024, "size": size}
+
+
+def run(cases: List[Case], sizes: List[int], repeat: int,
+        directory: Path) -> List[Result]:
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for case in cases:
+        for size in sizes:
+            path = directory / f"{case.name}_{size}"
+            case.write(path, size)
+            with context.Pool(1) as pool:
+                m = pool.apply(measure, (str(path), case.grammar, repeat))
+            path.unlink()
+            result = Result(case.name, size, m["mb_per_s"],
+                            m["alloc_peak"], m["rss_peak"])
+            print(f"{case.name:<20} {format_size(m['size']):>8}"
+                  f" {result.mb_per_s:>10.2f} MB/s"
+                  f" {format_size(result.alloc_peak):>10} alloc"
+                  f" {format_size(result.rss_peak):>10} RSS", flush=True)
+            results.append(result)
+    return results
+
+
+def format_size(n: float) -> str:
+    for unit in ["", "K", "M", "G"]:
+        if abs(n) < 1024:
+            return f"{n:.0f}{unit}"
+        n /= 1024
+    return f"{n:.0f}T"
+
+
+def compare(results: List[Result], baseline: Dict, threshold: float) \
+        -> List[str]:
+    """Lists the regressions beyond `threshold` with respect to the
+    `baseline`."""
+    old = {(r["case"], r["size"]): r for r in baseline["results"]}
+    problems = []
+    for r in results:
+        b = old.get((r.case, r.size))
+        if b is None:
+            continue
+        if r.mb_per_s < b["mb_per_s"] * (1 - threshold):
+            problems.append(
+                f"{r.case} {format_size(r.size)}: {r.mb_per_s:.2f} MB/s, "
+                f"baseline {b['mb_per_s']:.2f} MB/s")
+        for key in ["alloc_peak", "rss_peak"]:
+            # ignore differences below a megabyte; these are noise
+            if getattr(r, key) > max(b[key] * (1 + threshold),
+                                     b[key] + 2**20):
+                problems.append(
+                    f"{r.case} {format_size(r.size)}: {key} "
+                    f"{format_size(getattr(r, key))}, "
+                    f"baseline {format_size(b[key])}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", default="1K,1M,16M",
+                        help="comma separated input sizes, like 1K,1M,1G")
+    parser.add_argument("--cases", default=None,
+                        help="comma separated case names (default all)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", type=Path,
+                        help="store the results as a baseline")
+    parser.add_argument("--baseline", type=Path,
+                        help="compare with a stored baseline")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    cases = CASES if args.cases is None else \
+        [c for c in CASES if c.name in args.cases.split(",")]
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run(cases, sizes, args.repeat, Path(tmp))
+
+    if args.save:
+        args.save.write_text(json.dumps(
+            {"python": sys.version, "results": [asdict(r) for r in results]},
+            indent=2))
+    if args.baseline:
+        problems = compare(
+            results, json.loads(args.baseline.read_text()), args.threshold)
+        for p in problems:
+            print("REGRESSION:", p)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
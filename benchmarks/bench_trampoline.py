@@ -0,0 +1,75 @@
+"""
+Benchmark for the parser trampoline.
+
+Measures the throughput of a grammar that consists mostly of nested
+combinators, and the deepest nesting of a recursive grammar that can be
+parsed without running out of Python stack. Run from the repository root::
+
+    python -m benchmarks.bench_trampoline
+"""
+
+import random
+import sys
+import time
+
+from byteparsing.parsers import (
+    parse_bytes, sequence, choice, char, many, value, tokenize, integer,
+    push, pop, flush)
+from byteparsing.trampoline import Parser
+
+
+def nested_parens() -> Parser:
+    nested = Parser(None)
+    nested.func = choice(
+        sequence(char('('), nested, char(')')),
+        value(0)).func
+    return sequence(nested, flush(len))
+
+
+def token_list() -> Parser:
+    item = Parser(None)
+    group = sequence(
+        tokenize(char('(')), many(item) >> push, tokenize(char(')')), pop())
+    item.func = choice(tokenize(integer), group).func
+    return many(item)
+
+
+def throughput(p: Parser, data: bytes, repeat: int = 3) -> float:
+    """Returns the best throughput in MB/s."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        parse_bytes(p, data)
+        best = min(best, time.perf_counter() - t0)
+    return len(data) / best / 1e6
+
+
+def max_depth(p: Parser, limit: int = 10**6) -> int:
+    """Returns the largest power of ten up to `limit` for which the nested
+    input can be parsed."""
+    depth, n = 0, 10
+    while n <= limit:
+        try:
+            parse_bytes(p, b"(" * n + b")" * n)
+        except RecursionError:
+            break
+        depth, n = n, n * 10
+    return depth
+
+
+def main():
+    random.seed(0)
+    groups = (b"(" + b" ".join(b"%d" % random.randint(-999, 999)
+                               for _ in range(8)) + b") "
+              for _ in range(2000))
+    data = b"".join(groups)
+    print(f"recursion limit:   {sys.getrecursionlimit()}")
+    print(f"token throughput:  {throughput(token_list(), data):.3f} MB/s")
+    if hasattr(Parser, "compile"):
+        compiled = token_list().compile()
+        print(f"  compiled:        {throughput(compiled, data):.3f} MB/s")
+    print(f"nesting depth:     {max_depth(nested_parens())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,14 @@ import logging
 
 from .__version__ import __version__  # noqa
 from .cursor import Cursor
+from .memo import Memo
+from .stack import Stack
 from .trampoline import (Parser, parser)
 from .parsers import (
     parse_bytes, sequence, push, pop, char,
     flush, flush_decode,
     many_char, many_char_0, some_char, some_char_0,
-    ascii_alpha, fail
+    ascii_alpha, fail, memoize
     )
 
 try:
@@ -25,4 +27,4 @@ __all__ = ["Cursor", "parse_bytes", "sequence", "push", "pop",
            "flush", "flush_decode", "many_char", "many_char_0",
            "some_char", "some_char_0",
            "char", "ascii_alpha", "foam_file",
-           "Parser", "parser"]
+           "Parser", "parser", "Memo", "memoize", "Stack"]
@@ -1,9 +1,9 @@
 import numpy as np
-from typing import Any
+from typing import Any, Optional, Tuple
 
 from .cursor import Cursor
 from .failure import Failure
-from .trampoline import Parser, parser
+from .trampoline import Parser, parser, leaf_function
 from .parsers import fmap
 
 
@@ -12,16 +12,98 @@ def array(dtype: np.dtype, size: int) -> Parser:
     cursor and interprets them as numeric binary data."""
     @parser
     def array_p(c: Cursor, a: Any):
+        c.require(size * dtype.itemsize)
         try:
             result = np.frombuffer(c.data, dtype=dtype, count=size,
                                    offset=c.end)
         except ValueError as e:
-            raise Failure(str(e))
+            return Failure(str(e))
+        if c.volatile:
+            result = result.copy()
         return result, c.increment(result.nbytes), a
 
     return array_p
 
 
+class LazyArray:
+    """Handle to binary data of the given `dtype` and `shape`, starting at
+    `offset` in `buffer`. The data is only wrapped in a numpy array when it
+    is first accessed, either by `load` or by passing the handle to a numpy
+    function (through `__array__`)."""
+    __slots__ = ("buffer", "offset", "dtype", "shape", "_array")
+
+    def __init__(self, buffer: Any, offset: int, dtype: np.dtype,
+                 shape: Tuple[int, ...]):
+        self.buffer = buffer
+        self.offset = offset
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        self._array: Optional[np.ndarray] = None
+
+    @property
+    def count(self) -> int:
+        """Number of items."""
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self) -> int:
+        return self.count * self.dtype.itemsize
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    def load(self) -> np.ndarray:
+        """Returns the data as a numpy array."""
+        if self._array is None:
+            self._array = np.frombuffer(
+                self.buffer, dtype=self.dtype, count=self.count,
+                offset=self.offset).reshape(self.shape)
+        return self._array
+
+    def __array__(self, dtype=None, copy=None):
+        result = self.load()
+        if dtype is not None:
+            result = result.astype(dtype)
+        return result.copy() if copy else result
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        return self.load()[index]
+
+    def __repr__(self):
+        return f"LazyArray(offset={self.offset}, dtype={self.dtype}, " \
+               f"shape={self.shape})"
+
+
+def lazy_array(dtype: np.dtype, shape: Tuple[int, ...]) -> Parser:
+    """Skips over binary data of the given `dtype` and `shape`, returning a
+    `LazyArray` handle to it. If the cursor is volatile (see
+    :py:mod:`byteparsing.stream`), the data is read right away."""
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape))
+    nbytes = count * dtype.itemsize
+    eager = array(dtype, count)
+
+    @parser
+    def lazy_array_p(c: Cursor, a: Any):
+        if c.volatile:
+            r = leaf_function(eager)(c, a)
+            if isinstance(r, Failure):
+                return r
+            x, c, a = r
+            return x.reshape(shape), c, a
+        if not c.require(nbytes):
+            return Failure(
+                f"Expected {nbytes} bytes of binary data, got "
+                f"{len(c.data) - c.end}.")
+        return LazyArray(c.data, c.end, dtype, shape), c.increment(nbytes), a
+
+    return lazy_array_p
+
+
 def binary_value(dtype: np.dtype):
     """Parses a single binary value of the given `dtype`."""
     return array(dtype, 1) >> fmap(lambda x: x[0])
@@ -0,0 +1,235 @@
+"""
+Batch parsing
+=============
+
+Parsing thousands of small files one by one leaves most cores idle.
+`parse_files` parses many files with the same grammar in a pool of worker
+processes (or threads)::
+
+    >>> for r in parse_files(ppm_image, paths, workers=8):
+    ...     if r.error is not None:
+    ...         print(f"{r.path}: {r.error}")
+    ...     else:
+    ...         process(r.value)
+
+Each worker maps its file into memory and parses it. Results come back in
+the order of `paths`, or as soon as they are ready with `ordered=False`. A
+file that fails to parse, or can't be read, gives a result with the `error`
+set, and the batch continues.
+
+Process workers don't pickle large numpy arrays in their results. Instead,
+the worker writes the array to a temporary file in shared memory
+(`/dev/shm` where available), and the main process maps that file and
+removes it immediately, so the array costs a single copy.
+
+Parsers often contain lambdas, so they can't be pickled. On platforms that
+support it, process workers are started with `fork` and inherit the parser.
+Elsewhere, pass the parser as a string `"module:name"` that the workers
+import.
+"""
+
+from __future__ import annotations
+
+import importlib
+import itertools
+import mmap
+import multiprocessing
+import os
+import pickle
+import tempfile
+from collections import deque
+from concurrent.futures import (
+    Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+    FIRST_COMPLETED)
+from dataclasses import dataclass
+from typing import (
+    Any, Callable, Deque, Iterable, Iterator, Optional, Tuple, Union)
+
+from .failure import Failure
+from .files import PathLike, map_file
+from .parsers import parse_bytes
+from .trampoline import Parser
+
+try:
+    import numpy as np
+    from .array import LazyArray
+except ImportError:
+    np = None  # type: ignore
+
+MIN_SHARED = 2**16
+"""Arrays smaller than this many bytes are pickled."""
+
+
+def make_executor(executor: str, workers: Optional[int],
+                  initializer: Optional[Callable] = None,
+                  initargs: Tuple = ()) -> Executor:
+    """Create a pool of `workers` processes (`executor="process"`) or
+    threads (`executor="thread"`). Processes are forked where possible, so
+    that the `initargs` need not be picklable."""
+    if executor == "process":
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "fork" if "fork" in methods else None)
+        return ProcessPoolExecutor(workers, context, initializer, initargs)
+    if executor == "thread":
+        return ThreadPoolExecutor(workers, initializer=initializer,
+                                  initargs=initargs)
+    raise ValueError(f"Unknown executor: {executor!r}")
+
+
+@dataclass
+class ParseResult:
+    """Outcome of parsing the file at `path`: either the `value`, or the
+    `error` that stopped it."""
+    path: PathLike
+    value: Any = None
+    error: Optional[BaseException] = None
+
+
+@dataclass
+class SharedArray:
+    """Reference to an array stored in the file `filename`."""
+    filename: str
+    dtype: str
+    shape: Tuple[int, ...]
+
+
+def _shared_directory() -> Optional[str]:
+    return "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def share(x: Any, min_shared: int = MIN_SHARED) -> Any:
+    """Replace the large numpy arrays in `x` (possibly nested in
+    dictionaries, lists and tuples) by `SharedArray` references."""
+    if np is None:
+        return x
+    if isinstance(x, LazyArray):
+        x = x.load()
+    if isinstance(x, np.ndarray):
+        if x.nbytes < min_shared or x.dtype.hasobject:
+            return x
+        with tempfile.NamedTemporaryFile(
+                dir=_shared_directory(), suffix=".bin", delete=False) as f:
+            f.write(np.ascontiguousarray(x).data.cast("B"))
+        return SharedArray(f.name, x.dtype.str, x.shape)
+    if isinstance(x, dict):
+        return {k: share(v, min_shared) for k, v in x.items()}
+    if isinstance(x, (list, tuple)):
+        return type(x)(share(v, min_shared) for v in x)
+    return x
+
+
+def unshare(x: Any) -> Any:
+    """Turn the `SharedArray` references in `x` back into arrays, mapping
+    their files copy-on-write and removing them."""
+    if isinstance(x, SharedArray):
+        try:
+            with open(x.filename, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        finally:
+            os.unlink(x.filename)
+        return np.frombuffer(buffer, dtype=x.dtype).reshape(x.shape)
+    if isinstance(x, dict):
+        return {k: unshare(v) for k, v in x.items()}
+    if isinstance(x, (list, tuple)):
+        return type(x)(unshare(v) for v in x)
+    return x
+
+
+def _discard(x: Any):
+    """Remove the files of `SharedArray` references in `x`."""
+    if isinstance(x, SharedArray):
+        try:
+            os.unlink(x.filename)
+        except FileNotFoundError:
+            pass
+    elif isinstance(x, dict):
+        for v in x.values():
+            _discard(v)
+    elif isinstance(x, (list, tuple)):
+        for v in x:
+            _discard(v)
+
+
+def resolve_parser(p: Union[Parser, str]) -> Parser:
+    """Returns `p`, or the parser named by `"module:name"`."""
+    if isinstance(p, Parser):
+        return p
+    module, _, name = p.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def parse_file(p: Parser, path: PathLike) -> ParseResult:
+    """Parse the file at `path` with `p`, catching errors."""
+    try:
+        return ParseResult(path, parse_bytes(p, map_file(path)))
+    except Exception as e:
+        return ParseResult(path, error=e)
+
+
+_worker_parser: Optional[Parser] = None
+
+
+def _init_worker(p: Union[Parser, str]):
+    global _worker_parser
+    _worker_parser = resolve_parser(p)
+
+
+def _parse_in_worker(path: PathLike, min_shared: int) -> ParseResult:
+    assert _worker_parser is not None
+    result = parse_file(_worker_parser, path)
+    if result.error is not None:
+        try:
+            pickle.dumps(result.error)
+        except Exception:
+            result.error = Failure(str(result.error)) \
+                if isinstance(result.error, Failure) \
+                else RuntimeError(repr(result.error))
+        return result
+    result.value = share(result.value, min_shared)
+    return result
+
+
+def parse_files(p: Union[Parser, str], paths: Iterable[PathLike],
+                workers: Optional[int] = None, executor: str = "process",
+                ordered: bool = True,
+                min_shared: int = MIN_SHARED) -> Iterator[ParseResult]:
+    """Parse each of `paths` with `p` in a pool of `workers` processes or
+    threads, yielding a `ParseResult` for every file, in order if
+    `ordered`, otherwise as they complete. See module documentation."""
+    resolved: Optional[Parser] = None
+    if executor == "thread":
+        resolved = resolve_parser(p)
+        pool = make_executor(executor, workers)
+    else:
+        pool = make_executor(executor, workers, _init_worker, (p,))
+
+    window = 4 * (workers or os.cpu_count() or 1)
+    pending: Deque[Future] = deque()
+    remaining = iter(paths)
+
+    def submit(n: int):
+        for path in itertools.islice(remaining, n):
+            if resolved is not None:
+                pending.append(pool.submit(parse_file, resolved, path))
+            else:
+                pending.append(pool.submit(_parse_in_worker, path, min_shared))
+
+    try:
+        submit(window)
+        while pending:
+            if ordered:
+                future = pending.popleft()
+            else:
+                done = wait(pending, return_when=FIRST_COMPLETED).done
+                future = next(f for f in pending if f in done)
+                pending.remove(future)
+            result = future.result()
+            submit(1)
+            result.value = unshare(result.value)
+            yield result
+    finally:
+        for future in pending:
+            if not future.cancel() and future.exception() is None:
+                _discard(future.result().value)
+        pool.shutdown()
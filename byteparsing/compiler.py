@@ -0,0 +1,242 @@
+"""
+Compiler
+========
+
+The combinators in :py:mod:`byteparsing.parsers` build a graph of nodes from
+:py:mod:`byteparsing.ir`. Running this graph directly involves a `Call` object
+and some Python function calls for every node that is visited, and for a
+repetition of single characters, for every byte of input. The
+:py:func:`compile_parser` function rewrites the graph into an equivalent
+parser that does less of this work:
+
+* nested `Sequence` nodes are fused into a single `Sequence`;
+* text literals consisting of ASCII characters are encoded up front, so
+  that they become `Literal` nodes, or a `Choice` between them;
+* `Value` nodes in a sequence whose result is not used are removed;
+* `Many` over a `CharClass` becomes a single `Span` scan, which is run by a
+  regular expression;
+* a `Choice` between `CharClass` nodes becomes a single `CharClass`;
+* the pattern `sequence(p >> push, ..., pop())`, where the parsers in the
+  middle do not touch the auxiliary stack, is replaced by a sequence that
+  returns the result of `p` directly.
+
+Parsers that are declared first and defined later, as in::
+
+    dictionary = Parser(None)
+    ...
+    dictionary.func = sequence(...).func
+
+are followed, so recursive grammars are compiled as a whole. Parsers that are
+returned by the function on the right-hand side of `>>` are compiled once
+that function returns the same parser a second time; parsers that are built
+for a single result are left as they are. Opaque parsers (those created
+with the `parser` decorator) are left alone, so compiling a grammar is
+always safe, provided the input uses an ASCII compatible encoding. The
+compiled grammar is a new object; the original remains unchanged.
+Parsers that were given a name for profiling keep it in the compiled
+grammar, and are not fused with their neighbours.
+
+    >>> p = many_char(ascii_alpha).compile()
+"""
+
+from __future__ import annotations
+
+import weakref
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+
+from .trampoline import Parser, Bind
+from .profile import named
+from .ir import (
+    Value, Sequence, NamedSequence, Choice, Many, Literal, TextLiteral,
+    TextOneOf, CharClass, Span, Flush, Push, Pop, Memoize, Regex)
+
+
+def compile_parser(p: Parser) -> Parser:
+    """Returns an optimized parser equivalent to `p`."""
+    return _Compiler().compile(p)
+
+
+def aux_neutral(p: Parser) -> bool:
+    """Determines whether `p` is known to leave the auxiliary stack
+    alone."""
+    if isinstance(p, (Value, Literal, CharClass, Span, Flush, Regex)):
+        return True
+    if isinstance(p, (Sequence, Choice)):
+        return all(aux_neutral(q) for q in p.parsers)
+    if isinstance(p, NamedSequence):
+        return all(aux_neutral(q) for q in p.parsers.values())
+    if isinstance(p, Many):
+        return aux_neutral(p.p)
+    return False
+
+
+class _Compiler:
+    def __init__(self):
+        # Maps `id(p)` to `p` and its compiled form; we keep `p` alive to
+        # make sure the id is not reused.
+        self.done: Dict[int, Tuple[Parser, Parser]] = {}
+
+    def compile(self, p: Parser) -> Parser:
+        key = id(p)
+        if key not in self.done:
+            target = getattr(p.func, "__self__", None)
+            if type(p) is Parser and isinstance(target, Parser):
+                # Forward declaration: compile the node it refers to.
+                forward = Parser(None)
+                self.done[key] = (p, forward)
+                forward.func = self.compile(target).func
+            else:
+                self.done[key] = (p, p)
+                self.done[key] = (p, self.rewrite(p))
+            name = p.profile_name
+            if name is not None:
+                self.done[key] = (p, self.named(p, self.done[key][1], name))
+        return self.done[key][1]
+
+    def named(self, p: Parser, compiled: Parser, name: str) -> Parser:
+        """Gives the compiled form of `p` its profiling `name`. If the
+        compiled node is shared with other parsers, it is wrapped in a
+        parser of its own."""
+        if compiled is p:
+            return p
+        shared = compiled.profile_name is not None or any(
+            q is compiled for k, (_, q) in self.done.items() if k != id(p))
+        if shared:
+            compiled = Parser(compiled.__call__)
+        return named(compiled, name)
+
+    def rewrite(self, p: Parser) -> Parser:
+        if isinstance(p, Sequence):
+            return self.sequence(p)
+        if isinstance(p, NamedSequence):
+            return NamedSequence(
+                **{k: self.compile(q) for k, q in p.parsers.items()})
+        if isinstance(p, Choice):
+            return self.choice(p)
+        if isinstance(p, Many):
+            return self.many(p)
+        if isinstance(p, Bind):
+            return Bind(self.compile(p.p), _Continuation(self, p.f))
+        if isinstance(p, Memoize):
+            return Memoize(self.compile(p.p), p.name)
+        if isinstance(p, TextLiteral) and p.x.isascii():
+            return Literal(p.x.encode("ascii"))
+        if isinstance(p, TextOneOf) and p.x.isascii():
+            return Choice(*(Literal(ch.encode("ascii")) for ch in p.x))
+        return p
+
+    def sequence(self, p: Sequence) -> Parser:
+        # Fuse nested sequences, keeping track of the parser that gives
+        # the result.
+        parsers: List[Parser] = []
+        keep = 0
+        for i, q in enumerate(p.parsers):
+            q = self.compile(q)
+            if isinstance(q, Sequence) and q.profile_name is None:
+                if i == p.keep:
+                    keep = len(parsers) + q.keep
+                parsers.extend(q.parsers)
+            else:
+                if i == p.keep:
+                    keep = len(parsers)
+                parsers.append(q)
+
+        # Remove values that are never used.
+        parsers, keep = _drop_unused_values(parsers, keep)
+        # Replace `p >> push, ..., pop()` by its result.
+        parsers, keep = _inline_push_pop(parsers, keep)
+
+        if len(parsers) == 1:
+            return parsers[0]
+        return Sequence(*parsers, keep=keep)
+
+    def choice(self, p: Choice) -> Parser:
+        parsers = [self.compile(q) for q in p.parsers]
+        classes = [q for q in parsers
+                   if isinstance(q, CharClass) and q.profile_name is None]
+        if len(classes) == len(parsers):
+            chars = frozenset().union(*(q.chars for q in classes))
+            return CharClass(chars, tuple(q.expected for q in classes))
+        return Choice(*parsers)
+
+    def many(self, p: Many) -> Parser:
+        q = self.compile(p.p)
+        if isinstance(q, CharClass) and q.profile_name is None \
+                and not p.init and p.maximum is None:
+            return Span(q.chars, p.collect, p.minimum, q.expected)
+        return Many(q, p.init, p.collect, p.minimum, p.maximum)
+
+
+class _Continuation:
+    """Wraps the function on the right-hand side of `>>`, compiling the
+    parsers it returns. A parser is only compiled once the function has
+    returned it a second time, which shows that it is part of the grammar
+    rather than built for a single result. Until then, and always for the
+    `Value` nodes returned by `fmap`, parsers are passed through as is and
+    only referenced weakly, so that the compiled grammar doesn't keep
+    results alive."""
+    def __init__(self, compiler: _Compiler, f: Callable[[Any], Parser]):
+        self.compiler = compiler
+        self.f = f
+        self.seen: Dict[int, weakref.ref] = {}
+        self.cache: Dict[int, Tuple[weakref.ref, Parser]] = {}
+
+    def __call__(self, x: Any) -> Parser:
+        p = self.f(x)
+        if isinstance(p, Value):
+            return p
+        key = id(p)
+        hit = self.cache.get(key)
+        if hit is not None and hit[0]() is p:
+            return hit[1]
+        ref = self.seen.get(key)
+        if ref is None or ref() is not p:
+            self.seen[key] = weakref.ref(p, partial(self._forget, key))
+            return p
+        del self.seen[key]
+        compiled = self.compiler.compile(p)
+        self.cache[key] = (ref, compiled)
+        return compiled
+
+    def _forget(self, key: int, ref: weakref.ref):
+        if self.seen.get(key) is ref:
+            del self.seen[key]
+
+
+def _drop_unused_values(parsers: List[Parser], keep: int):
+    result: List[Parser] = []
+    new_keep = keep
+    for i, q in enumerate(parsers):
+        if isinstance(q, Value) and q.profile_name is None and i != keep:
+            if i < keep:
+                new_keep -= 1
+            continue
+        result.append(q)
+    return result, new_keep
+
+
+def _inline_push_pop(parsers: List[Parser], keep: int):
+    from .parsers import push
+
+    if keep != len(parsers) - 1:
+        return parsers, keep
+    last = parsers[-1]
+    if not isinstance(last, Pop) or last.transfer is not None:
+        return parsers, keep
+
+    for i in range(len(parsers) - 2, -1, -1):
+        q = parsers[i]
+        if isinstance(q, Bind) and q.profile_name is None \
+                and _function(q.f) is push:
+            if isinstance(q.p, Sequence):
+                result = parsers[:i] + list(q.p.parsers) + parsers[i+1:-1]
+                return result, i + q.p.keep
+            return parsers[:i] + [q.p] + parsers[i+1:-1], i
+        if isinstance(q, Push) or not aux_neutral(q):
+            break
+    return parsers, keep
+
+
+def _function(f: Callable) -> Callable:
+    return f.f if isinstance(f, _Continuation) else f
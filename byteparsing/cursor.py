@@ -21,25 +21,50 @@ manually.
     Type for the buffer. One of: `bytes`, `bytearray`, `mmap.mmap`.
 """
 
-from dataclasses import dataclass
-from typing import Union
+from typing import Union, Optional
 import mmap
+import re
 
 Buffer = Union[bytes, bytearray, mmap.mmap]
 
 
-@dataclass
 class Cursor:
     """Encapsulates a byte string and two offsets to reference the input
-    data."""
-    data: Buffer
-    begin: int = 0
-    end: int = 0
-    encoding: str = "utf-8"
+    data.
+
+    A cursor is immutable: the methods that move it return a new `Cursor`.
+    Since many millions of them may be created during a parse, the class
+    uses `__slots__` instead of a per-instance dictionary.
+
+    If `volatile` is `True`, the underlying buffer may change after the
+    parser returns (see :py:mod:`byteparsing.stream`), so results should
+    not keep views into it."""
+    __slots__ = ("data", "begin", "end", "encoding")
+    __hash__ = None  # type: ignore
+    volatile = False
+
+    def __init__(self, data: Buffer, begin: int = 0, end: int = 0,
+                 encoding: str = "utf-8"):
+        self.data = data
+        self.begin = begin
+        self.end = end
+        self.encoding = encoding
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.begin == other.begin and self.end == other.end \
+            and self.encoding == other.encoding \
+            and (self.data is other.data or self.data == other.data)
+
+    def __repr__(self):
+        return f"Cursor(data=<{type(self.data).__name__} of " \
+               f"{len(self.data)} bytes>, begin={self.begin}, " \
+               f"end={self.end}, encoding={self.encoding!r})"
 
     def __bool__(self):
         """`False` if the cursor references the end of input, `True`
-        otherwise. 
+        otherwise.
         Tip: use `while Cursor:` to run until the end of input"""
         return self.end < len(self.data)
 
@@ -48,10 +73,10 @@ class Cursor:
         return self.end - self.begin
 
     @staticmethod
-    def from_bytes(data):
+    def from_bytes(data, encoding: str = "utf-8"):
         """Constructs a `Cursor` object from a byte string. Initialises `begin`
         and `end` fields at 0."""
-        return Cursor(data, 0, 0)
+        return Cursor(data, 0, 0, encoding)
 
     @property
     def content(self):
@@ -74,13 +99,93 @@ class Cursor:
 
     def increment(self, n: int = 1):
         """Creates new cursor where end is incremented by `n`."""
-        return Cursor(self.data, self.begin, self.end+n)
+        return Cursor(self.data, self.begin, self.end+n, self.encoding)
 
     def flush(self):
         """Creates new cursor where begin is flushed to end location."""
-        return Cursor(self.data, self.end, self.end)
+        return Cursor(self.data, self.end, self.end, self.encoding)
+
+    def skip_to(self, end: int):
+        """Creates new cursor where both begin and end are at `end`."""
+        return Cursor(self.data, end, end, self.encoding)
+
+    def require(self, n: int) -> bool:
+        """Checks that at least `n` bytes are available beyond the end
+        location. A streaming cursor reads more input if needed."""
+        return self.end + n <= len(self.data)
 
     def find(self, x: bytes):
         """Get a cursor where the `end` position is shifted to the next
         location where `x` is found."""
-        return Cursor(self.data, self.begin, self.data.find(x, self.end))
+        return Cursor(self.data, self.begin, self.data.find(x, self.end),
+                      self.encoding)
+
+    def scanner(self):
+        """Get a mutable `Scanner` starting at this cursor."""
+        return Scanner(self.data, self.begin, self.end, self.encoding)
+
+
+class Scanner:
+    """Mutable version of `Cursor`. A primitive parser that needs to move
+    its position several times within a single step can use a scanner to do
+    so in place, and only create a new `Cursor` at the end::
+
+        @parser
+        def line(c: Cursor, a: Any):
+            s = c.scanner()
+            if not s.find(b"\\n"):
+                raise Failure("expected end of line")
+            result = s.flush()
+            s.advance(1)
+            s.flush()
+            return result, s.cursor(), a
+    """
+    __slots__ = ("data", "begin", "end", "encoding")
+
+    def __init__(self, data: Buffer, begin: int = 0, end: int = 0,
+                 encoding: str = "utf-8"):
+        self.data = data
+        self.begin = begin
+        self.end = end
+        self.encoding = encoding
+
+    def __bool__(self):
+        """`False` if the scanner references the end of input."""
+        return self.end < len(self.data)
+
+    @property
+    def at(self):
+        """Next byte (at end location)."""
+        return self.data[self.end]
+
+    def advance(self, n: int = 1):
+        """Move the end location by `n` bytes."""
+        self.end += n
+
+    def find(self, x: bytes) -> bool:
+        """Move the end location to the next occurrence of `x`. Returns
+        `False` and stays in place if `x` is not found."""
+        i = self.data.find(x, self.end)
+        if i < 0:
+            return False
+        self.end = i
+        return True
+
+    def match(self, pattern: re.Pattern) -> Optional[re.Match]:
+        """Match a compiled `pattern` at the end location, moving past the
+        match if it succeeds."""
+        m = pattern.match(self.data, self.end)
+        if m is not None:
+            self.end = m.end()
+        return m
+
+    def flush(self) -> Union[bytes, bytearray]:
+        """Return the current selection, and flush the begin location to the
+        end."""
+        content = self.data[self.begin:self.end]
+        self.begin = self.end
+        return content
+
+    def cursor(self) -> Cursor:
+        """Get an immutable `Cursor` at the current position."""
+        return Cursor(self.data, self.begin, self.end, self.encoding)
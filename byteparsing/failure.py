@@ -7,6 +7,11 @@ time such a `Failure` is not fatal, since it would be part of a range of parser
 choices.  Say we want to parse a number that is either an `int` or a `float`.
 First we would try to parse using the `int` parser. If that fails we can try
 for a floating point number instead.
+
+Since failures are so common, they should be cheap. The built-in parsers
+return a `Failure` object rather than raising it (see
+:py:mod:`byteparsing.trampoline`), and failure messages are only formatted
+when they are actually shown.
 """
 
 from __future__ import annotations
@@ -45,4 +50,8 @@ class Expected(Failure):
 class MultipleFailures(Failure):
     """Raised by the `choice` parser if all options fail."""
     def __init__(self, *x):
-        super().__init__(f"Failures: {x}")
+        self.failures = x
+
+    @property
+    def description(self):
+        return f"Failures: {self.failures}"
@@ -0,0 +1,185 @@
+"""
+Files
+=====
+
+Helpers for getting files into memory. Parsers work best on memory-mapped
+files: the operating system reads the parts of the file that are actually
+used, and numpy arrays can refer to the mapped data without copying.
+
+Compressed files
+----------------
+
+OpenFOAM writes `U.gz` instead of `U` when `writeCompression` is on.
+`map_file` recognises gzip data by its magic number, and finds `U.gz` when
+asked for `U`. Compressed files are decompressed in a streaming fashion into
+a file, which is then mapped like any other, so that arrays remain views on
+the mapped data.
+
+By default this file is temporary. With a `DecompressedCache` the
+decompressed copy is kept in a cache directory and mapped again on later
+reads, as long as the compressed file is unchanged. The cache has a size
+limit; the least recently used copies are evicted when it is exceeded. The
+default cache can be set with `set_default_cache`, or with the
+`BYTEPARSING_CACHE` (directory) and `BYTEPARSING_CACHE_SIZE` (bytes)
+environment variables, which also reach worker processes.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import IO, Optional, Union
+
+from .cursor import Buffer
+
+PathLike = Union[str, Path]
+
+GZIP_MAGIC = b"\x1f\x8b"
+DEFAULT_CACHE_SIZE = 2**32
+
+
+def find_file(path: PathLike) -> Path:
+    """Returns `path`, or its compressed version `path.gz` if only that
+    exists."""
+    path = Path(path)
+    if not path.exists():
+        compressed = path.with_name(path.name + ".gz")
+        if compressed.exists():
+            return compressed
+    return path
+
+
+def is_gzip(path: PathLike) -> bool:
+    """Checks the file at `path` for the gzip magic number."""
+    with open(path, "rb") as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def decompress(path: PathLike, target: IO[bytes]):
+    """Decompress the gzip file at `path` into the file object `target`,
+    one block at a time."""
+    with gzip.open(path, "rb") as f:
+        shutil.copyfileobj(f, target, 2**20)
+    target.flush()
+
+
+def _map(f: IO[bytes]) -> Buffer:
+    if f.seek(0, 2) == 0:
+        return b""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class DecompressedCache:
+    """Directory holding decompressed copies of gzip files, up to a total
+    of `max_size` bytes. Copies are named after the path, size and
+    modification time of the compressed file, and their modification time
+    records when they were last used."""
+    def __init__(self, directory: PathLike,
+                 max_size: int = DEFAULT_CACHE_SIZE):
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    def key(self, path: PathLike) -> str:
+        stat = os.stat(path)
+        name = f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        return hashlib.blake2b(name.encode(), digest_size=16).hexdigest()
+
+    def map(self, path: PathLike) -> Buffer:
+        """Map the decompressed contents of the gzip file at `path`, from
+        the cache if possible."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = self.directory / self.key(path)
+        try:
+            with open(entry, "rb") as f:
+                os.utime(entry)
+                return _map(f)
+        except FileNotFoundError:
+            pass
+
+        with tempfile.NamedTemporaryFile(
+                dir=self.directory, suffix=".tmp", delete=False) as f:
+            try:
+                decompress(path, f)
+                if f.tell() > self.max_size:
+                    return _map(f)
+                os.replace(f.name, entry)
+            finally:
+                if os.path.exists(f.name):
+                    os.unlink(f.name)
+            self.evict(keep=entry)
+            return _map(f)
+
+    def evict(self, keep: Optional[Path] = None):
+        """Remove the least recently used copies until the cache fits in
+        `max_size`, sparing `keep`."""
+        entries = []
+        for p in self.directory.iterdir():
+            if p.suffix == ".tmp":
+                continue
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_size:
+                break
+            if p == keep:
+                continue
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Remove all copies."""
+        for p in self.directory.glob("*"):
+            p.unlink()
+
+
+_default_cache: Optional[DecompressedCache] = None
+
+
+def set_default_cache(cache: Optional[DecompressedCache]):
+    """Set the cache used by `map_file` for compressed files; `None` means
+    decompressing to temporary files."""
+    global _default_cache
+    _default_cache = cache
+
+
+def get_default_cache() -> Optional[DecompressedCache]:
+    """The cache set by `set_default_cache`, or else the one given by the
+    `BYTEPARSING_CACHE` environment variables, if any."""
+    if _default_cache is not None:
+        return _default_cache
+    directory = os.environ.get("BYTEPARSING_CACHE")
+    if not directory:
+        return None
+    size = int(os.environ.get("BYTEPARSING_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+    return DecompressedCache(directory, size)
+
+
+def map_file(path: PathLike,
+             cache: Optional[DecompressedCache] = None) -> Buffer:
+    """Map the file at `path` into memory for reading. Empty files can't be
+    mapped, so these give an empty `bytes` object. Gzip files are
+    decompressed, using `cache` or else the default cache, see module
+    documentation."""
+    path = find_file(path)
+    if not is_gzip(path):
+        with open(path, "rb") as f:
+            return _map(f)
+
+    cache = cache or get_default_cache()
+    if cache is not None:
+        return cache.map(path)
+    with tempfile.TemporaryFile() as f:
+        decompress(path, f)
+        return _map(f)
@@ -0,0 +1,315 @@
+"""
+OpenFOAM cases
+==============
+
+An OpenFOAM case is a directory with a subdirectory for every time that was
+written, each containing one file per field. A `FoamCase` finds these time
+directories and reads fields from many of them at once::
+
+    >>> case = FoamCase("cavity")
+    >>> case.times
+    ['0', '0.1', '0.2', ...]
+    >>> data = case.read(fields=["U", "p"], times=case.times[-10:])
+    >>> data["0.2"]["U"].shape
+    (400, 3)
+
+Files are read in a pool of worker processes (or threads). A worker does not
+send binary data back: it only indexes the file (see
+:py:mod:`byteparsing.foam_index`) and returns the location of the data, after
+which the main process maps the file into memory. The resulting arrays are
+backed by the memory map, so nothing is copied or pickled. ASCII fields are
+parsed by the worker and returned as they are.
+
+Decomposed cases
+----------------
+
+A case that was run in parallel is written as `processor0`, `processor1`,
+..., each with its own time directories holding a piece of every field.
+The file `processor*/constant/polyMesh/cellProcAddressing` of each processor
+lists the global index of each of its cells. A `FoamCase` with such
+directories reads fields by reconstructing them, without the need to run
+`reconstructPar` first: the global array is allocated once, and the workers
+scatter their piece of the field into it directly. With processes, the
+global array lives in a temporary file in shared memory.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import Executor
+from itertools import repeat
+from pathlib import Path
+from typing import (
+    Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union)
+
+import numpy as np
+
+from .array import LazyArray
+from .batch import make_executor, _shared_directory
+from .files import PathLike, map_file
+from .foam_index import FoamIndex, IndexEntry
+from .foam_mesh import read_labels
+
+Time = Union[str, float]
+
+
+def time_directories(path: PathLike) -> List[str]:
+    """List the subdirectories of `path` whose name is a number, sorted by
+    that number."""
+    times = []
+    for p in Path(path).iterdir():
+        if not p.is_dir():
+            continue
+        try:
+            float(p.name)
+        except ValueError:
+            continue
+        times.append(p.name)
+    return sorted(times, key=float)
+
+
+def processor_directories(path: PathLike) -> List[Path]:
+    """List the `processor<N>` subdirectories of `path`, sorted by `N`."""
+    found = [p for p in Path(path).iterdir()
+             if p.is_dir() and re.fullmatch(r"processor[0-9]+", p.name)]
+    return sorted(found, key=lambda p: int(p.name[9:]))
+
+
+def uniform_value(value: Any) -> Any:
+    """The value of a uniform field as parsed, which is `{"data": x}` in
+    binary files and `["uniform", x]` in ASCII files, or `None` if it isn't
+    one."""
+    if isinstance(value, dict) and list(value) == ["data"]:
+        return value["data"]
+    if isinstance(value, list) and len(value) == 2 \
+            and value[0] == "uniform":
+        return value[1]
+    return None
+
+
+def locate_entry(path: PathLike, entry: str, save: bool = False) -> Any:
+    """Runs in a worker: index the file at `path`, and return the
+    `IndexEntry` of `entry` if it is a binary list. Otherwise return the
+    parsed value: the data of an ASCII list, the value of a uniform field,
+    or the entry as it is. If `save` is `True` the index is stored in a
+    sidecar file."""
+    index = FoamIndex.open(path, save)
+    location = index.entries[entry]
+    if location.offset is not None:
+        return location
+    value = index.read(entry)
+    uniform = uniform_value(value)
+    if uniform is not None:
+        return uniform
+    if isinstance(value, dict) and "data" in value:
+        return value["data"]
+    return value
+
+
+def load_entry(path: PathLike, located: Any) -> Any:
+    """Runs in the main process: turn the result of `locate_entry` into an
+    array backed by a memory map of the file."""
+    if not isinstance(located, IndexEntry):
+        return located
+    assert located.offset is not None and located.shape is not None
+    return LazyArray(map_file(path), located.offset,
+                     np.dtype(located.dtype), located.shape).load()
+
+
+def entry_shape(path: PathLike, entry: str, save: bool = False) -> Any:
+    """Runs in a worker: index the file at `path`, and return the
+    `IndexEntry` of `entry` if it is a list, which gives its shape and
+    dtype. If `entry` is a uniform field, return its value."""
+    index = FoamIndex.open(path, save)
+    location = index.entries[entry]
+    if location.shape is not None:
+        return location
+    value = uniform_value(index.read(entry))
+    if value is not None:
+        return value
+    raise ValueError(f"Entry {entry} in {path} is not a field.")
+
+
+Target = Union[np.ndarray, Tuple[str, Tuple[int, ...], str]]
+
+
+def open_target(target: Target) -> np.ndarray:
+    """The array referred to by `target`, as yielded by `global_array`."""
+    if isinstance(target, tuple):
+        filename, shape, dtype = target
+        return np.memmap(filename, dtype=dtype, mode="r+", shape=shape)
+    return target
+
+
+def scatter_piece(target: Target, field: PathLike, addressing: Target,
+                  begin: int, end: int, entry: str, save: bool = False):
+    """Runs in a worker: read `entry` from the processor's `field` file and
+    store it in the global array at the cells given by
+    `addressing[begin:end]`. The `target` and `addressing` are arrays as
+    yielded by `global_array`."""
+    cells = open_target(addressing)[begin:end]
+    open_target(target)[cells] = \
+        load_entry(field, locate_entry(field, entry, save))
+
+
+@contextmanager
+def global_array(shape: Tuple[int, ...], dtype: np.dtype, shared: bool) \
+        -> Iterator[Tuple[np.ndarray, Target]]:
+    """Allocate the global array for a reconstruction, yielding the array
+    and the `target` to pass to `scatter_piece`. If `shared` is `True`, the
+    array is a memory map of a temporary file, preferably in `/dev/shm`,
+    that is removed afterwards; the array stays valid until it is
+    discarded."""
+    if not shared:
+        result = np.empty(shape, dtype=dtype)
+        yield result, result
+        return
+
+    with tempfile.NamedTemporaryFile(
+            dir=_shared_directory(), suffix=".bin", delete=False) as f:
+        filename = f.name
+    try:
+        result = np.memmap(filename, dtype=dtype, mode="w+", shape=shape)
+        yield result, (filename, shape, dtype.str)
+    finally:
+        os.unlink(filename)
+
+
+class FoamCase:
+    """An OpenFOAM case directory at `path`. By default files are read
+    using as many processes as there are cores; set `executor` to
+    `"thread"` to use threads instead. If `decomposed` is not given, the
+    case is taken to be decomposed if it has processor directories. With
+    `save_index`, the indices of the files that are read are stored in
+    sidecar files next to them, which speeds up later reads."""
+    def __init__(self, path: PathLike, workers: Optional[int] = None,
+                 executor: str = "process",
+                 decomposed: Optional[bool] = None,
+                 save_index: bool = False):
+        self.path = Path(path)
+        self.workers = workers
+        self.executor = executor
+        self.save_index = save_index
+        self.processors = processor_directories(self.path)
+        self.decomposed = bool(self.processors) if decomposed is None \
+            else decomposed
+
+    @property
+    def _root(self) -> Path:
+        """Directory holding the time directories; for decomposed cases
+        that of the first processor."""
+        return self.processors[0] if self.decomposed else self.path
+
+    @property
+    def times(self) -> List[str]:
+        """Names of the time directories, in order."""
+        return time_directories(self._root)
+
+    def fields(self, time: Time) -> List[str]:
+        """Names of the fields written at `time`. Compressed fields are
+        listed without their `.gz` suffix."""
+        directory = self._root / self._time_name(time)
+        return sorted(
+            p.name[:-3] if p.suffix == ".gz" else p.name
+            for p in directory.iterdir()
+            if p.is_file() and p.suffix not in (".index", ".tmp"))
+
+    def _time_name(self, time: Time) -> str:
+        if isinstance(time, str) and (self._root / time).is_dir():
+            return time
+        for name in self.times:
+            if float(name) == float(time):
+                return name
+        raise KeyError(f"No time directory for {time} in {self.path}")
+
+    def _pool(self) -> Executor:
+        return make_executor(self.executor, self.workers)
+
+    @contextmanager
+    def _addressing(self, pool: Executor) \
+            -> Iterator[Tuple[Target, List[int]]]:
+        """Read the `cellProcAddressing` of all processors into one array,
+        yielding it with the offsets of every processor's part."""
+        paths = [
+            os.fspath(p / "constant" / "polyMesh" / "cellProcAddressing")
+            for p in self.processors]
+        pieces = list(pool.map(read_labels, paths))
+        bounds = np.cumsum([0] + [len(p) for p in pieces]).tolist()
+        dtype = np.result_type(*pieces)
+        with global_array((bounds[-1],), dtype, self.executor == "process") \
+                as (cells, target):
+            for piece, begin, end in zip(pieces, bounds, bounds[1:]):
+                cells[begin:end] = piece
+            yield target, bounds
+
+    def _reconstruct(self, pool: Executor,
+                     addressing: Tuple[Target, List[int]], field: str,
+                     name: str, entry: str) -> Any:
+        cells, bounds = addressing
+        fields = [os.fspath(p / name / field) for p in self.processors]
+        pieces = list(pool.map(entry_shape, fields, repeat(entry),
+                               repeat(self.save_index)))
+        lists = [p for p in pieces if isinstance(p, IndexEntry)]
+        if lists:
+            # `entry_shape` only returns entries with a known shape
+            assert lists[0].shape is not None
+            shape = (bounds[-1],) + tuple(lists[0].shape[1:])
+            dtype = np.dtype(lists[0].dtype)
+        elif all(np.array_equal(p, pieces[0]) for p in pieces):
+            return pieces[0]
+        else:
+            # uniform pieces with different values
+            values = [np.asarray(p) for p in pieces]
+            shape = (bounds[-1],) + values[0].shape
+            dtype = np.result_type(*values)
+
+        with global_array(shape, dtype, self.executor == "process") \
+                as (result, target):
+            list(pool.map(scatter_piece, repeat(target), fields,
+                          repeat(cells), bounds[:-1], bounds[1:],
+                          repeat(entry), repeat(self.save_index)))
+        return result
+
+    def reconstruct(self, field: str, time: Time,
+                    entry: str = "internalField") -> Any:
+        """Read `entry` of `field` at `time` from all processors, and
+        assemble the global array. If the field is uniform on all
+        processors, the result is its value."""
+        with self._pool() as pool, self._addressing(pool) as addressing:
+            return self._reconstruct(
+                pool, addressing, field, self._time_name(time), entry)
+
+    def read(self, fields: Optional[Iterable[str]] = None,
+             times: Optional[Iterable[Time]] = None,
+             entry: str = "internalField") -> Dict[str, Dict[str, Any]]:
+        """Read `entry` of the given `fields` at the given `times`, by
+        default all of them. Returns a dictionary of dictionaries, indexed
+        by time and field name. Fields of decomposed cases are
+        reconstructed."""
+        names = self.times if times is None \
+            else [self._time_name(t) for t in times]
+        if self.decomposed:
+            with self._pool() as pool, self._addressing(pool) as addressing:
+                return {
+                    t: {f: self._reconstruct(pool, addressing, f, t, entry)
+                        for f in (self.fields(t) if fields is None
+                                  else fields)}
+                    for t in names}
+
+        files = {
+            (t, f): self.path / t / f
+            for t in names
+            for f in (self.fields(t) if fields is None else fields)}
+
+        result: Dict[str, Dict[str, Any]] = {t: {} for t in names}
+        with self._pool() as pool:
+            futures = {
+                key: pool.submit(locate_entry, os.fspath(path), entry,
+                                 self.save_index)
+                for key, path in files.items()}
+            for (t, f), future in futures.items():
+                result[t][f] = load_entry(files[t, f], future.result())
+        return result
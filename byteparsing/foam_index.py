@@ -0,0 +1,226 @@
+"""
+OpenFOAM index
+==============
+
+Parsing an entire OpenFOAM file to get at a single entry, say the
+`internalField` or the values on a single patch, is wasteful. A `FoamIndex`
+records the byte range of every entry in a file, including the entries of
+nested dictionaries like `boundaryField`. Entries are addressed by their path,
+for instance `"boundaryField/inlet/value"`. For binary lists we also store the
+offset, dtype and shape of the data, so that these can be read without any
+parsing at all::
+
+    >>> index = FoamIndex.open("case/1/U")
+    >>> index.keys()
+    ['dimensions', 'internalField', 'boundaryField', ...]
+    >>> U = index["internalField"]
+
+The index is stored in a small sidecar file next to the field file (with
+`.index` appended to the name). The sidecar records the size and
+modification time of the file, together with a hash of its first and last
+few kilobytes; if any of these don't match, the index is rebuilt.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .array import LazyArray
+from .cursor import Cursor, Buffer
+from .files import PathLike, find_file, map_file
+from .openfoam import (
+    preamble, tokenize, identifier, foam_value, key_value_pair)
+from .parsers import (
+    Parser, named_sequence, choice, many, some, char, text_literal, position,
+    with_config, parse_bytes)
+from .stack import Stack
+
+INDEX_VERSION = 1
+HASH_BLOCK = 4096
+
+
+@dataclass
+class IndexEntry:
+    """Location of an entry in an OpenFOAM file. The text of the entry
+    (key and value) spans `begin` to `end`. For binary lists, `offset` is
+    the location of the data, with given `dtype` and `shape`; for ASCII
+    lists only `dtype` and `shape` are known."""
+    begin: int
+    end: int
+    dtype: Optional[str] = None
+    shape: Optional[Tuple[int, ...]] = None
+    offset: Optional[int] = None
+
+
+indexed_dictionary = Parser(None)
+
+indexed_pair = named_sequence(
+    begin=position,
+    key=tokenize(identifier),
+    value=choice(
+        indexed_dictionary,
+        named_sequence(value=foam_value, _end=tokenize(char(';')))),
+    end=position)
+
+indexed_dictionary.func = named_sequence(
+    _open=tokenize(text_literal("{")),
+    entries=many(indexed_pair),
+    _close=tokenize(text_literal("}"))).func
+
+foam_file_index = with_config(named_sequence(
+    preamble=preamble,
+    entries=some(indexed_pair)), lazy=True)
+"""Parses an OpenFOAM file into the header and a nested list of entries,
+where every entry is a dictionary with `begin`, `key`, `value` and `end`.
+The value is either `{"value": ...}` or `{"entries": [...]}` for
+dictionaries. Binary lists are not read."""
+
+
+def build_index(data: Buffer) \
+        -> Tuple[Dict[str, Any], Dict[str, IndexEntry]]:
+    """Scans an OpenFOAM file, returning the header and the index entries by
+    path."""
+    result = parse_bytes(foam_file_index, data)
+    entries: Dict[str, IndexEntry] = {}
+    _flatten(result["entries"], "", entries)
+    return result["preamble"]["content"], entries
+
+
+def _flatten(pairs: List[Dict[str, Any]], prefix: str,
+             entries: Dict[str, IndexEntry]):
+    for pair in pairs:
+        path = prefix + pair["key"]
+        entry = IndexEntry(pair["begin"], pair["end"])
+        entries[path] = entry
+        if "entries" in pair["value"]:
+            _flatten(pair["value"]["entries"], path + "/", entries)
+            continue
+        value = pair["value"]["value"]
+        if isinstance(value, dict) and "data" in value:
+            value = value["data"]
+        if isinstance(value, LazyArray):
+            entry.dtype = value.dtype.str
+            entry.shape = value.shape
+            entry.offset = value.offset
+        elif isinstance(value, np.ndarray):
+            entry.dtype = value.dtype.str
+            entry.shape = value.shape
+
+
+def file_key(path: PathLike) -> Dict[str, Any]:
+    """Identifies the contents of the file at `path` by its size,
+    modification time and a hash of its first and last `HASH_BLOCK`
+    bytes."""
+    stat = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(HASH_BLOCK))
+        if stat.st_size > HASH_BLOCK:
+            f.seek(max(HASH_BLOCK, stat.st_size - HASH_BLOCK))
+            h.update(f.read(HASH_BLOCK))
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "hash": h.hexdigest()}
+
+
+class FoamIndex:
+    """Index of the entries in an OpenFOAM file, see module documentation.
+    Use `FoamIndex.open` to create one."""
+    def __init__(self, path: Path, header: Dict[str, Any],
+                 entries: Dict[str, IndexEntry]):
+        self.path = path
+        self.header = header
+        self.entries = entries
+        self._data: Optional[Buffer] = None
+
+    @staticmethod
+    def sidecar(path: PathLike) -> Path:
+        """Location of the sidecar file for `path`."""
+        path = Path(path)
+        return path.with_name(path.name + ".index")
+
+    @classmethod
+    def open(cls, path: PathLike, save: bool = True) -> FoamIndex:
+        """Get the index of the file at `path`, from its sidecar if that is
+        up to date, otherwise by scanning the file. If `save` is `True`, a
+        new index is written to the sidecar; failure to do so is not an
+        error."""
+        path = find_file(path)
+        key = file_key(path)
+        index = cls._load(path, key)
+        if index is not None:
+            return index
+
+        data = map_file(path)
+        header, entries = build_index(data)
+        index = cls(path, header, entries)
+        index._data = data
+        if save:
+            try:
+                index._save(key)
+            except OSError:
+                pass
+        return index
+
+    @classmethod
+    def _load(cls, path: Path, key: Dict[str, Any]) -> Optional[FoamIndex]:
+        try:
+            with open(cls.sidecar(path), "r") as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if content.get("version") != INDEX_VERSION \
+                or content.get("key") != key:
+            return None
+        entries = {
+            k: IndexEntry(**dict(
+                v, shape=None if v["shape"] is None else tuple(v["shape"])))
+            for k, v in content["entries"].items()}
+        return cls(path, content["header"], entries)
+
+    def _save(self, key: Dict[str, Any]):
+        sidecar = self.sidecar(self.path)
+        tmp = sidecar.with_name(sidecar.name + f".{os.getpid()}.tmp")
+        content = {
+            "version": INDEX_VERSION, "key": key, "header": self.header,
+            "entries": {k: asdict(v) for k, v in self.entries.items()}}
+        with open(tmp, "w") as f:
+            json.dump(content, f)
+        os.replace(tmp, sidecar)
+
+    @property
+    def data(self) -> Buffer:
+        """The file contents, mapped into memory on first use."""
+        if self._data is None:
+            self._data = map_file(self.path)
+        return self._data
+
+    def keys(self) -> List[str]:
+        return list(self.entries)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.entries
+
+    def __getitem__(self, path: str) -> Any:
+        return self.read(path)
+
+    def read(self, path: str) -> Any:
+        """Read the value of the entry at `path`. Binary lists are mapped
+        directly from the file; other entries are parsed from the start of
+        their byte range."""
+        entry = self.entries[path]
+        if entry.offset is not None:
+            assert entry.shape is not None
+            return LazyArray(
+                self.data, entry.offset, np.dtype(entry.dtype),
+                entry.shape).load()
+        p = with_config(key_value_pair, **self.header)
+        cursor = Cursor(self.data, entry.begin, entry.begin)
+        result, _, _ = p(cursor, Stack()).invoke()
+        return result["value"]
@@ -0,0 +1,183 @@
+"""
+OpenFOAM meshes
+===============
+
+The mesh of an OpenFOAM case is stored in `constant/polyMesh`, in the files
+`points`, `faces`, `owner` and `neighbour`. These hold bare lists, without
+the `key value;` structure of field files. `read_poly_mesh` reads them into
+numpy arrays::
+
+    >>> mesh = read_poly_mesh("cavity")
+    >>> mesh.points.shape
+    (882, 3)
+    >>> mesh.face(0)
+    array([ 1, 22, 463, 442], dtype=int32)
+
+Faces have different numbers of vertices, so they are stored in compressed
+sparse row (CSR) form: the vertices of face `i` are
+`face_indices[face_offsets[i]:face_offsets[i+1]]`. In binary files this is
+exactly how OpenFOAM writes them (class `faceCompactList`); ASCII files list
+every face as `n(v1 v2 ...)` (class `faceList`), which is converted in bulk.
+
+Files are memory mapped, and binary lists are views on the mapped data, so
+reading a mesh costs next to no time and memory until the arrays are used.
+Label and scalar widths follow the `arch` entry of each file.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .cursor import Cursor
+from .failure import Expected, Failure
+from .files import PathLike, map_file
+from .openfoam import (
+    preamble, tokenize, size_token, foam_bare_list, label_list_file,
+    element_types, ascii_types, to_array, _nested_list_end)
+from .parsers import (
+    Parser, named_sequence, parse_bytes, using_config, with_config)
+from .trampoline import parser
+
+_face_size = re.compile(rb"(\d+)\s*\(")
+_list_end = re.compile(rb"\)")
+
+
+def face_list_ascii(size: int, label: np.dtype = element_types[b"label"]) \
+        -> Parser:
+    """Parses an ASCII list of `size` faces, each written as
+    `n(v1 v2 ... vn)`, into a dictionary with `offsets` and `indices` of
+    type `label`."""
+
+    @parser
+    def face_list_ascii_p(c: Cursor, a: Any):
+        data = c.data
+        start = c.end
+        if start >= len(data) or data[start] != ord('('):
+            return Expected("(")
+        pattern = _nested_list_end if size else _list_end
+        m = pattern.search(data, start + 1)
+        while m is None and c.require(len(data) - start + 1):
+            data = c.data
+            m = pattern.search(data, start + 1)
+        if m is None:
+            return Expected(")")
+        end = m.end() - 1
+        block = bytes(data[start + 1:end])
+
+        try:
+            counts = np.array(_face_size.findall(block), dtype=np.int64)
+            if len(counts) != size:
+                return Failure(f"Expected {size} faces, got {len(counts)}.")
+            offsets = np.zeros(size + 1, dtype=label)
+            np.cumsum(counts, out=offsets[1:])
+            numbers = to_array(
+                block.replace(b"(", b" ").replace(b")", b" ").split(), label)
+        except (ValueError, OverflowError) as e:
+            return Failure(str(e))
+        keep = np.ones(len(numbers), dtype=bool)
+        keep[np.arange(size) + offsets[:-1]] = False
+        indices = numbers[keep]
+        if len(indices) != offsets[-1]:
+            return Failure("Face sizes don't match their vertices.")
+        return {"offsets": offsets, "indices": indices}, \
+            c.skip_to(end + 1), a
+
+    return face_list_ascii_p
+
+
+@using_config
+def faces_body(config) -> Parser:
+    """Parses the contents of a `faces` file, either a `faceCompactList` of
+    offsets and indices, or a `faceList`."""
+    if config.get("class") == "faceCompactList":
+        return named_sequence(
+            offsets=foam_bare_list(b"label"),
+            indices=foam_bare_list(b"label"))
+    label = ascii_types(config.get("arch"))[b"label"]
+    return size_token >> (lambda n: tokenize(face_list_ascii(n, label)))
+
+
+points_file = with_config(named_sequence(
+    preamble=preamble,
+    data=foam_bare_list(b"vector")))
+"""Parses a `points` file."""
+
+faces_file = with_config(named_sequence(
+    preamble=preamble,
+    data=faces_body()))
+"""Parses a `faces` file, giving `offsets` and `indices` in CSR form."""
+
+
+def read_labels(path: PathLike) -> np.ndarray:
+    """Read a file holding a list of labels, like `owner` or
+    `cellProcAddressing`."""
+    return parse_bytes(label_list_file, map_file(path))["data"]
+
+
+def mesh_counts(header: Dict[str, Any]) -> Dict[str, int]:
+    """The counts in the `note` of a mesh file header, like
+    `"nPoints:1000 nCells:729 nFaces:2430 nInternalFaces:1944"`."""
+    note = str(header.get("note", ""))
+    return {k: int(v) for k, v in re.findall(r"(\w+):\s*(\d+)", note)}
+
+
+@dataclass
+class PolyMesh:
+    """An OpenFOAM mesh, as read by `read_poly_mesh`."""
+    points: np.ndarray
+    face_offsets: np.ndarray
+    face_indices: np.ndarray
+    owner: np.ndarray
+    neighbour: np.ndarray
+    n_cells: Optional[int] = None
+
+    def __post_init__(self):
+        if self.n_cells is None:
+            self.n_cells = int(max(
+                self.owner.max(initial=-1),
+                self.neighbour.max(initial=-1))) + 1
+
+    @property
+    def n_points(self) -> int:
+        return len(self.points)
+
+    @property
+    def n_faces(self) -> int:
+        return len(self.face_offsets) - 1
+
+    @property
+    def n_internal_faces(self) -> int:
+        return len(self.neighbour)
+
+    def face(self, i: int) -> np.ndarray:
+        """The point labels of face `i`."""
+        return self.face_indices[self.face_offsets[i]:self.face_offsets[i+1]]
+
+
+def poly_mesh_directory(path: PathLike) -> Path:
+    """The `polyMesh` directory of a case, or `path` itself if it is
+    one."""
+    path = Path(path)
+    if (path / "constant" / "polyMesh").is_dir():
+        return path / "constant" / "polyMesh"
+    return path
+
+
+def read_poly_mesh(path: PathLike) -> PolyMesh:
+    """Read the mesh of the case at `path`, or from the `polyMesh`
+    directory `path`."""
+    directory = poly_mesh_directory(path)
+    points = parse_bytes(points_file, map_file(directory / "points"))
+    faces = parse_bytes(faces_file, map_file(directory / "faces"))
+    owner = parse_bytes(label_list_file, map_file(directory / "owner"))
+    neighbour = read_labels(directory / "neighbour")
+    counts = mesh_counts(owner["preamble"]["content"])
+    return PolyMesh(
+        points["data"], faces["data"]["offsets"], faces["data"]["indices"],
+        owner["data"], neighbour, counts.get("nCells"))
+
@@ -0,0 +1,200 @@
+"""
+Parallel ASCII lists
+====================
+
+Converting an ASCII list to numbers is the slow part of reading an ASCII
+field, and `ascii_array` does it on a single core. For very large lists,
+`read_ascii_list` spreads the conversion over a pool of workers::
+
+    >>> U = read_ascii_list("case/1/U", "internalField", workers=8)
+    >>> U.shape
+    (200000000, 3)
+
+The header `nonuniform List<vector> N (` of the entry is found with a
+regular expression, and the end of the list by looking for the closing
+paren, without parsing anything in between. The body is then cut into
+chunks, at whitespace between scalars, or after the `)` of a vector or
+tensor, so that no value is split. The workers first count the values in
+their chunk, which gives the offset of every chunk in the result. Then they
+convert their chunk into its slice of a single output array; with processes
+this array lives in a temporary file in shared memory. If the counts don't
+add up to `N`, a `Failure` is raised.
+
+Files that hold a bare list, like `points` or `cellProcAddressing`, are
+read by passing `entry=None` and the element type. Labels and scalars have
+the widths given by the `arch` entry of the header. Compressed files are
+decompressed once, before the workers start.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from itertools import repeat
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .batch import make_executor, _shared_directory
+from .cursor import Buffer, Cursor
+from .failure import Failure
+from .files import PathLike, find_file, is_gzip, decompress, map_file
+from .foam_case import Target, global_array, open_target
+from .openfoam import (
+    components, ascii_types, preamble, to_array, _nested_list_end)
+from .parsers import with_config
+from .stack import Stack
+
+CHUNK_SIZE = 2**24
+"""Approximate size in bytes of the chunks handed to workers."""
+
+_whitespace = re.compile(rb"\s")
+_bare_list = re.compile(rb"\s*(\d+)\s*\(")
+
+
+def _entry_pattern(entry: str) -> re.Pattern:
+    return re.compile(rb"\b" + re.escape(entry.encode())
+                      + rb"\s+nonuniform\s+List<(\w+)>\s*(\d+)\s*\(")
+
+
+def read_header(data: Buffer) -> Tuple[dict, int]:
+    """Parse the `FoamFile` header at the start of `data`, returning its
+    contents and the position after it."""
+    cursor = Cursor(data, 0, 0)
+    result, cursor, _ = with_config(preamble)(cursor, Stack()).invoke()
+    return result["content"], cursor.end
+
+
+def find_list_body(data: Buffer, entry: Optional[str] = "internalField",
+                   dtype: Optional[bytes] = None) \
+        -> Tuple[dict, bytes, int, int, int]:
+    """Locate the ASCII list of `entry`, or with `entry=None` the bare list
+    after the header, which holds elements of type `dtype`. Returns the
+    header, the element type, the size `N` and the byte range of the list
+    body, between the parens."""
+    header, position = read_header(data)
+    if header.get("format", "ascii") != "ascii":
+        raise Failure("Expected an ASCII file.")
+    if entry is None:
+        m = _bare_list.match(data, position)
+        if m is None or dtype is None:
+            raise Failure("Expected a list with element type.")
+        size = int(m.group(1))
+    else:
+        m = _entry_pattern(entry).search(data, position)
+        if m is None:
+            raise Failure(f"Expected a nonuniform list for {entry}.")
+        dtype, size = m.group(1), int(m.group(2))
+    if dtype not in components:
+        raise Failure(f"Unrecognized data type: {dtype!r}")
+
+    begin = m.end()
+    if components[dtype] == 1 or size == 0:
+        end = data.find(b")", begin)
+    else:
+        m = _nested_list_end.search(data, begin)
+        end = -1 if m is None else m.end() - 1
+    if end == -1:
+        raise Failure("Expected )")
+    return header, dtype, size, begin, end
+
+
+def split_body(data: Buffer, begin: int, end: int, n: int,
+               chunks: int) -> List[Tuple[int, int]]:
+    """Cut the byte range `begin:end` of a list body into about `chunks`
+    ranges, without splitting values of `n` components."""
+    bounds = [begin]
+    for i in range(1, chunks):
+        at = max(bounds[-1], begin + (end - begin) * i // chunks)
+        if n == 1:
+            m = _whitespace.search(data, at, end)
+            cut = end if m is None else m.start()
+        else:
+            cut = data.find(b")", at, end)
+            cut = end if cut == -1 else cut + 1
+        if cut > bounds[-1]:
+            bounds.append(cut)
+    bounds.append(end)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def count_values(source: str, begin: int, end: int, n: int) -> int:
+    """Runs in a worker: count the values (scalars, or vectors with `n`
+    components) in the byte range `begin:end` of the file `source`."""
+    block = map_file(source)[begin:end]
+    if n > 1:
+        return block.count(b"(")
+    chars = np.frombuffer(block, dtype=np.uint8)
+    space = (chars == 32) | ((chars >= 9) & (chars <= 13))
+    return int(np.count_nonzero(~space[1:] & space[:-1])) \
+        + int(len(chars) > 0 and not space[0])
+
+
+def parse_chunk(target: Target, source: str, begin: int, end: int,
+                offset: int, count: int):
+    """Runs in a worker: convert the values in the byte range `begin:end`
+    of the file `source` into `target[offset:offset+count]`."""
+    target = open_target(target)
+    block = map_file(source)[begin:end]
+    n = 1 if target.ndim == 1 else target.shape[1]
+    if n > 1:
+        if block.count(b")") != count:
+            raise Failure("Unexpected structure in ASCII list.")
+        block = block.replace(b"(", b" ").replace(b")", b" ")
+    tokens = block.split()
+    if len(tokens) != count * n:
+        raise Failure(f"Expected {count * n} values, got {len(tokens)}.")
+    try:
+        values = to_array(tokens, target.dtype)
+    except (ValueError, OverflowError) as e:
+        raise Failure(str(e))
+    target[offset:offset + count] = \
+        values.reshape((count,) + target.shape[1:])
+
+
+@contextmanager
+def plain_file(path: PathLike) -> Iterator[str]:
+    """The name of a file with the contents of `path`; compressed files are
+    decompressed to a temporary file."""
+    path = find_file(path)
+    if not is_gzip(path):
+        yield os.fspath(path)
+        return
+    with tempfile.NamedTemporaryFile(
+            dir=_shared_directory(), suffix=".tmp") as f:
+        decompress(path, f)
+        yield f.name
+
+
+def read_ascii_list(path: PathLike, entry: Optional[str] = "internalField",
+                    dtype: Optional[bytes] = None,
+                    workers: Optional[int] = None,
+                    executor: str = "process",
+                    chunk_size: int = CHUNK_SIZE) -> np.ndarray:
+    """Read the ASCII list of `entry` in the file at `path`, converting
+    chunks of it in a pool of `workers` processes or threads. See module
+    documentation."""
+    with plain_file(path) as source:
+        data = map_file(source)
+        header, dtype, size, begin, end = find_list_body(data, entry, dtype)
+        n = components[dtype]
+        chunks = split_body(
+            data, begin, end, n,
+            max(workers or os.cpu_count() or 1,
+                -(-(end - begin) // chunk_size)))
+        starts, ends = zip(*chunks)
+        shape = (size,) if n == 1 else (size, n)
+
+        with make_executor(executor, workers) as pool:
+            counts = list(pool.map(
+                count_values, repeat(source), starts, ends, repeat(n)))
+            if sum(counts) != size:
+                raise Failure(f"Expected {size} values, got {sum(counts)}.")
+            offsets = np.cumsum([0] + counts[:-1]).tolist()
+            with global_array(shape, ascii_types(header.get("arch"))[dtype],
+                              executor == "process") as (result, target):
+                list(pool.map(parse_chunk, repeat(target), repeat(source),
+                              starts, ends, offsets, counts))
+    return result
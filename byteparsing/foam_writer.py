@@ -0,0 +1,298 @@
+"""
+OpenFOAM writer
+===============
+
+The inverse of :py:data:`byteparsing.openfoam.foam_file`: `write_foam_file`
+takes the `{"preamble": ..., "data": ...}` structure that the parser
+produces, possibly modified, and writes it back as an OpenFOAM file::
+
+    >>> content = parse_bytes(foam_file, map_file("case/1/U"))
+    >>> content["data"]["internalField"] = U_new
+    >>> write_foam_file("case/2/U", content)
+
+Whether lists are written in ASCII or binary follows the `format` entry in
+the header. Binary lists are never copied: the output is produced as a
+sequence of chunks, where the data of each list is a `memoryview` on the
+numpy array itself, and the chunks are handed to the operating system with
+`os.writev`.
+
+Fields that don't fit in memory can be written from a generator with
+`ChunkedList`::
+
+    >>> content["data"]["internalField"] = ChunkedList(
+    ...     n_cells, (compute(block) for block in blocks))
+
+How the parser output maps back to OpenFOAM syntax:
+
+* numpy arrays and `LazyArray` handles become `nonuniform List<...>`, where
+  the type follows from the shape (one, three or six components) and the
+  dtype (integers are labels);
+* dictionaries with a `data` item are lists: `uniform` values, or ASCII
+  lists with their `name`, `dtype` and `size`; other dictionaries are
+  written as dictionaries;
+* lists of values starting with a word are compound values, other lists are
+  vectors; the `dimensions` entry is written in square brackets;
+* strings that are not identifiers are quoted.
+
+Binary data is written with the element types and byte order given by the
+`arch` entry in the header; arrays that have a different dtype are
+converted block by block.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from typing import (
+    Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Union)
+
+import numpy as np
+
+from .array import LazyArray
+from .files import PathLike
+from .openfoam import arch_types
+
+Chunk = Union[bytes, memoryview]
+Types = Dict[bytes, np.dtype]
+
+CHUNK_SIZE = 2**20
+"""Approximate size in bytes of the chunks in which lists are written."""
+
+_identifier = re.compile(r"[_A-Za-z][_A-Za-z0-9]*")
+_list_types = {1: "scalar", 3: "vector", 6: "symmTensor"}
+
+
+@dataclass
+class ChunkedList:
+    """A list of `size` items that is written from the arrays produced by
+    `chunks`, one after the other, without keeping them in memory. The
+    list type is taken from the first chunk, unless `dtype` (for instance
+    `"vector"`) is given."""
+    size: int
+    chunks: Iterable[Any]
+    dtype: Optional[str] = None
+
+
+def list_type(a: np.ndarray) -> str:
+    """The OpenFOAM list type for the array `a`."""
+    n = 1 if a.ndim == 1 else a.shape[1]
+    if n == 1 and a.dtype.kind in "iu":
+        return "label"
+    try:
+        return _list_types[n]
+    except KeyError:
+        raise ValueError(f"No OpenFOAM list type for shape {a.shape}.")
+
+
+def _binary_chunks(a: np.ndarray, element: np.dtype,
+                   chunk_size: int) -> Iterator[Chunk]:
+    """Views on the bytes of `a`; only blocks that don't have the right
+    dtype or layout are copied, one at a time."""
+    if a.dtype == element and a.flags.c_contiguous:
+        yield a.data.cast("B")
+        return
+    rows = max(1, chunk_size // max(1, a[:1].nbytes))
+    for i in range(0, len(a), rows):
+        block = np.ascontiguousarray(a[i:i+rows], dtype=element)
+        yield block.data.cast("B")
+
+
+def _ascii_chunks(a: np.ndarray, chunk_size: int) -> Iterator[Chunk]:
+    rows = max(1, chunk_size // (24 * (a[:1].size or 1)))
+    for i in range(0, len(a), rows):
+        block = a[i:i+rows].tolist()
+        if a.ndim == 1:
+            text = "\n".join(format_number(x) for x in block)
+        else:
+            text = "\n".join(
+                "(" + " ".join(format_number(x) for x in row) + ")"
+                for row in block)
+        yield (text + "\n").encode()
+
+
+def _list_chunks(prefix: str, dtype: Optional[str], size: int,
+                 arrays: Iterable[Any], binary: Optional[Types],
+                 chunk_size: int) -> Iterator[Chunk]:
+    """Chunks for a list of `size` items, given as a sequence of arrays.
+    The header is written once the type is known from the first array.
+    For binary output, `binary` holds the element types."""
+    count = 0
+    started = False
+    element: Optional[np.dtype] = None
+    for a in arrays:
+        a = np.asarray(a)
+        if not started:
+            dtype = dtype or list_type(a)
+            if binary:
+                element = binary[dtype.encode()]
+            yield f"{prefix}List<{dtype}> {size}\n(".encode() \
+                + (b"" if binary else b"\n")
+            started = True
+        count += len(a)
+        if count > size:
+            break
+        if element is not None:
+            yield from _binary_chunks(a, element, chunk_size)
+        else:
+            yield from _ascii_chunks(a, chunk_size)
+    if not started:
+        yield f"{prefix}List<{dtype or 'scalar'}> 0\n(".encode()
+    if count != size:
+        raise ValueError(f"Expected a list of {size} items, got {count}.")
+    yield b")\n"
+
+
+def format_number(x: Any) -> str:
+    if isinstance(x, (bool, np.bool_)):
+        raise TypeError("OpenFOAM has no boolean numbers.")
+    if isinstance(x, (int, np.integer)):
+        return str(int(x))
+    return repr(float(x))
+
+
+def format_value(key: str, x: Any) -> str:
+    """Formats a value that is not a list of data, nor a dictionary."""
+    if isinstance(x, str):
+        return x if _identifier.fullmatch(x) else '"' + x + '"'
+    if isinstance(x, bytes):
+        return format_value(key, x.decode())
+    if isinstance(x, (list, tuple)):
+        if key == "dimensions":
+            return "[" + " ".join(format_number(y) for y in x) + "]"
+        if x and isinstance(x[0], str):
+            return " ".join(_format_item(key, y) for y in x)
+        return "(" + " ".join(_format_item(key, y) for y in x) + ")"
+    return format_number(x)
+
+
+def _format_item(key: str, x: Any) -> str:
+    if isinstance(x, dict) and "data" in x:
+        return "uniform " + format_value(key, x["data"])
+    return format_value(key, x)
+
+
+def _value_chunks(key: str, x: Any, binary: Optional[Types], indent: str,
+                  chunk_size: int) -> Iterator[Chunk]:
+    """Chunks for the value of `key`, up to and including the `;`."""
+    if isinstance(x, LazyArray):
+        x = x.load()
+    if isinstance(x, np.ndarray):
+        if x.ndim == 0:
+            yield format_number(x.item()).encode() + b";\n"
+            return
+        yield from _list_chunks("nonuniform ", None, len(x), [x], binary,
+                                chunk_size)
+    elif isinstance(x, ChunkedList):
+        yield from _list_chunks("nonuniform ", x.dtype, x.size, x.chunks,
+                                binary, chunk_size)
+    elif isinstance(x, dict) and "data" in x:
+        data = x["data"]
+        if "name" not in x:
+            yield b"uniform " + _format_data(key, data).encode() + b";\n"
+            return
+        if "dtype" in x:
+            dtype = x["dtype"]
+            dtype = dtype.decode() if isinstance(dtype, bytes) else dtype
+            yield from _list_chunks(
+                x["name"] + " ", dtype, x["size"],
+                [data if isinstance(data, np.ndarray) else np.array(data)],
+                binary, chunk_size)
+        else:
+            size = f" {x['size']}" if "size" in x else ""
+            yield f"{x['name']}{size} ".encode() \
+                + _format_data(key, data).encode() + b"\n"
+    else:
+        yield format_value(key, x).encode() + b";\n"
+        return
+    yield indent.encode() + b";\n"
+
+
+def _format_data(key: str, data: Any) -> str:
+    if isinstance(data, np.ndarray):
+        data = data.tolist()
+    return format_value(key, data)
+
+
+def dictionary_chunks(content: Dict[str, Any], binary: Optional[Types],
+                      indent: str = "",
+                      chunk_size: int = CHUNK_SIZE) -> Iterator[Chunk]:
+    """Chunks for the entries of a dictionary."""
+    for key, x in content.items():
+        if isinstance(x, dict) and "data" not in x:
+            yield f"{indent}{key}\n{indent}{{\n".encode()
+            yield from dictionary_chunks(x, binary, indent + "    ",
+                                         chunk_size)
+            yield f"{indent}}}\n".encode()
+            continue
+        yield f"{indent}{key:<15} ".encode()
+        yield from _value_chunks(key, x, binary, indent, chunk_size)
+
+
+def foam_file_chunks(content: Dict[str, Any],
+                     chunk_size: int = CHUNK_SIZE) -> Iterator[Chunk]:
+    """Generates the contents of an OpenFOAM file as a sequence of `bytes`
+    and `memoryview` chunks, see `write_foam_file`."""
+    preamble = content["preamble"]
+    header = preamble["content"]
+    binary = arch_types(header.get("arch")) \
+        if header.get("format", "ascii") == "binary" else None
+    yield f"{preamble['name']}\n{{\n".encode()
+    yield from dictionary_chunks(header, binary, "    ", chunk_size)
+    yield b"}\n\n"
+    for key, x in content["data"].items():
+        yield from dictionary_chunks({key: x}, binary, "", chunk_size)
+        yield b"\n"
+
+
+def _writev_all(fd: int, chunks: List[Chunk]):
+    """Write all `chunks` to `fd`, resuming after partial writes."""
+    views = [memoryview(c) for c in chunks]
+    while views:
+        n = os.writev(fd, views)
+        while views and n >= views[0].nbytes:
+            n -= views[0].nbytes
+            views.pop(0)
+        if n:
+            views[0] = views[0][n:]
+
+
+def _batches(chunks: Iterable[Chunk], max_count: int, max_bytes: int) \
+        -> Iterator[List[Chunk]]:
+    batch: List[Chunk] = []
+    size = 0
+    for c in chunks:
+        batch.append(c)
+        size += memoryview(c).nbytes
+        if len(batch) >= max_count or size >= max_bytes:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def write_foam_file(target: Union[PathLike, BinaryIO],
+                    content: Dict[str, Any],
+                    chunk_size: int = CHUNK_SIZE) -> int:
+    """Write `content`, a structure as produced by
+    :py:data:`byteparsing.openfoam.foam_file`, to `target`, either a path
+    or a binary file object. Returns the number of bytes written."""
+    chunks = foam_file_chunks(content, chunk_size)
+    written = 0
+    if hasattr(target, "write"):
+        for c in chunks:
+            written += memoryview(c).nbytes
+            target.write(c)  # type: ignore
+        return written
+
+    with open(target, "wb") as f:  # type: ignore
+        if not hasattr(os, "writev"):
+            for c in chunks:
+                written += memoryview(c).nbytes
+                f.write(c)
+            return written
+        max_count = min(1024, os.sysconf("SC_IOV_MAX"))
+        for batch in _batches(chunks, max_count, 4 * chunk_size):
+            _writev_all(f.fileno(), batch)
+            written += sum(memoryview(c).nbytes for c in batch)
+    return written
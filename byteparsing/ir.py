@@ -0,0 +1,627 @@
+"""
+Parser graph
+============
+
+Most combinators in :py:mod:`byteparsing.parsers` do not return an opaque
+closure, but one of the node types in this module. Each node is a `Parser` in
+its own right, so it can be run directly, but it also keeps a reference to its
+arguments. This way the parser graph can be inspected and rewritten by the
+compiler in :py:mod:`byteparsing.compiler`.
+
+Parsers created with the `parser` decorator remain opaque to the compiler.
+
+Nodes that combine other parsers never nest calls to the trampoline. They
+call the function of a leaf parser directly, and return a `Frame` for any
+other parser, so that the trampoline can continue where they left off. Leaf
+parsers return a `Failure` instead of raising it; combinators pass it on by
+returning it in turn.
+
+Because the graph is inspectable, we can also tell which bytes a parser may
+start with. The :py:func:`first_set` of a parser is used by `Choice` to skip
+alternatives that cannot match the next byte of input.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import partial
+from typing import (
+    Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional,
+    Set, Tuple)
+
+from .cursor import Cursor
+from .failure import Failure, EndOfInput, Expected, MultipleFailures
+from .trampoline import Parser, Frame, Bind, LeafFunction, leaf_function
+from .memo import Memo, current_memo
+from .stack import Stack
+
+
+class Value(Parser):
+    """Parses to `x` without taking input."""
+    leaf = True
+
+    def __init__(self, x: Any):
+        self.x = x
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        return self.x, cursor, aux
+
+    def __repr__(self):
+        return f"Value({self.x!r})"
+
+
+class Sequence(Parser):
+    """Runs `parsers` in order. The result is that of the parser at index
+    `keep`, by default the last one."""
+    def __init__(self, *parsers: Parser, keep: int = -1):
+        self.parsers = parsers
+        self.keep = keep % len(parsers)
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        return self._run(0, None, cursor, aux)
+
+    def _run(self, i: int, kept: Any, cursor: Cursor, aux: Any):
+        parsers, keep = self.parsers, self.keep
+        last = len(parsers) - 1
+        while i <= last:
+            p = parsers[i]
+            if i == last and keep == last:
+                func = p.func
+                if p.leaf and func is not None:
+                    return func(cursor, aux)
+                return p(cursor, aux)
+            if not p.leaf:
+                return Frame(p(cursor, aux), partial(self._resume, i, kept))
+            func = p.func
+            assert func is not None
+            r = func(cursor, aux)
+            if not isinstance(r, tuple):
+                return r
+            x, cursor, aux = r
+            if i == keep:
+                kept = x
+            i += 1
+        return kept, cursor, aux
+
+    def _resume(self, i: int, kept: Any, x: Any, cursor: Cursor, aux: Any):
+        if i == self.keep:
+            kept = x
+        return self._run(i + 1, kept, cursor, aux)
+
+    def __repr__(self):
+        args = ", ".join(map(repr, self.parsers))
+        if self.keep == len(self.parsers) - 1:
+            return f"Sequence({args})"
+        return f"Sequence({args}, keep={self.keep})"
+
+
+class NamedSequence(Parser):
+    """Runs `parsers` in order. The result is a dictionary with the result
+    of each parser, leaving out those with a name starting with an
+    underscore."""
+    def __init__(self, **parsers: Parser):
+        self.parsers = parsers
+        self.items = tuple(parsers.items())
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        return self._run(0, {}, cursor, aux)
+
+    def _run(self, i: int, result: Dict[str, Any], cursor: Cursor, aux: Any):
+        items = self.items
+        while i < len(items):
+            k, p = items[i]
+            if not p.leaf:
+                return Frame(p(cursor, aux), partial(self._resume, i, result))
+            func = p.func
+            assert func is not None
+            r = func(cursor, aux)
+            if not isinstance(r, tuple):
+                return r
+            x, cursor, aux = r
+            if k[0] != "_":
+                result[k] = x
+            i += 1
+        return result, cursor, aux
+
+    def _resume(self, i: int, result: Dict[str, Any], x: Any,
+                cursor: Cursor, aux: Any):
+        k = self.items[i][0]
+        if k[0] != "_":
+            result[k] = x
+        return self._run(i + 1, result, cursor, aux)
+
+    def __repr__(self):
+        args = ", ".join(f"{k}={p!r}" for k, p in self.parsers.items())
+        return f"NamedSequence({args})"
+
+
+class Choice(Parser):
+    """Parses using the first parser in `parsers` that succeeds.
+
+    Alternatives that cannot start with the next byte of input are skipped.
+    To this end, a dispatch table is built the first time the parser is run
+    (for each encoding), listing the candidates for every byte value and for
+    the end of input. Only bytes that are ambiguous lead to trying more than
+    one alternative."""
+    def __init__(self, *parsers: Parser):
+        self.parsers = parsers
+        self.tables: Dict[str, List[Tuple[Parser, ...]]] = {}
+        self.expected: Dict[str, bytes] = {}
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        table = self.tables.get(cursor.encoding)
+        if table is None:
+            table = self._build_table(cursor.encoding)
+        if not cursor:
+            parsers = table[EMPTY]
+            if not parsers:
+                return EndOfInput()
+        else:
+            x = cursor.at
+            parsers = table[x]
+            if not parsers:
+                return Expected(self.expected[cursor.encoding], x)
+        return self._run(parsers, 0, [], cursor, aux)
+
+    def _build_table(self, encoding: str) -> List[Tuple[Parser, ...]]:
+        firsts = [first_set(p, encoding) for p in self.parsers]
+        # Parsers are not hashable, so we share equal entries by index.
+        unique: Dict[Tuple[int, ...], Tuple[Parser, ...]] = {}
+        table = []
+        for x in range(EMPTY + 1):
+            indices = tuple(
+                i for i, f in enumerate(firsts)
+                if f is None or x in f or EMPTY in f)
+            if indices not in unique:
+                unique[indices] = tuple(self.parsers[i] for i in indices)
+            table.append(unique[indices])
+        self.expected[encoding] = bytes(sorted(
+            x for f in firsts if f is not None for x in f if x != EMPTY))
+        self.tables[encoding] = table
+        return table
+
+    def _run(self, parsers: Tuple[Parser, ...], i: int,
+             failures: List[Failure], cursor: Cursor, aux: Any):
+        while i < len(parsers):
+            p = parsers[i]
+            if not p.leaf:
+                return Frame(
+                    p(cursor, aux), None,
+                    partial(self._recover, parsers, i, failures, cursor, aux))
+            func = p.func
+            assert func is not None
+            r = func(cursor, aux)
+            if not isinstance(r, Failure):
+                return r
+            failures.append(r)
+            i += 1
+
+        return MultipleFailures(*failures)
+
+    def _recover(self, parsers: Tuple[Parser, ...], i: int,
+                 failures: List[Failure], cursor: Cursor, aux: Any,
+                 failure: Failure):
+        failures.append(failure)
+        return self._run(parsers, i + 1, failures, cursor, aux)
+
+    def __repr__(self):
+        return f"Choice({', '.join(map(repr, self.parsers))})"
+
+
+class Many(Parser):
+    """Parses `p` any number of times, but at least `minimum` and at most
+    `maximum` times. If `collect` is `True` the results are gathered in a
+    list, starting with the elements of `init`; otherwise the parser only
+    moves the cursor and returns `None`."""
+    def __init__(self, p: Parser, init: Optional[Iterable[Any]] = None,
+                 collect: bool = True, minimum: int = 0,
+                 maximum: Optional[int] = None):
+        self.p = p
+        self.init = tuple(init or ())
+        self.collect = collect
+        self.minimum = minimum
+        self.maximum = maximum
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        result = list(self.init) if self.collect else None
+        return self._run(result, 0, cursor, aux)
+
+    def _run(self, result: Optional[List[Any]], count: int, cursor: Cursor,
+             aux: Any):
+        p, minimum, maximum = self.p, self.minimum, self.maximum
+        while maximum is None or count < maximum:
+            if not p.leaf:
+                done = None if count < minimum \
+                    else partial(self._done, result, cursor, aux)
+                return Frame(
+                    p(cursor, aux), partial(self._resume, result, count),
+                    done)
+            func = p.func
+            assert func is not None
+            r = func(cursor, aux)
+            if not isinstance(r, tuple):
+                if count < minimum:
+                    return r
+                break
+            x, cursor, aux = r
+            if result is not None:
+                result.append(x)
+            count += 1
+        return result, cursor, aux
+
+    def _resume(self, result: Optional[List[Any]], count: int, x: Any,
+                cursor: Cursor, aux: Any):
+        if result is not None:
+            result.append(x)
+        return self._run(result, count + 1, cursor, aux)
+
+    def _done(self, result: Optional[List[Any]], cursor: Cursor, aux: Any,
+              failure: Failure):
+        return result, cursor, aux
+
+    def __repr__(self):
+        return f"Many({self.p!r}, collect={self.collect}, " \
+               f"minimum={self.minimum}, maximum={self.maximum})"
+
+
+class Literal(Parser):
+    """Parses the exact sequence of bytes in `x`."""
+    leaf = True
+
+    def __init__(self, x: bytes):
+        self.x = x
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        x = self.x
+        if cursor.look_ahead(len(x)) == x:
+            return x, cursor.increment(len(x)), aux
+        return Expected(x)
+
+    def __repr__(self):
+        return f"Literal({self.x!r})"
+
+
+class TextLiteral(Parser):
+    """Parses the string `x`, encoded by the encoding given in the
+    cursor."""
+    leaf = True
+
+    def __init__(self, x: str):
+        self.x = x
+        self.encoded: Dict[str, LeafFunction] = {}
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        f = self.encoded.get(cursor.encoding)
+        if f is None:
+            f = leaf_function(Literal(self.x.encode(cursor.encoding)))
+            self.encoded[cursor.encoding] = f
+        return f(cursor, aux)
+
+    def __repr__(self):
+        return f"TextLiteral({self.x!r})"
+
+
+class TextOneOf(Parser):
+    """Parses any of the characters in `x`, encoded by the encoding given in
+    the cursor."""
+    leaf = True
+
+    def __init__(self, x: str):
+        self.x = x
+        self.encoded: Dict[str, LeafFunction] = {}
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        f = self.encoded.get(cursor.encoding)
+        if f is None:
+            options = [Literal(ch.encode(cursor.encoding)) for ch in self.x]
+            # a choice between leaf parsers never returns a trampoline
+            f = leaf_function(Choice(*options))
+            self.encoded[cursor.encoding] = f
+        return f(cursor, aux)
+
+    def __repr__(self):
+        return f"TextOneOf({self.x!r})"
+
+
+class CharClass(Parser):
+    """Parses a single byte that is a member of `chars`. The `expected`
+    argument describes the class in failure messages."""
+    leaf = True
+
+    def __init__(self, chars: Iterable[int], expected: Any = None):
+        self.chars: FrozenSet[int] = frozenset(chars)
+        self.expected = expected
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        if not cursor:
+            return EndOfInput()
+        x = cursor.at
+        if x in self.chars:
+            return x, cursor.increment(), aux
+        return Expected(self.expected, x)
+
+    def __repr__(self):
+        return f"CharClass({self.expected!r})"
+
+
+class Regex(Parser):
+    """Matches the compiled regular expression `pattern` at the end of the
+    cursor. The result is the matched data, mapped by the optional `transfer`
+    function, and the cursor is flushed to the end of the match.
+
+    Since we cannot tell from a regular expression which bytes it may start
+    with, these can be given as `first`. A pattern that may match the empty
+    string should include `EMPTY` in `first`.
+
+    On a streaming cursor, a pattern may fail to match only because the
+    buffer ends too soon. Before reporting a failure, we make sure that at
+    least `window` bytes are available, whatever the lookahead of the
+    stream."""
+    leaf = True
+    window = 64
+
+    def __init__(self, pattern: re.Pattern,
+                 transfer: Optional[Callable[[bytes], Any]] = None,
+                 first: Optional[Iterable[int]] = None):
+        self.pattern = pattern
+        self.transfer = transfer
+        self.first = None if first is None else frozenset(first)
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        data = cursor.data
+        m = self.pattern.match(data, cursor.end)
+        if m is None and len(data) < cursor.end + self.window:
+            size = len(data)
+            cursor.require(self.window)
+            data = cursor.data
+            if len(data) > size:
+                m = self.pattern.match(data, cursor.end)
+        # A match that extends to the end of the buffer might extend
+        # further if more input can be read.
+        while m is not None and m.end() == len(data) \
+                and cursor.require(len(data) - cursor.end + 1):
+            data = cursor.data
+            m = self.pattern.match(data, cursor.end)
+        if m is None:
+            if not cursor:
+                return EndOfInput()
+            return Expected(self.pattern.pattern, cursor.at)
+        rest = cursor.skip_to(m.end())
+        if self.transfer is None:
+            return m.group(), rest, aux
+        try:
+            return self.transfer(m.group()), rest, aux
+        except ValueError as e:
+            return Failure(str(e))
+
+    def __repr__(self):
+        return f"Regex({self.pattern.pattern!r})"
+
+
+class Span(Parser):
+    """Scans over bytes in `chars` in a single step. This is the compiled
+    form of `Many(CharClass(chars))`: if `collect` is `True` the result is
+    the list of bytes that was passed, otherwise `None`."""
+    leaf = True
+
+    def __init__(self, chars: Iterable[int], collect: bool = False,
+                 minimum: int = 0, expected: Any = None):
+        self.chars: FrozenSet[int] = frozenset(chars)
+        self.collect = collect
+        self.minimum = minimum
+        self.expected = expected
+        members = b"".join(re.escape(bytes([c])) for c in sorted(self.chars))
+        self.pattern = re.compile(b"[" + members + b"]*" if members else b"")
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        data = cursor.data
+        begin = cursor.end
+        end = self._scan(data, begin)
+        while end == len(data) and cursor.require(end - begin + 1):
+            data = cursor.data
+            end = self._scan(data, begin)
+        if end - begin < self.minimum:
+            if end == len(data):
+                return EndOfInput()
+            return Expected(self.expected, data[end])
+        result = list(data[begin:end]) if self.collect else None
+        return result, cursor.increment(end - begin), aux
+
+    def _scan(self, data: Any, begin: int) -> int:
+        # The pattern matches the empty string, so there is always a match.
+        m = self.pattern.match(data, begin)
+        return begin if m is None else m.end()
+
+    def __repr__(self):
+        return f"Span({self.expected!r}, collect={self.collect}, " \
+               f"minimum={self.minimum})"
+
+
+class Flush(Parser):
+    """Flushes the cursor and returns the selected data, mapped by the
+    optional `transfer` function."""
+    leaf = True
+
+    def __init__(self, transfer: Optional[Callable[[bytes], Any]] = None):
+        self.transfer = transfer
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        if self.transfer is None:
+            return cursor.content, cursor.flush(), aux
+        try:
+            return self.transfer(cursor.content), cursor.flush(), aux
+        except ValueError as e:
+            return Failure(str(e))
+
+    def __repr__(self):
+        return f"Flush({self.transfer!r})"
+
+
+class Push(Parser):
+    """Pushes `x` to the auxiliary stack."""
+    leaf = True
+
+    def __init__(self, x: Any):
+        self.x = x
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        if type(aux) is Stack:
+            return None, cursor, aux.push(self.x)
+        return None, cursor, aux + [self.x]
+
+    def __repr__(self):
+        return f"Push({self.x!r})"
+
+
+class Pop(Parser):
+    """Pops a value off the auxiliary stack, mapped by the optional
+    `transfer` function."""
+    leaf = True
+
+    def __init__(self, transfer: Optional[Callable[[Any], Any]] = None):
+        self.transfer = transfer
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        try:
+            if type(aux) is Stack:
+                x, rest = aux.top, aux.pop()
+            else:
+                x, rest = aux[-1], aux[:-1]
+            if self.transfer is not None:
+                x = self.transfer(x)
+            return x, cursor, rest
+        except Exception as e:
+            return Failure(str(e))
+
+    def __repr__(self):
+        return f"Pop({self.transfer!r})"
+
+
+class Memoize(Parser):
+    """Remembers the outcome of `p` for every position in the active
+    `Memo` table. Without a table `p` is run as is. Statistics are
+    reported under `name`, by default the type and id of `p`."""
+    def __init__(self, p: Parser, name: Optional[str] = None):
+        self.p = p
+        self.name = name or f"{type(p).__name__}@{id(p):x}"
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        memo = current_memo()
+        if memo is None:
+            return self.p(cursor, aux)
+
+        key = (id(self), cursor.begin, cursor.end)
+        entry = memo.lookup(self.name, key, lambda e: e[0] is aux)
+        if entry is not None:
+            _, result, failure = entry
+            return result if failure is None else failure
+
+        return Frame(self.p(cursor, aux),
+                     partial(self._store, memo, key, aux),
+                     partial(self._store_failure, memo, key, aux))
+
+    @staticmethod
+    def _store(memo: Memo, key: Hashable, aux_in: Any,
+               x: Any, cursor: Cursor, aux: Any):
+        result = (x, cursor, aux)
+        memo.store(key, (aux_in, result, None))
+        return result
+
+    @staticmethod
+    def _store_failure(memo: Memo, key: Hashable, aux_in: Any,
+                       failure: Failure):
+        memo.store(key, (aux_in, None, failure))
+        return failure
+
+    def __repr__(self):
+        return f"Memoize({self.p!r}, name={self.name!r})"
+
+
+EMPTY = 256
+"""Member of a `first_set` indicating that a parser may succeed without
+consuming input. It doubles as the index for the end of input in the
+dispatch table of `Choice`."""
+
+
+def first_set(p: Parser, encoding: str = "utf-8",
+              visiting: Optional[Set[int]] = None) \
+        -> Optional[FrozenSet[int]]:
+    """Returns the set of bytes that `p` may start with, including `EMPTY`
+    if `p` may succeed without consuming input. If we can't tell, for
+    instance for parsers created with the `parser` decorator, the result is
+    `None`."""
+    visiting = visiting or set()
+    if id(p) in visiting:
+        return None
+    visiting.add(id(p))
+    try:
+        return _first_set(p, encoding, visiting)
+    finally:
+        visiting.remove(id(p))
+
+
+def _first_set(p: Parser, encoding: str, visiting: Set[int]) \
+        -> Optional[FrozenSet[int]]:
+    if isinstance(p, (Value, Flush, Push, Pop)):
+        return frozenset([EMPTY])
+    if isinstance(p, (CharClass, Span)):
+        if isinstance(p, Span) and p.minimum == 0:
+            return p.chars | {EMPTY}
+        return p.chars
+    if isinstance(p, Literal):
+        return frozenset(p.x[:1] or [EMPTY])
+    if isinstance(p, TextLiteral):
+        return frozenset(p.x.encode(encoding)[:1] or [EMPTY])
+    if isinstance(p, TextOneOf):
+        return frozenset(ch.encode(encoding)[0] for ch in p.x)
+    if isinstance(p, Regex):
+        return p.first
+    if isinstance(p, Memoize):
+        return first_set(p.p, encoding, visiting)
+    if isinstance(p, Bind):
+        f = first_set(p.p, encoding, visiting)
+        return None if f is None or EMPTY in f else f
+    if isinstance(p, Many):
+        f = first_set(p.p, encoding, visiting)
+        return f if f is None or p.minimum > 0 else f | {EMPTY}
+    if isinstance(p, Choice):
+        result: Set[int] = set()
+        for q in p.parsers:
+            f = first_set(q, encoding, visiting)
+            if f is None:
+                return None
+            result |= f
+        return frozenset(result)
+    if isinstance(p, (Sequence, NamedSequence)):
+        parsers = p.parsers.values() if isinstance(p, NamedSequence) \
+            else p.parsers
+        result = set()
+        for q in parsers:
+            f = first_set(q, encoding, visiting)
+            if f is None:
+                return None
+            result |= f - {EMPTY}
+            if EMPTY not in f:
+                return frozenset(result)
+        return frozenset(result | {EMPTY})
+    # look through the instrumented function of a profiled parser
+    func = getattr(p.func, "__wrapped__", p.func)
+    target = getattr(func, "__self__", None)
+    if type(p) is Parser and isinstance(target, Parser):
+        return first_set(target, encoding, visiting)
+    return None
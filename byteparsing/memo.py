@@ -0,0 +1,109 @@
+"""
+Memoization
+===========
+
+Backtracking grammars may run the same parser on the same input many times.
+For instance, when the first alternative of a `choice` fails after having
+parsed an identifier, the second alternative may parse that same identifier
+again. A *packrat* parser avoids this by remembering the outcome of every
+parser at every position.
+
+Memoization in byteparsing is opt-in, in two ways. First, a grammar marks the
+parsers that are worth remembering with :py:func:`byteparsing.parsers.memoize`.
+Second, a `Memo` table is passed when parsing::
+
+    >>> memo = Memo(maxsize=4096)
+    >>> parse_bytes(foam_file, data, memo=memo)
+    >>> memo.stats()
+    {'foam_list_name': (2, 3), ...}
+
+Without a `Memo`, memoized parsers run as if they were never marked. The
+table holds at most `maxsize` entries, evicting the least recently used ones
+when it is full.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (
+    Any, Callable, Dict, Hashable, Iterator, Optional, Tuple)
+
+_active: ContextVar[Optional[Memo]] = ContextVar("memo", default=None)
+
+
+def current_memo() -> Optional[Memo]:
+    """Returns the memo table of the running parse, if any."""
+    return _active.get()
+
+
+class Memo:
+    """Size-bounded table with the outcomes of memoized parsers. Entries
+    are keyed by parser and cursor position; the value is the result or the
+    failure of that parser. If `maxsize` is `None` the table is unbounded.
+
+    Hits and misses are counted per parser, so that we can see which parts
+    of a grammar benefit from memoization."""
+    def __init__(self, maxsize: Optional[int] = 2**16):
+        self.maxsize = maxsize
+        self.table: OrderedDict[Hashable, Any] = OrderedDict()
+        self.counts: Dict[str, Tuple[int, int]] = {}
+
+    @property
+    def hits(self) -> int:
+        """Total number of hits."""
+        return sum(h for h, _ in self.counts.values())
+
+    @property
+    def misses(self) -> int:
+        """Total number of misses."""
+        return sum(m for _, m in self.counts.values())
+
+    def stats(self) -> Dict[str, Tuple[int, int]]:
+        """Returns a dictionary with `(hits, misses)` for each memoized
+        parser, sorted by number of hits."""
+        return dict(sorted(self.counts.items(), key=lambda kv: -kv[1][0]))
+
+    def lookup(self, name: str, key: Hashable,
+               valid: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Returns the stored entry for `key` or `None`. If `valid` is
+        given, entries for which it returns `False` don't count, and give
+        a miss."""
+        entry = self.table.get(key)
+        if entry is not None and valid is not None and not valid(entry):
+            entry = None
+        hits, misses = self.counts.get(name, (0, 0))
+        if entry is None:
+            self.counts[name] = (hits, misses + 1)
+        else:
+            self.counts[name] = (hits + 1, misses)
+            self.table.move_to_end(key)
+        return entry
+
+    def store(self, key: Hashable, entry: Any):
+        """Store an entry, evicting the oldest one if needed."""
+        self.table[key] = entry
+        if self.maxsize is not None and len(self.table) > self.maxsize:
+            self.table.popitem(last=False)
+
+    def clear(self):
+        """Clear the table, keeping the statistics."""
+        self.table.clear()
+
+    @contextmanager
+    def active(self) -> Iterator[Memo]:
+        """Use this table for the parsers run inside the `with` block. The
+        table is cleared on entry, since positions from a previous input are
+        meaningless."""
+        self.clear()
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+            self.clear()
+
+    def __repr__(self):
+        return f"Memo(maxsize={self.maxsize}, hits={self.hits}, " \
+               f"misses={self.misses})"
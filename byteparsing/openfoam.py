@@ -1,14 +1,21 @@
+import functools
+import re
+from typing import Any, Dict, Optional
+
 import numpy as np
 
+from .cursor import Cursor
+from .failure import Failure, Expected
+from .trampoline import parser
 from .parsers import (
     text_literal, text_end_by,
-    choice, sequence, named_sequence, flush, flush_decode,
-    many, push, pop, fail, value, some,
+    choice, sequence, named_sequence, flush, keep_left, between, lexeme,
+    many, many_char_0, fail, value, some,
     char, char_pred, Parser, integer, scientific_number, optional, whitespace,
-    quoted_string, check_size, with_config, using_config
+    quoted_string, check_size, with_config, using_config, memoize, regex
 )
-from .array import array
-# from .failure import Failure
+from .array import array, lazy_array
+from .profile import named
 
 
 def latin_char(c):
@@ -35,84 +42,210 @@ line_comment = sequence(
 )
 
 
+whitespace_and_comments = named(many_char_0(
+    choice(whitespace, block_comment, line_comment)),
+    "whitespace_and_comments")
+
+
 def tokenize(p: Parser) -> Parser:
     """Parses `p`, clearing surrounding whitespace and comments."""
-    return sequence(
-        p >> push,
-        many(choice(whitespace, block_comment, line_comment)),
-        pop())
+    return lexeme(p, skip=whitespace_and_comments)
 
 
-identifier = sequence(
-    flush(),
-    choice(ascii_underscore, ascii_alpha),
-    many(choice(ascii_underscore, ascii_alpha, ascii_num)),
-    flush_decode()
-)
+identifier = regex(
+    rb"[_A-Za-z][_A-Za-z0-9]*", bytes.decode,
+    first=b"_ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
+
+
+name_token = memoize(tokenize(identifier), "name_token")
+size_token = memoize(tokenize(integer), "size_token")
 
 
 def vector(p: Parser) -> Parser:
     """Parses a list of `p` delimited by parens."""
-    return sequence(
+    return between(
         tokenize(text_literal("(")),
-        many(tokenize(p)) >> push,
-        tokenize(text_literal(")")),
-        pop())
+        many(tokenize(p)),
+        tokenize(text_literal(")")))
 
 
-foam_numeric = tokenize(choice(scientific_number, vector(scientific_number)))
+foam_numeric = named(
+    tokenize(choice(scientific_number, vector(scientific_number))),
+    "foam_numeric")
 
-list_type = sequence(
+list_type = between(
     text_literal("List<"),
     choice(text_literal("scalar"),
            text_literal("vector"),
-           text_literal("symmTensor")) >> push,
-    text_literal(">"),
-    pop())
+           text_literal("symmTensor"),
+           text_literal("label")),
+    text_literal(">"))
+
+
+components = {b"scalar": 1, b"vector": 3, b"symmTensor": 6, b"label": 1}
+element_types = {
+    b"scalar": np.dtype(float), b"vector": np.dtype(float),
+    b"symmTensor": np.dtype(float), b"label": np.dtype(np.int32)}
+_nested_list_end = re.compile(rb"\)\s*\)")
+
+
+@functools.lru_cache(maxsize=None)
+def arch_types(arch: Optional[str]) -> Dict[bytes, np.dtype]:
+    """Element types of binary lists, according to the `arch` entry of the
+    header, for instance `"LSB;label=32;scalar=64"`. Missing items default
+    to these values. Data from `MSB` files keeps its byte order: arrays are
+    views with a big-endian dtype, not converted copies."""
+    items = dict(label="32", scalar="64")
+    order = "<"
+    for item in (arch or "").split(";"):
+        key, _, width = item.strip().partition("=")
+        if key == "MSB":
+            order = ">"
+        elif key in items:
+            items[key] = width
+    scalar = np.dtype(f"{order}f{int(items['scalar']) // 8}")
+    label = np.dtype(f"{order}i{int(items['label']) // 8}")
+    return {b"scalar": scalar, b"vector": scalar, b"symmTensor": scalar,
+            b"label": label}
+
+
+@functools.lru_cache(maxsize=None)
+def ascii_types(arch: Optional[str]) -> Dict[bytes, np.dtype]:
+    """Element types of ASCII lists: those of `arch_types`, in native byte
+    order."""
+    return {k: v.newbyteorder("=") for k, v in arch_types(arch).items()}
+
+
+def to_array(values: Any, dtype: np.dtype) -> np.ndarray:
+    """Converts `values`, numbers or their ASCII representation, to an
+    array of `dtype`. Integers are converted to 64 bits first and checked
+    against the range of `dtype`, since older versions of numpy silently
+    wrap values that don't fit. Raises `OverflowError` if they don't, or
+    `ValueError` if a value can't be converted."""
+    dtype = np.dtype(dtype)
+    if dtype.kind not in "iu":
+        return np.array(values, dtype=dtype)
+    result = np.array(values, dtype=np.int64)
+    info = np.iinfo(dtype)
+    if result.size and (result.min() < info.min or result.max() > info.max):
+        raise OverflowError(f"Value out of range for {dtype}.")
+    return result.astype(dtype, copy=False)
+
+
+def ascii_array(dtype: bytes, size: int,
+                types: Optional[Dict[bytes, np.dtype]] = None) -> Parser:
+    """Parses an ASCII list of `size` elements of type `dtype` in bulk,
+    returning a numpy array with the same shape as `binary_blob` would.
+    Instead of parsing number by number, we locate the closing paren and
+    convert the entire block at once. This parser fails if the block
+    doesn't contain the expected number of values, in which case the list
+    should be parsed the slow way. The element `types` are those given by
+    `ascii_types`."""
+    n = components.get(dtype)
+    element = (types or ascii_types(None)).get(dtype)
+    shape = (size,) if n is None or n == 1 else (size, n)
+
+    @parser
+    def ascii_array_p(c: Cursor, a: Any):
+        data = c.data
+        start = c.end
+        if n is None or element is None \
+                or start >= len(data) or data[start] != ord('('):
+            return Expected("ASCII list of " + repr(dtype))
+        # an empty list of vectors has no nested parens either
+        if n == 1 or size == 0:
+            end = data.find(b")", start + 1)
+            while end == -1 and c.require(len(data) - start + 1):
+                data = c.data
+                end = data.find(b")", start + 1)
+            if end == -1:
+                return Expected(")")
+            block = bytes(data[start + 1:end])
+        else:
+            m = _nested_list_end.search(data, start + 1)
+            while m is None and c.require(len(data) - start + 1):
+                data = c.data
+                m = _nested_list_end.search(data, start + 1)
+            if m is None:
+                return Expected(")")
+            end = m.end() - 1
+            block = bytes(data[start + 1:end])
+            if block.count(b"(") != size or block.count(b")") != size:
+                return Failure("Unexpected structure in ASCII list.")
+            block = block.replace(b"(", b" ").replace(b")", b" ")
+        tokens = block.split()
+        if len(tokens) != size * n:
+            return Failure(
+                f"Expected {size * n} values, got {len(tokens)}.")
+        try:
+            result = to_array(tokens, element).reshape(shape)
+        except (ValueError, OverflowError) as e:
+            return Failure(str(e))
+        return result, c.skip_to(end + 1), a
+
+    return ascii_array_p
+
+
+def foam_list_ascii(arch: Optional[str] = None) -> Parser:
+    """Parses an OpenFOAM list in ASCII format. If the type and size of the
+    list are given, the list is parsed into a numpy array using
+    `ascii_array`, with element types following from `arch`. Otherwise, or
+    if that fails, the result is a list of numbers or lists of numbers."""
+    types = ascii_types(arch)
+    entries = memoize(between(
+        tokenize(char('(')),
+        many(foam_numeric),
+        tokenize(char(')'))), "list_entries")
 
+    def ascii_blob(header):
+        data = choice(
+            tokenize(ascii_array(header["dtype"], header["size"], types)),
+            entries)
+        return data >> fmap(lambda x: dict(header, data=x))
 
-def foam_list_ascii() -> Parser:
-    """Parses an OpenFOAM list in ASCII format."""
-    entries = sequence(
-        tokenize(char('(')),
-        many(foam_numeric) >> push,
-        tokenize(char(')')),
-        pop())
     simple_list = named_sequence(
-        name=tokenize(identifier), data=entries)
+        name=name_token, data=entries)
     numbered_list = named_sequence(
-        name=tokenize(identifier), size=tokenize(integer), data=entries)
+        name=name_token, size=size_token, data=entries)
     full_list = named_sequence(
-        name=tokenize(identifier), dtype=tokenize(list_type),
-        size=tokenize(integer), data=entries)
+        name=name_token, dtype=tokenize(list_type),
+        size=size_token) >> ascii_blob
     return choice(simple_list, numbered_list, full_list)
 
 
-def binary_blob(header) -> Parser:
+def binary_blob(header, lazy: bool = False,
+                types: Optional[Dict[bytes, np.dtype]] = None) -> Parser:
     """Parses a binary blob to a numpy array. This is a helper function
-    to `foam_list_binary`."""
-    if header["dtype"] == b"scalar":
-        return sequence(
-            char('('), array(np.dtype(float), header["size"]) >> push,
-            tokenize(char(')')), pop())
-    if header["dtype"] == b"vector":
-        return sequence(
-            char('('), array(np.dtype(float), header["size"] * 3) >> push,
-            tokenize(char(')')), pop(lambda v: v.reshape([-1, 3])))
-    if header["dtype"] == b"symmTensor":
-        return sequence(
-            char('('), array(np.dtype(float), header["size"] * 6) >> push,
-            tokenize(char(')')), pop(lambda v: v.reshape([-1, 6])))
-    return fail("Unrecognized data type: " + header["dtype"].decode())
-
-
-def foam_list_binary() -> Parser:
+    to `foam_list_binary`. If `lazy` is `True`, the blob is skipped and the
+    result is a `LazyArray` handle instead. The element `types` are those
+    given by `arch_types`."""
+    n = components.get(header["dtype"])
+    if n is None:
+        return fail("Unrecognized data type: " + header["dtype"].decode())
+    size = header["size"]
+    element = (types or arch_types(None))[header["dtype"]]
+    if lazy:
+        shape = (size,) if n == 1 else (size, n)
+        return between(
+            char('('), lazy_array(element, shape),
+            tokenize(char(')')))
+    data = between(
+        char('('), array(element, size * n),
+        tokenize(char(')')))
+    if n == 1:
+        return data
+    return data >> fmap(lambda v: v.reshape([-1, n]))
+
+
+def foam_list_binary(lazy: bool = False, arch: Optional[str] = None) \
+        -> Parser:
     """Parses a binary OpenFoam list. Unlike the ASCII format the size of
-    the list is mandatory."""
+    the list is mandatory. The element types follow from `arch`."""
+    types = arch_types(arch)
     header = named_sequence(
-        name=tokenize(identifier), dtype=tokenize(list_type),
-        size=tokenize(integer))
-    return header >> binary_blob
+        name=name_token, dtype=tokenize(list_type),
+        size=size_token)
+    return header >> (lambda h: binary_blob(h, lazy, types))
 
 
 def foam_list_uniform() -> Parser:
@@ -121,23 +254,33 @@ def foam_list_uniform() -> Parser:
             data=foam_numeric)
 
 
+@functools.lru_cache(maxsize=None)
+def _foam_list_ascii(arch: Optional[str]) -> Parser:
+    return named(foam_list_ascii(arch), "foam_list_ascii")
+
+
+@functools.lru_cache(maxsize=None)
+def _foam_list_binary(lazy: bool, arch: Optional[str]) -> Parser:
+    return choice(foam_list_binary(lazy, arch), foam_list_uniform())
+
+
 @using_config
 def foam_list(config) -> Parser:
     """Based on the information in config, this parses either a binary
-    list or an ASCII list."""
+    list or an ASCII list. Binary lists are parsed to `LazyArray` handles
+    if the config has `lazy` set, and have the element types given by
+    `arch`."""
     if config.get("format", "ascii") == "ascii":
-        return foam_list_ascii()
-    else:
-        return choice(foam_list_binary(), foam_list_uniform())
+        return _foam_list_ascii(config.get("arch"))
+    return _foam_list_binary(config.get("lazy", False), config.get("arch"))
 
 
-dimensions = sequence(
+dimensions = named(between(
     tokenize(char('[')),
-    some(tokenize(integer)) >> check_size(7) >> push,
-    tokenize(char(']')),
-    pop())
+    some(tokenize(integer)) >> check_size(7),
+    tokenize(char(']'))), "dimensions")
 
-foam_value = Parser(None)
+foam_value = named(Parser(None), "foam_value")
 
 
 def handle_compound(x) -> Parser:
@@ -147,21 +290,21 @@ def handle_compound(x) -> Parser:
         return value([x["first"]] + x["rest"])
 
 
-foam_compound_value = named_sequence(
-    first=tokenize(identifier),
-    rest=many(foam_value)) >> handle_compound
+foam_compound_value = named(named_sequence(
+    first=name_token,
+    rest=many(foam_value)) >> handle_compound, "foam_compound_value")
 
 foam_value.func = tokenize(
-    choice(foam_numeric, quoted_string(), foam_list(),
+    choice(foam_numeric, quoted_string(), named(foam_list(), "foam_list"),
            dimensions, foam_compound_value)).func
 
-dictionary = Parser(None)
+dictionary = named(Parser(None), "dictionary")
 
-key_value_pair = named_sequence(
+key_value_pair = named(named_sequence(
     key=tokenize(identifier),
     value=choice(dictionary,
-                 sequence(foam_value >> push, tokenize(char(';')), pop()))
-)
+                 keep_left(foam_value, tokenize(char(';'))))
+), "key_value_pair")
 
 
 def key_value_pairs_to_dict(x):
@@ -172,12 +315,11 @@ def fmap(f):
     return lambda x: value(f(x))
 
 
-dictionary.func = sequence(
+dictionary.func = (between(
     tokenize(text_literal("{")),
-    many(key_value_pair) >> push,
-    tokenize(text_literal("}")),
-    pop(key_value_pairs_to_dict)
-).func
+    many(key_value_pair),
+    tokenize(text_literal("}"))
+) >> fmap(key_value_pairs_to_dict)).func
 
 
 @using_config
@@ -186,13 +328,55 @@ def set_config(header, config):
     return value(header)
 
 
-preamble = sequence(
+preamble = named(sequence(
     optional(whitespace),
     many(tokenize(choice(block_comment, line_comment))),
     named_sequence(
         name=tokenize(identifier),
-        content=tokenize(dictionary))) >> set_config
+        content=tokenize(dictionary))) >> set_config, "preamble")
+
+foam_file_body = named_sequence(
+    preamble=preamble,
+    data=some(key_value_pair) >> fmap(key_value_pairs_to_dict))
+
+foam_file = with_config(foam_file_body)
+
+lazy_foam_file = with_config(foam_file_body, lazy=True)
+"""Parses an OpenFOAM file like `foam_file`, but binary lists become
+`LazyArray` handles that are only read when accessed."""
+
+
+@using_config
+def foam_bare_list(dtype: bytes, config) -> Parser:
+    """Parses a list that makes up the entire content of a file, like
+    `cellProcAddressing`, rather than the value of an entry. The element
+    type `dtype` is not written in the file, so it has to be given."""
+    types = ascii_types(config.get("arch"))
+    shape = (-1,) if components[dtype] == 1 else (-1, components[dtype])
+
+    def convert(x):
+        try:
+            return value(to_array(x, types[dtype]).reshape(shape))
+        except (ValueError, OverflowError) as e:
+            return fail(str(e))
+
+    slow = between(
+        tokenize(char('(')),
+        many(foam_numeric),
+        tokenize(char(')'))) >> convert
+
+    def data(size):
+        if config.get("format", "ascii") == "ascii":
+            return choice(tokenize(ascii_array(dtype, size, types)), slow)
+        return binary_blob({"dtype": dtype, "size": size},
+                           config.get("lazy", False),
+                           arch_types(config.get("arch")))
+
+    return size_token >> data
+
 
-foam_file = with_config(named_sequence(
+label_list_file = with_config(named_sequence(
     preamble=preamble,
-    data=some(key_value_pair) >> fmap(key_value_pairs_to_dict)))
+    data=foam_bare_list(b"label")))
+"""Parses a file holding a list of labels, such as
+`processor*/constant/polyMesh/cellProcAddressing`."""
@@ -68,7 +68,18 @@ it at the end.
     ...     b"(1 2 3 4)")
     [1, 2, 3, 4]
 
-This is not the pretiest thing, but it works.
+This is not the pretiest thing, but it works. The auxiliary stack is a
+:py:class:`byteparsing.stack.Stack`, so that pushing and popping take
+constant time. For this particular case however, it is simpler and faster
+to use `between`, which doesn't need the auxiliary stack at all::
+
+    >>> parse_bytes(
+    ...     between(char('('), many(integer), char(')')),
+    ...     b"(1 2 3 4)")
+    [1, 2, 3, 4]
+
+Similarly, `keep_left` and `keep_middle` return the result of the first
+and second parser in a sequence.
 
 Config variable
 ~~~~~~~~~~~~~~~
@@ -106,87 +117,132 @@ Parsers
 """
 
 import logging
-from typing import Any, Union, List, Optional, Callable
+import mmap
+import re
+from typing import Any, BinaryIO, Iterator, Union, List, Optional, Callable
 
 import functools
 
 from .cursor import Cursor, Buffer
-from .failure import Failure, EndOfInput, Expected, MultipleFailures
+from .failure import Failure, Expected
 from .trampoline import Parser, parser
 from .decorator import decorator
+from .ir import (
+    Value, Sequence, NamedSequence, Choice, Many, Literal, TextLiteral,
+    TextOneOf, CharClass, Flush, Push, Pop, Memoize, Regex)
+from .memo import Memo
+from .stack import Stack
+from .stream import StreamBuffer, StreamCursor
 
 logger = logging.getLogger(__name__)
 
 
 def value(x) -> Parser:
     """Parses to value `x` without taking input."""
-    @parser
-    def g(cursor, aux):
-        return x, cursor, aux
-
-    return g
+    return Value(x)
 
 
-def parse_bytes(p: Parser, data: Buffer):
-    """Call parser `p` on `data` and returns result."""
+def parse_bytes(p: Parser, data: Buffer, memo: Optional[Memo] = None):
+    """Call parser `p` on `data` and returns result. If a `Memo` table is
+    given, parsers marked with `memoize` remember their outcome at every
+    position in the input."""
     cursor = Cursor.from_bytes(data)
-    result, _, _ = p(cursor, []).invoke()
+    if memo is None:
+        result, _, _ = p(cursor, Stack()).invoke()
+        return result
+
+    with memo.active():
+        result, _, _ = p(cursor, Stack()).invoke()
     return result
 
 
+def iter_parse(p: Parser, data: Union[Buffer, BinaryIO],
+               chunk_size: int = 2**16) -> Iterator[Any]:
+    """Parses `p` repeatedly, like `many(p)`, but yields the results one by
+    one instead of collecting them in a list. The cursor and auxiliary
+    stack are kept between items, and iteration stops when `p` fails. If
+    `data` is a file-like object, it is read in chunks of `chunk_size`
+    bytes, and input is released after every item.
+
+        >>> for x in iter_parse(tokenize(integer), b"1 2 3"):
+        ...     print(x)
+        1
+        2
+        3
+    """
+    if isinstance(data, (bytes, bytearray, mmap.mmap)):
+        cursor = Cursor.from_bytes(data)
+    else:
+        cursor = StreamCursor(StreamBuffer(data, chunk_size))
+    aux: Any = Stack()
+    while True:
+        try:
+            x, cursor, aux = p(cursor, aux).invoke()
+        except Failure:
+            return
+        if isinstance(cursor, StreamCursor):
+            cursor = cursor.commit()
+        yield x
+
+
 def sequence(first: Parser, *rest: Parser) -> Parser:
     """Parse `first`, then `sequence(*rest)`. The parser result
     is that of the last parser in the sequence."""
     if rest:
-        return first >> (lambda _: sequence(*rest))
+        return Sequence(first, *rest)
     else:
         return first
 
 
+def keep_left(first: Parser, *rest: Parser) -> Parser:
+    """Parses `first`, then `sequence(*rest)`. The parser result is that of
+    `first`."""
+    if rest:
+        return Sequence(first, *rest, keep=0)
+    else:
+        return first
+
+
+def keep_middle(first: Parser, second: Parser, *rest: Parser) -> Parser:
+    """Parses all arguments in order. The parser result is that of
+    `second`."""
+    return Sequence(first, second, *rest, keep=1)
+
+
+def between(open: Parser, p: Parser, close: Parser) -> Parser:
+    """Parses `p` enclosed by `open` and `close`, returning the result of
+    `p`."""
+    return Sequence(open, p, close, keep=1)
+
+
 def named_sequence(**kwargs: Parser) -> Parser:
     """Similar to `sequence`, this parses using all of the arguments in order.
     The result is now a dictionary where the elements are assigned using the
     result of each given parser."""
-    @parser
-    def g(c: Cursor, a: Any):
-        result = {}
-        for k, v in kwargs.items():
-            x, c, a = v(c, a).invoke()
-            if k[0] != "_":
-                result[k] = x
-        return result, c, a
-    return g
+    return NamedSequence(**kwargs)
 
 
-@parser
-def item(cursor: Cursor, aux: Any):
-    """Accept any token; fails at end of input."""
-    if cursor:
-        return cursor.at, cursor.increment(), aux
-    else:
-        raise EndOfInput()
+item = CharClass(range(256), "any byte")
+"""Accept any token; fails at end of input."""
 
 
 def choice(*ps: Parser) -> Parser:
     """Parses using the first parser in `ps` that succeeds."""
-    @parser
-    def g(cursor: Cursor, aux: Any):
-        failures = []
-        for p in ps:
-            try:
-                return p(cursor, aux).invoke()
-            except Failure as f:
-                failures.append(f)
-
-        raise MultipleFailures(*failures)
-    return g
+    return Choice(*ps)
+
+
+def memoize(p: Parser, name: Optional[str] = None) -> Parser:
+    """Marks `p` for memoization. When parsing with a `Memo` table, the
+    outcome of `p` is stored for every position where it is tried; `name`
+    is used to report hit/miss statistics."""
+    return Memoize(p, name)
 
 
 def fail(msg: str) -> Parser:
     """A parser that always fails with the given message."""
     @parser
     def g(cursor: Cursor, aux: Any):
-        raise Failure(msg)
+        return Failure(msg)
     return g
 
 
@@ -195,34 +251,35 @@ def optional(p: Parser, default=None):
     return choice(p, value(default))
 
 
-def pop(transfer=lambda x: x):
+def pop(transfer: Optional[Callable[[Any], Any]] = None):
     """Pops a value off the auxiliary stack. The result may be transformed
     by a `transfer` function, which defaults to the identity function."""
-    @parser
-    def g(c: Cursor, a: Any):
-        try:
-            return transfer(a[-1]), c, a[:-1]
-        except Exception as e:
-            raise Failure(str(e))
-    return g
+    return Pop(transfer)
 
 
 def push(x: Any):
     """Pushes a value to the auxiliary stack."""
-    @parser
-    def g(c: Cursor, a: List[Any]):
-        return None, c, a + [x]
-    return g
+    return Push(x)
 
 
 def set_aux(x: Any):
-    """Replace the entire auxiliary stack. Not commonly used."""
+    """Replace the entire auxiliary stack. Not commonly used. A `list` is
+    converted to a `Stack`."""
+    if isinstance(x, list):
+        x = Stack(x)
+
     @parser
     def g(c: Cursor, a: Any):
         return None, c, x
     return g
 
 
+@parser
+def position(c: Cursor, a: Any):
+    """Returns the end location of the cursor, without taking input."""
+    return c.end, c, a
+
+
 def get_aux():
     """Get the entire auxiliary stack. Not commonly used."""
     @parser
@@ -236,16 +293,10 @@ def ignore(p: Parser):
     return get_aux() >> (lambda a: sequence(p, set_aux(a)))
 
 
-def flush(transfer=lambda x: x):
+def flush(transfer: Optional[Callable[[bytes], Any]] = None):
     """Flush the cursor and return the underlying data. The return
     value can be mapped by the optional `transfer` function."""
-    @parser
-    def g(c: Cursor, a: Any):
-        try:
-            return transfer(c.content), c.flush(), a
-        except ValueError as e:
-            raise Failure(str(e))
-    return g
+    return Flush(transfer)
 
 
 def flush_decode():
@@ -259,35 +310,21 @@ def flush_decode():
 
 def many(p: Parser, init: Optional[List[Any]] = None) -> Parser:
     """Parse `p` any number of times."""
-    @parser
-    def g(c: Cursor, a: Any):
-        try:
-            result = init or []
-            while True:
-                x, c, a = p(c, a).invoke()
-                result.append(x)
-        except Failure:
-            return result, c, a
-    return g
+    return Many(p, init)
 
 
 def some(p: Parser) -> Parser:
     """Parse `p` one or more times."""
-    return p >> (lambda x: many(p, [x]))
+    return Many(p, minimum=1)
 
 
 def many_char_0(p: Parser) -> Parser:
-    @parser
-    def g(c: Cursor, a: Any):
-        try:
-            while True:
-                _, c, a = p(c, a).invoke()
-        except Failure:
-            return None, c, a
-    return g
+    """Parses `p` zero or more times; doesn't return a value, just
+    moves the cursor for later flushing."""
+    return Many(p, collect=False)
 
 
-def many_char(p: Parser, transfer=lambda x: x) -> Parser:
+def many_char(p: Parser, transfer=None) -> Parser:
     """Parse `p` zero or more times, returns the string."""
     return sequence(flush(), many_char_0(p), flush(transfer))
 
@@ -299,12 +336,18 @@ def sep_by(p: Parser, sep: Parser) -> Parser:
 
 
 def text_end_by(x: str) -> Parser:
+    """Parses text up to the string `x`. Returns the decoded text, and moves
+    the cursor past `x`."""
     @parser
     def g(c: Cursor, a: Any):
         y = x.encode(c.encoding)
-        new_cursor = c.find(y)
-        result = new_cursor.content_str
-        return result, new_cursor.increment(len(y)).flush(), a
+        s = c.scanner()
+        if not s.find(y):
+            return Expected(x)
+        result = s.flush().decode(c.encoding)
+        s.advance(len(y))
+        s.flush()
+        return result, s.cursor(), a
     return g
 
 
@@ -321,21 +364,14 @@ def some_char_0(p: Parser) -> Parser:
     return sequence(p, many_char_0(p))
 
 
-def some_char(p: Parser, transfer=lambda x: x) -> Parser:
+def some_char(p: Parser, transfer=None) -> Parser:
     """Parses `p` one or more times."""
     return sequence(flush(), some_char_0(p), flush(transfer))
 
 
 def char_pred(pred: Callable[[int], bool]) -> Parser:
     """Parses a single character passing a given predicate."""
-    def f(x):
-        if pred(x):
-            return value(x)
-        else:
-            raise Failure(f"Character '{chr(x)}' fails predicate"
-                          " `{pred.__name__}`")
-
-    return item >> f
+    return CharClass(filter(pred, range(256)), pred.__name__)
 
 
 def char(c: Union[str, int]) -> Parser:
@@ -343,42 +379,45 @@ def char(c: Union[str, int]) -> Parser:
     if isinstance(c, str):
         c = ord(c)
 
-    def f(x):
-        if x == c:
-            return value(c)
-        else:
-            raise Expected(c, x)
-
-    return item >> f
+    return CharClass((c,), c)
 
 
 def literal(x: bytes) -> Parser:
     """Parses the exact sequence of bytes given in `x`."""
-    @parser
-    def g(c: Cursor, a: Any):
-        if c.look_ahead(len(x)) == x:
-            return x, c.increment(len(x)), a
-        else:
-            raise Expected(x)
-    return g
+    return Literal(x)
+
+
+def regex(pattern: Union[bytes, re.Pattern],
+          transfer: Optional[Callable[[bytes], Any]] = None,
+          first: Optional[bytes] = None) -> Parser:
+    """Matches a regular expression at the current position in a single
+    step. The `pattern` should be a `bytes` pattern (or one compiled from
+    `bytes`); it is matched directly on the underlying buffer, which may
+    also be a `bytearray` or `mmap`. The matched data is returned, mapped by
+    the optional `transfer` function. Similar to `flush`, the cursor is left
+    flushed at the end of the match.
+
+        >>> parse_bytes(regex(rb"[0-9]+", int), b"42abc")
+        42
+
+    If given, `first` lists the bytes that a match may start with; this
+    lets `choice` skip the pattern where it cannot match. Leave it out
+    for patterns that may match the empty string.
+    """
+    if not isinstance(pattern, re.Pattern):
+        pattern = re.compile(pattern)
+    return Regex(pattern, transfer, first)
 
 
 def text_literal(x: str) -> Parser:
     """Parses the contents of `x` encoded by the encoding given in the
     cursor."""
-    @parser
-    def g(c: Cursor, a: Any):
-        return literal(x.encode(c.encoding))(c, a)
-    return g
+    return TextLiteral(x)
 
 
 def text_one_of(x: str) -> Parser:
     """Parses any of the characters in `x`."""
-    @parser
-    def g(c: Cursor, a: Any):
-        options = [literal(ch.encode(c.encoding)) for ch in x]
-        return choice(*options)(c, a)
-    return g
+    return TextOneOf(x)
 
 
 def satisfies(p: Parser, pred) -> Parser:
@@ -392,52 +431,40 @@ def satisfies(p: Parser, pred) -> Parser:
 
 
 def byte_one_of(x: bytes) -> Parser:
-    return satisfies(item, lambda y: y in x)
+    """Parses any of the characters in `x`."""
+    return CharClass(x, x)
 
 
 def byte_none_of(x: bytes) -> Parser:
     """Parses none of the characters in `x`."""
-    return satisfies(item, lambda y: y not in x)
+    return CharClass(set(range(256)) - set(x), f"none of {x!r}")
 
 
 def repeat_n(p: Parser, n: int) -> Parser:
-    @parser
-    def repeated(c: Cursor, a: Any):
-        result = []
-        for i in range(n):
-            x, c, a = p(c, a).invoke()
-            result.append(x)
-        return result, c, a
-    return repeated
+    """Parses `p` exactly `n` times. Returns a list of results."""
+    return Many(p, minimum=n, maximum=n)
 
 
-whitespace = some_char(text_one_of(" \t\n"))
+whitespace = regex(rb"[ \t\n]+", first=b" \t\n")
+_optional_whitespace = optional(whitespace)
 eol = choice(text_literal("\n"), text_literal("\n\r"))
 ascii_alpha = char_pred(lambda c: 64 < c < 91 or 96 < c < 123)
 ascii_num = char_pred(lambda c: 48 <= c < 58)
 ascii_alpha_num = choice(ascii_alpha, ascii_num)
 ascii_underscore = char(95)
 
-integer = sequence(
-    flush(),
-    optional(text_literal("-")),
-    some_char_0(text_one_of("0123456789")),
-    flush(int))
+integer = regex(rb"-?[0-9]+", int, first=b"-0123456789")
 
 
-def to_number(s: str) -> Union[int, float]:
+def to_number(s: Union[str, bytes]) -> Union[int, float]:
     try:
         return int(s)
     except ValueError:
         return float(s)
 
 
-scientific_number = sequence(
-    flush(),
-    optional(text_literal("-")),
-    ascii_num,
-    many_char_0(choice(ascii_num, text_one_of(".e-"))),
-    flush(to_number))
+scientific_number = regex(
+    rb"-?[0-9][0-9.e-]*", to_number, first=b"-0123456789")
 
 
 def check_size(n: int) -> Callable:
@@ -449,18 +476,27 @@ def check_size(n: int) -> Callable:
     return f
 
 
+def lexeme(p: Parser, skip: Optional[Parser] = None) -> Parser:
+    """Parses `p`, then skips anything matched by `skip`, by default
+    optional whitespace. The result is that of `p`."""
+    return keep_left(p, skip or _optional_whitespace)
+
+
 def tokenize(p: Parser) -> Parser:
     """Parses `p`, clearing surrounding whitespace."""
-    return sequence(
-        p >> push,
-        optional(whitespace), pop())
+    return lexeme(p)
 
 
 def with_config(p: Parser, **kwargs) -> Parser:
     """Creates a config object at the bottom of the auxiliary stack.
-    The config will be a empty dictionary. The resulting parser should
+    The config will be a new dictionary holding `kwargs` for every parse,
+    so that concurrent parses don't share it. The resulting parser should
     be the outer-most parser being used."""
-    return sequence(set_aux([dict(kwargs)]), p)
+    @parser
+    def new_config(c: Cursor, a: Any):
+        return None, c, Stack([dict(kwargs)])
+
+    return sequence(new_config, p)
 
 
 @decorator
@@ -0,0 +1,189 @@
+"""
+Profiling
+=========
+
+A grammar is a graph of small parsers, and the trampoline runs all of them
+from the same loop, so a regular profiler only shows time spent in anonymous
+closures. Instead, we can give names to the parsers we are interested in,
+and profile those::
+
+    >>> number = named(tokenize(scientific_number), "number")
+    >>> with Profile() as prof:
+    ...     parse_bytes(many(number), data)
+    >>> print(prof.report())
+    name          calls  failures  cumulative      self      bytes  backtracked
+    number         1001         1     0.0123s   0.0123s      12345            0
+
+For every named parser the profile records the number of calls and
+failures, the cumulative time (including time spent in named parsers that
+it calls, counted once for recursive parsers) and self time, the number of
+bytes consumed by successful calls, and the number of bytes that failing
+calls consumed through named parsers before giving up, which is the input
+that was parsed in vain. `Profile.collapsed` gives the self time per stack of
+named parsers in the collapsed-stack format read by `flamegraph.pl` and
+speedscope.
+
+Naming a parser only registers it; it doesn't change the parser. While a
+`Profile` is active, the named parsers are replaced by instrumented
+versions, and restored afterwards. So when not profiling, the overhead is
+zero. Profiling is global: parses in other threads are profiled as well,
+and only one `Profile` can be active at a time.
+
+The grammar in :py:mod:`byteparsing.openfoam` names its main parsers.
+"""
+
+from __future__ import annotations
+
+import time
+import weakref
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .cursor import Cursor
+from .failure import Failure
+from .trampoline import Parser, Frame, Call
+
+_named: weakref.WeakValueDictionary[int, Parser] = \
+    weakref.WeakValueDictionary()
+_active: Optional[Profile] = None
+
+
+def named(p: Parser, name: str) -> Parser:
+    """Gives `p` a name for profiling, and returns it."""
+    p.profile_name = name
+    _named[id(p)] = p
+    return p
+
+
+@dataclass
+class ParserStats:
+    """Statistics for one named parser."""
+    calls: int = 0
+    failures: int = 0
+    cumulative: float = 0.0
+    self_time: float = 0.0
+    bytes: int = 0
+    backtracked: int = 0
+
+
+class _Entry:
+    """A running call to a named parser."""
+    __slots__ = ("name", "start", "t0", "child_time", "furthest", "path")
+
+    def __init__(self, name: str, start: int, path: Tuple[str, ...]):
+        self.name = name
+        self.start = start
+        self.t0 = time.perf_counter()
+        self.child_time = 0.0
+        self.furthest = start
+        self.path = path
+
+
+class Profile:
+    """Records statistics for all named parsers while active; use it as a
+    context manager. See module documentation."""
+    def __init__(self):
+        self.stats: Dict[str, ParserStats] = {}
+        self.stacks: Dict[Tuple[str, ...], float] = {}
+        self._stack: List[_Entry] = []
+        self._saved: List[Tuple[Parser, Any, Optional[bool]]] = []
+
+    def __enter__(self) -> Profile:
+        global _active
+        if _active is not None:
+            raise RuntimeError("Another profile is already active.")
+        _active = self
+        self._stack = []
+        for p in list(_named.values()):
+            func, name = p.func, p.profile_name
+            if func is None or name is None:
+                continue
+            self._saved.append((p, func, p.__dict__.get("leaf")))
+            instrumented = partial(self._call, name, func)
+            instrumented.__wrapped__ = func  # type: ignore
+            p.func = instrumented
+            p.leaf = False
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        for p, func, leaf in self._saved:
+            p.func = func
+            if leaf is None:
+                del p.leaf
+            else:
+                p.leaf = leaf
+        self._saved = []
+        self._stack = []
+        _active = None
+
+    def _call(self, name: str, func: Callable, cursor: Cursor, aux: Any):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = ParserStats()
+        stats.calls += 1
+        path = (self._stack[-1].path if self._stack else ()) + (name,)
+        entry = _Entry(name, cursor.end, path)
+        self._stack.append(entry)
+        return Frame(Call(func, cursor, aux),
+                     partial(self._success, entry),
+                     partial(self._failure, entry))
+
+    def _finish(self, entry: _Entry, end: int) -> ParserStats:
+        # Frames complete in stack order; an exception other than a
+        # `Failure` may leave entries that never complete.
+        while self._stack and self._stack.pop() is not entry:
+            pass
+        elapsed = time.perf_counter() - entry.t0
+        stats = self.stats[entry.name]
+        stats.self_time += elapsed - entry.child_time
+        self.stacks[entry.path] = self.stacks.get(entry.path, 0.0) \
+            + elapsed - entry.child_time
+        if entry.name not in entry.path[:-1]:
+            stats.cumulative += elapsed
+        if self._stack:
+            parent = self._stack[-1]
+            parent.child_time += elapsed
+            parent.furthest = max(parent.furthest, entry.furthest, end)
+        return stats
+
+    def _success(self, entry: _Entry, x: Any, cursor: Cursor, aux: Any):
+        stats = self._finish(entry, cursor.end)
+        stats.bytes += max(0, cursor.end - entry.start)
+        return x, cursor, aux
+
+    def _failure(self, entry: _Entry, failure: Failure):
+        stats = self._finish(entry, entry.start)
+        stats.failures += 1
+        stats.backtracked += max(0, entry.furthest - entry.start)
+        return failure
+
+    def sorted(self, key: str = "cumulative") \
+            -> List[Tuple[str, ParserStats]]:
+        """The statistics per parser, sorted by `key` (an attribute of
+        `ParserStats`) in descending order."""
+        return sorted(self.stats.items(),
+                      key=lambda kv: getattr(kv[1], key), reverse=True)
+
+    def report(self, key: str = "cumulative", limit: Optional[int] = None) \
+            -> str:
+        """A table of the statistics, sorted by `key`."""
+        rows = self.sorted(key)[:limit]
+        width = max([len(name) for name, _ in rows] + [4])
+        lines = [f"{'name':<{width}} {'calls':>9} {'failures':>9} "
+                 f"{'cumulative':>11} {'self':>10} {'bytes':>11} "
+                 f"{'backtracked':>11}"]
+        for name, s in rows:
+            lines.append(
+                f"{name:<{width}} {s.calls:>9} {s.failures:>9} "
+                f"{s.cumulative:>10.4f}s {s.self_time:>9.4f}s "
+                f"{s.bytes:>11} {s.backtracked:>11}")
+        return "\n".join(lines)
+
+    def collapsed(self) -> str:
+        """Self time per stack of named parsers, in microseconds, in the
+        collapsed-stack format used by flame graph tools."""
+        return "\n".join(
+            f"{';'.join(path)} {round(t * 1e6)}"
+            for path, t in sorted(self.stacks.items())) + "\n"
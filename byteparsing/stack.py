@@ -0,0 +1,111 @@
+"""
+Auxiliary stack
+===============
+
+The auxiliary stack is threaded through every parser, and `tokenize` pushes
+and pops a value for every token it parses. If the stack were a `list`, each
+of these operations would copy the entire list. Instead, the stack is a
+persistent linked list: pushing a value creates a single new cell pointing
+to the old stack, and popping returns the cell below. Old versions of the
+stack remain valid, which is exactly what a backtracking parser needs.
+
+For compatibility with parsers that treat the stack as a list, a `Stack`
+supports the most common list operations::
+
+    >>> s = Stack([{"format": "ascii"}])
+    >>> s = s + [1]
+    >>> s[-1], s[0], list(s[:-1])
+    (1, {'format': 'ascii'}, [{'format': 'ascii'}])
+
+Access to the top and the bottom of the stack, where the config created by
+:py:func:`byteparsing.parsers.with_config` lives, takes constant time.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Iterable, Iterator, List
+
+
+class Stack:
+    """Persistent stack. `Stack(items)` creates a stack with the last of
+    `items` on top."""
+    __slots__ = ("top", "rest", "size", "bottom")
+    __hash__ = None  # type: ignore
+
+    def __init__(self, items: Iterable[Any] = ()):
+        self.top: Any = None
+        self.rest: Any = None
+        self.size = 0
+        self.bottom: Any = None
+        items = list(items)
+        if items:
+            rest = Stack()
+            for x in items[:-1]:
+                rest = rest.push(x)
+            self.top = items[-1]
+            self.rest = rest
+            self.size = len(items)
+            self.bottom = items[0]
+
+    def push(self, x: Any) -> Stack:
+        """Returns a new stack with `x` on top."""
+        s = Stack.__new__(Stack)
+        s.top = x
+        s.rest = self
+        s.size = self.size + 1
+        s.bottom = self.bottom if self.size else x
+        return s
+
+    def pop(self) -> Stack:
+        """Returns the stack without its top element."""
+        if not self.size:
+            raise IndexError("pop from empty stack")
+        return self.rest
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterates from the bottom to the top of the stack."""
+        return reversed(self._top_down())
+
+    def _top_down(self) -> List[Any]:
+        items = []
+        s = self
+        while s.size:
+            items.append(s.top)
+            s = s.rest
+        return items
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            if i == slice(None, -1, None):
+                return self.pop() if self.size else self
+            return Stack(list(self)[i])
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("stack index out of range")
+        if i == 0:
+            return self.bottom
+        s = self
+        for _ in range(self.size - 1 - i):
+            s = s.rest
+        return s.top
+
+    def __add__(self, other: Iterable[Any]) -> Stack:
+        s = self
+        for x in other:
+            s = s.push(x)
+        return s
+
+    def __eq__(self, other):
+        if isinstance(other, (Stack, list, tuple)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Stack({list(self)!r})"
@@ -0,0 +1,290 @@
+"""
+Streaming input
+===============
+
+`parse_bytes` needs the entire input in memory, or at least mapped into
+memory. This rules out pipes, sockets, compressed streams and files that are
+still being written. With `parse_io` a parser reads from a file-like object
+instead::
+
+    >>> with open("data.txt", "rb") as f:
+    ...     parse_io(many(keep_left(record, commit)), f)
+
+The input is kept in a buffer of chunks read from the file. Every cursor
+keeps at least `lookahead` bytes of input available beyond its end location,
+reading more chunks when needed. Primitives that need more than that, like
+a regular expression that matches up to the end of the buffer, or a binary
+array, read as much as they need. A regular expression that fails to match
+reads on up to `Regex.window` bytes before giving up, so that a short
+lookahead doesn't turn into a missed match.
+
+Without further measures the buffer would grow to hold the entire input,
+since a parser may always backtrack. The `commit` parser marks a point
+beyond which the parser will not backtrack: everything before the current
+selection is released. Memory use is then bounded by the largest record
+between two commit points, plus the lookahead.
+
+Committing renumbers the positions in the buffer, so cursors from before the
+commit can no longer be used; trying to do so raises a `Failure`. For the
+same reason, committing clears the active `Memo` table. Results of parsers
+that run on a stream never keep views into the buffer: `array` returns a
+copy.
+
+Asynchronous streams
+--------------------
+
+`parse_stream` parses from an `asyncio.StreamReader`. The parser runs in a
+worker thread, so that the event loop stays responsive; whenever the parser
+needs more input, the thread waits for `reader.read` to complete on the
+event loop. Since the thread is occupied for as long as the stream lasts,
+including the time spent waiting for input, every call gets a thread of its
+own, unless an `executor` is given. In particular, the default executor of
+the loop is not used, so that many open streams can't starve it. Input is
+only read as the parser asks for it, so a slow parser lets the reader's
+buffer fill up, which pauses the transport: the usual asyncio
+backpressure.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Optional, Protocol
+
+from .cursor import Cursor, Scanner
+from .failure import Failure
+from .memo import Memo, current_memo
+from .stack import Stack
+from .trampoline import Parser, parser
+
+
+class Source(Protocol):
+    """File-like object that we can read bytes from."""
+    def read(self, n: int) -> bytes:
+        ...
+
+
+class StreamBuffer:
+    """Buffer of chunks read from the file-like object `source`. Position
+    zero in `buffer` corresponds to position `offset` in the input."""
+    def __init__(self, source: Source, chunk_size: int = 2**16,
+                 lookahead: Optional[int] = None):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.lookahead = max(1, chunk_size if lookahead is None
+                             else lookahead)
+        self.buffer = bytearray()
+        self.offset = 0
+        self.generation = 0
+        self.eof = False
+
+    def fill(self, n: int) -> bool:
+        """Read chunks until the buffer holds at least `n` bytes or the
+        input is exhausted. Returns `True` if the buffer holds `n` bytes."""
+        while len(self.buffer) < n and not self.eof:
+            size = max(self.chunk_size, n - len(self.buffer))
+            chunk = self.source.read(size)
+            if not chunk:
+                self.eof = True
+            else:
+                self.buffer += chunk
+        return len(self.buffer) >= n
+
+    def release(self, n: int):
+        """Release the first `n` bytes of the buffer. This invalidates all
+        existing cursors."""
+        del self.buffer[:n]
+        self.offset += n
+        self.generation += 1
+
+
+class StreamCursor(Cursor):
+    """A `Cursor` on a `StreamBuffer`. The `data` attribute is the buffer
+    itself, filled up to the lookahead on every access."""
+    __slots__ = ("stream", "generation")
+    volatile = True
+
+    def __init__(self, stream: StreamBuffer, begin: int = 0, end: int = 0,
+                 encoding: str = "utf-8"):
+        self.stream = stream
+        self.generation = stream.generation
+        self.begin = begin
+        self.end = end
+        self.encoding = encoding
+
+    @property  # type: ignore
+    def data(self):
+        stream = self.stream
+        if self.generation != stream.generation:
+            raise Failure("Cannot backtrack beyond a commit point.")
+        if self.end + stream.lookahead > len(stream.buffer):
+            stream.fill(self.end + stream.lookahead)
+        return stream.buffer
+
+    @property
+    def position(self) -> int:
+        """End location in the input as a whole."""
+        return self.stream.offset + self.end
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.stream is other.stream \
+            and self.generation == other.generation \
+            and self.begin == other.begin and self.end == other.end \
+            and self.encoding == other.encoding
+
+    def __repr__(self):
+        return f"StreamCursor(offset={self.stream.offset}, " \
+               f"begin={self.begin}, end={self.end}, " \
+               f"encoding={self.encoding!r})"
+
+    @property
+    def content(self):
+        return bytes(self.data[self.begin:self.end])
+
+    def look_ahead(self, n: int = 1):
+        self.require(n)
+        return bytes(self.data[self.end:self.end+n])
+
+    def increment(self, n: int = 1):
+        return StreamCursor(self.stream, self.begin, self.end+n, self.encoding)
+
+    def flush(self):
+        return StreamCursor(self.stream, self.end, self.end, self.encoding)
+
+    def skip_to(self, end: int):
+        return StreamCursor(self.stream, end, end, self.encoding)
+
+    def require(self, n: int) -> bool:
+        self.data
+        return self.stream.fill(self.end + n)
+
+    def find(self, x: bytes):
+        s = self.scanner()
+        end = s.end if s.find(x) else -1
+        return StreamCursor(self.stream, self.begin, end, self.encoding)
+
+    def scanner(self):
+        return StreamScanner(self)
+
+    def commit(self) -> StreamCursor:
+        """Release the input before the begin location, returning a cursor
+        that is valid after the release."""
+        self.data
+        begin = self.begin
+        self.stream.release(begin)
+        return StreamCursor(
+            self.stream, 0, self.end - begin, self.encoding)
+
+
+class StreamScanner(Scanner):
+    """`Scanner` on a `StreamCursor`, reading more input when a search
+    reaches the end of the buffer."""
+    __slots__ = ("stream",)
+
+    def __init__(self, cursor: StreamCursor):
+        super().__init__(cursor.data, cursor.begin, cursor.end,
+                         cursor.encoding)
+        self.stream = cursor.stream
+
+    def __bool__(self):
+        return self.end < len(self.data) or self.stream.fill(self.end + 1)
+
+    def find(self, x: bytes) -> bool:
+        start = self.end
+        i = self.data.find(x, start)
+        while i < 0 and not self.stream.eof:
+            start = max(start, len(self.data) - len(x) + 1)
+            self.stream.fill(len(self.data) + 1)
+            i = self.data.find(x, start)
+        if i < 0:
+            return False
+        self.end = i
+        return True
+
+    def flush(self) -> bytes:
+        return bytes(super().flush())
+
+    def cursor(self) -> Cursor:
+        return StreamCursor(self.stream, self.begin, self.end, self.encoding)
+
+
+@parser
+def commit(cursor: Cursor, aux: Any):
+    """Marks a point beyond which the parser will not backtrack, so that
+    the input before the current selection can be released. On cursors that
+    are not streaming, this does nothing."""
+    if isinstance(cursor, StreamCursor):
+        cursor = cursor.commit()
+        memo = current_memo()
+        if memo is not None:
+            memo.clear()
+    return None, cursor, aux
+
+
+def parse_io(p: Parser, source: Source, chunk_size: int = 2**16,
+             lookahead: Optional[int] = None, memo: Optional[Memo] = None):
+    """Call parser `p` on input read from the file-like object `source`,
+    and return the result. The input is read in chunks of `chunk_size`
+    bytes; see the module documentation for the use of `lookahead`."""
+    cursor = StreamCursor(StreamBuffer(source, chunk_size, lookahead))
+    if memo is None:
+        result, _, _ = p(cursor, Stack()).invoke()
+        return result
+
+    with memo.active():
+        result, _, _ = p(cursor, Stack()).invoke()
+    return result
+
+
+class AsyncSource:
+    """File-like object reading from the `asyncio.StreamReader` `reader`,
+    for use in a thread other than the one running the event loop `loop`.
+    """
+    def __init__(self, reader: asyncio.StreamReader,
+                 loop: asyncio.AbstractEventLoop):
+        self.reader = reader
+        self.loop = loop
+        self.cancelled = False
+        self._pending: Optional[Future] = None
+
+    def read(self, n: int = -1) -> bytes:
+        if self.cancelled:
+            raise asyncio.CancelledError()
+        self._pending = asyncio.run_coroutine_threadsafe(
+            self.reader.read(n), self.loop)
+        try:
+            return self._pending.result()
+        finally:
+            self._pending = None
+
+    def cancel(self):
+        """Makes the current and all later reads raise `CancelledError`."""
+        self.cancelled = True
+        pending = self._pending
+        if pending is not None:
+            pending.cancel()
+
+
+async def parse_stream(p: Parser, reader: asyncio.StreamReader,
+                       chunk_size: int = 2**16,
+                       lookahead: Optional[int] = None,
+                       memo: Optional[Memo] = None,
+                       executor: Optional[Executor] = None):
+    """Call parser `p` on input from `reader`, like `parse_io`, and return
+    the result. The parser runs in `executor`, or else in a thread of its
+    own. See module documentation."""
+    loop = asyncio.get_running_loop()
+    source = AsyncSource(reader, loop)
+    pool = executor or ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="parse_stream")
+    try:
+        return await loop.run_in_executor(
+            pool, parse_io, p, source, chunk_size, lookahead, memo)
+    except asyncio.CancelledError:
+        source.cancel()
+        raise
+    finally:
+        if executor is None:
+            pool.shutdown(wait=False)
@@ -7,15 +7,31 @@ A trampolined function returns either another `Trampoline` object or
 some result. If we get a `Trampoline` object, the loop continues. This
 technique allows for the expression of tail-recursive functions without
 running into stack overflow errors.
+
+Calls that are not in tail position are expressed with a `Frame`: it holds a
+trampoline to run, together with continuations for when that trampoline
+succeeds or fails. Instead of nesting a Python call, the loop in
+`Trampoline.invoke` pushes the frame onto an explicit stack, runs the inner
+trampoline and then pops the frame to continue. All the work is done from a
+single Python stack frame, so the depth of nesting is only limited by the
+available memory.
+
+A parser signals failure either by raising a `Failure` or, more cheaply, by
+returning the `Failure` object instead of a result. The built-in primitives
+do the latter, so backtracking in the hot path does not involve Python
+exceptions. `Trampoline.invoke` only raises when a failure is not handled by
+any frame, which normally happens at the `parse_bytes` boundary.
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Tuple, Callable, Union, Optional
+from dataclasses import dataclass, field
+from typing import Any, Tuple, Callable, Union, Optional, List, cast
 
 from .cursor import Cursor
 from .decorator import decorator
+from .failure import Failure
+from .stack import Stack
 
 
 class Trampoline:
@@ -26,11 +42,76 @@ class Trampoline:
         raise NotImplementedError()
 
     def invoke(self):
-        """Invoke the trampoline."""
-        result = self
-        while isinstance(result, Trampoline):
-            result = result()
-        return result
+        """Invoke the trampoline. A `Failure`, returned or raised anywhere,
+        unwinds the stack of frames to the nearest frame that has a failure
+        handler. If there is none, the failure is raised."""
+        stack: List[Frame] = []
+        result: Any = self
+        while True:
+            try:
+                while isinstance(result, Trampoline):
+                    if type(result) is Frame:
+                        stack.append(result)
+                        result = result.call
+                    else:
+                        result = result()
+                if not isinstance(result, Failure):
+                    if not stack:
+                        return result
+                    frame = stack.pop()
+                    if frame.on_success is not None:
+                        result = frame.on_success(*result)
+                    continue
+                failure = result
+            except Failure as f:
+                failure = f
+
+            while stack:
+                frame = stack.pop()
+                if frame.on_failure is not None:
+                    result = Recover(frame.on_failure, failure)
+                    break
+            else:
+                raise failure
+
+
+class Frame(Trampoline):
+    """Runs the trampoline `call`. On success, its result `(x, cursor, aux)`
+    is passed to `on_success`, on failure the `Failure` is passed to
+    `on_failure`. Either continuation returns a new result, trampoline or
+    `Failure`. If a continuation is `None`, the outcome of `call` is passed
+    on unchanged."""
+    __slots__ = ("call", "on_success", "on_failure")
+
+    def __init__(self, call: Trampoline,
+                 on_success: Optional[Callable[..., Any]] = None,
+                 on_failure: Optional[Callable[[Failure], Any]] = None):
+        self.call = call
+        self.on_success = on_success
+        self.on_failure = on_failure
+
+    def __call__(self):
+        try:
+            result = self.call.invoke()
+        except Failure as failure:
+            if self.on_failure is None:
+                raise
+            return self.on_failure(failure)
+        if self.on_success is None:
+            return result
+        return self.on_success(*result)
+
+
+class Recover(Trampoline):
+    """Passes `failure` to the `handler` of a `Frame`."""
+    __slots__ = ("handler", "failure")
+
+    def __init__(self, handler: Callable[[Failure], Any], failure: Failure):
+        self.handler = handler
+        self.failure = failure
+
+    def __call__(self):
+        return self.handler(self.failure)
 
 
 ParserFunction = Callable[
@@ -42,6 +123,9 @@ ParserFunctionIssue708 = Callable[
     ..., Union[Tuple[Any, Cursor, Any], Trampoline]]
 
 
+LeafFunction = Callable[[Cursor, Any], Union[Tuple[Any, Cursor, Any], Failure]]
+
+
 @dataclass
 class Call(Trampoline):
     """Stores a delayed call to a parser. Part of the parser trampoline."""
@@ -85,23 +169,40 @@ def bind(p: Parser, f: Callable[[Any], Parser]) -> Parser:
     The `>>` operator is one of the primary ways of composing parsers
     (the other being `choice`).
     """
-    @parser
-    def g(cursor, aux):
-        result, cursor, aux = p(cursor, aux).invoke()
-        return f(result)(cursor, aux)
-
-    return g
+    return Bind(p, f)
 
 
 @dataclass
 class Parser:
-    """Wrapper for parser functions."""
+    """Wrapper for parser functions.
+
+    The class attribute `leaf` is `True` for parsers whose function always
+    returns a result directly, without running other parsers. Combinators
+    may call the function of a leaf parser without going through the
+    trampoline.
+
+    The `profile_name` is set by :py:func:`byteparsing.profile.named`."""
     func: Optional[ParserFunctionIssue708]
+    profile_name: Optional[str] = field(
+        default=None, repr=False, compare=False)
+    leaf = False
 
     def parse(self, b: bytes):
-        result, _, _ = self(Cursor(b), []).invoke()
+        result, _, _ = self(Cursor(b), Stack()).invoke()
         return result
 
+    def iter(self, data, **kwargs):
+        """Parses this parser repeatedly, yielding results one by one. See
+        :py:func:`byteparsing.parsers.iter_parse`."""
+        from .parsers import iter_parse
+        return iter_parse(self, data, **kwargs)
+
+    def named(self, name: str) -> Parser:
+        """Gives this parser a name for profiling. See
+        :py:mod:`byteparsing.profile`."""
+        from .profile import named
+        return named(self, name)
+
     def __call__(self, cursor: Cursor, aux: Any) -> Call:
         assert self.func is not None
         return Call(self.func, cursor, aux)
@@ -111,3 +212,35 @@ class Parser:
         parsers (the other being `choice`)."""
         return bind(self, g)
 
+    def compile(self) -> Parser:
+        """Returns an optimized version of this parser. See
+        :py:func:`byteparsing.compiler.compile_parser`."""
+        from .compiler import compile_parser
+        return compile_parser(self)
+
+
+def leaf_function(p: Parser) -> LeafFunction:
+    """Returns the function of `p`, typed as returning either a result or a
+    `Failure` directly. Only call this for parsers that never return a
+    trampoline, such as leaf parsers."""
+    assert p.func is not None
+    return cast(LeafFunction, p.func)
+
+
+class Bind(Parser):
+    """Parser node created by `bind`. Unlike a plain `Parser` it keeps a
+    reference to both of its arguments, so that the compiler can inspect
+    the parser graph."""
+    def __init__(self, p: Parser, f: Callable[[Any], Parser]):
+        self.p = p
+        self.f = f
+        super().__init__(self._parse)
+
+    def _parse(self, cursor: Cursor, aux: Any):
+        return Frame(self.p(cursor, aux), self._continue)
+
+    def _continue(self, result: Any, cursor: Cursor, aux: Any):
+        return self.f(result)(cursor, aux)
+
+    def __repr__(self):
+        return f"Bind({self.p!r}, {self.f!r})"
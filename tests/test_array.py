@@ -2,7 +2,7 @@ import pytest
 np = pytest.importorskip("numpy")
 
 from byteparsing.parsers import (named_sequence, char, parse_bytes, Failure)
-from byteparsing.array import (array)
+from byteparsing.array import (array, lazy_array, LazyArray)
 
 def test_array():
     import numpy as np
@@ -24,3 +24,21 @@ def test_array():
     with pytest.raises(Failure):
         parse_bytes(array(np.dtype(float), 129), byte_data)
 
+
+def test_lazy_array():
+    numbers = np.random.normal(size=(64, 3))
+    byte_data = b'(' + numbers.tobytes() + b')'
+    p = named_sequence(
+        open=char("("),
+        data=lazy_array(np.dtype(float), (64, 3)),
+        close=char(")"))
+    x = parse_bytes(p, byte_data)["data"]
+    assert isinstance(x, LazyArray)
+    assert x.offset == 1 and x.shape == (64, 3) and x.count == 192
+    assert x._array is None
+    np.testing.assert_array_equal(np.asarray(x), numbers)
+    np.testing.assert_array_equal(x[3], numbers[3])
+    assert x.load() is x.load()
+
+    with pytest.raises(Failure):
+        parse_bytes(lazy_array(np.dtype(float), (65, 3)), byte_data[1:])
@@ -0,0 +1,63 @@
+import mmap
+from pathlib import Path
+
+import pytest
+np = pytest.importorskip("numpy")
+
+from byteparsing.batch import parse_files
+from byteparsing.failure import Failure
+from byteparsing.openfoam import foam_file
+from byteparsing.parsers import parse_bytes
+
+data = Path(".") / "tests" / "data"
+names = ["ascii_scalar", "binary_vector", "ascii_vector", "binary_scalar"]
+
+
+def internal_field(value):
+    field = value["data"]["internalField"]
+    return field["data"] if isinstance(field, dict) else field
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+@pytest.mark.parametrize("ordered", [True, False])
+def test_parse_files(tmp_path, executor, ordered):
+    broken = tmp_path / "broken"
+    broken.write_bytes(b"FoamFile { format ascii;")
+    paths = [data / n for n in names] + [broken, tmp_path / "missing"]
+    results = list(parse_files(foam_file, paths * 3, workers=2,
+                               executor=executor, ordered=ordered))
+    assert len(results) == len(paths) * 3
+    if ordered:
+        assert [r.path for r in results] == paths * 3
+    else:
+        assert sorted(map(str, (r.path for r in results))) == \
+            sorted(map(str, paths * 3))
+
+    for r in results:
+        if r.path == broken:
+            assert isinstance(r.error, Failure)
+        elif r.path == tmp_path / "missing":
+            assert isinstance(r.error, FileNotFoundError)
+        else:
+            assert r.error is None
+            expected = parse_bytes(foam_file, r.path.read_bytes())
+            np.testing.assert_array_equal(
+                internal_field(r.value), internal_field(expected))
+
+
+def test_shared_arrays():
+    results = list(parse_files(foam_file, [data / "binary_vector"],
+                               workers=1, min_shared=1024))
+    U = results[0].value["data"]["internalField"]
+    assert U.shape == (9200, 3)
+    base = U
+    while isinstance(base, np.ndarray):
+        base = base.base
+    assert isinstance(getattr(base, "obj", base), mmap.mmap)
+    U[0] = 0    # private copy-on-write mapping
+
+
+def test_parser_by_name():
+    results = list(parse_files("byteparsing.openfoam:foam_file",
+                               [data / "ascii_scalar"], workers=1))
+    assert results[0].error is None
@@ -0,0 +1,92 @@
+import pytest
+from byteparsing.failure import Failure
+from byteparsing.ir import Sequence, Span, Literal, Choice
+from byteparsing.parsers import (
+    parse_bytes, sequence, flush, many_char, many_char_0, some_char, choice,
+    char, ascii_alpha, ascii_num, tokenize, integer, text_literal,
+    text_one_of, push, pop, value, some, many)
+from byteparsing.compiler import compile_parser
+
+
+def test_fuse_sequence():
+    p = sequence(char('a'), sequence(char('b'), sequence(char('c'))),
+                 value(1), flush())
+    q = compile_parser(p)
+    assert isinstance(q, Sequence)
+    assert len(q.parsers) == 4
+    assert parse_bytes(q, b"abc") == parse_bytes(p, b"abc") == b"abc"
+
+
+def test_span():
+    p = many_char(choice(ascii_alpha, ascii_num))
+    q = p.compile()
+    assert any(isinstance(r, Span) for r in q.parsers)
+    assert parse_bytes(q, b"abc123 x") == b"abc123"
+    assert parse_bytes(q, b" x") == b""
+
+    r = some_char(ascii_num).compile()
+    assert parse_bytes(r, b"123") == b"123"
+    with pytest.raises(Failure):
+        parse_bytes(r, b"x")
+    with pytest.raises(Failure):
+        parse_bytes(some(ascii_num).compile(), b"")
+
+
+def test_text():
+    assert isinstance(text_literal("ab").compile(), Literal)
+    q = text_one_of("ab").compile()
+    assert isinstance(q, Choice)
+    assert parse_bytes(q, b"b") == parse_bytes(text_one_of("ab"), b"b") \
+        == b"b"
+    assert parse_bytes(many(q), b"abx") == [b"a", b"b"]
+
+
+def test_push_pop():
+    p = sequence(char('('), many_char_0(ascii_alpha) >> push,
+                 many_char_0(char(' ')), pop())
+    q = p.compile()
+    assert parse_bytes(q, b"(abc   ") == parse_bytes(p, b"(abc   ")
+
+    p = tokenize(integer)
+    q = p.compile()
+    assert isinstance(q, Sequence)
+    assert parse_bytes(some(q), b"1 2  3") == [1, 2, 3]
+
+
+def test_recursive():
+    from byteparsing.trampoline import Parser
+    nested = Parser(None)
+    nested.func = choice(
+        sequence(char('('), many_char_0(nested), char(')'), value(1)),
+        ascii_alpha).func
+    p = sequence(flush(), nested, flush()).compile()
+    assert parse_bytes(p, b"(a(b)(c(d)))") == b"(a(b)(c(d)))"
+    with pytest.raises(Failure):
+        parse_bytes(p, b"(a(b)")
+
+
+def test_continuation_results():
+    import gc
+    import mmap
+    from pathlib import Path
+    pytest.importorskip("numpy")
+    from byteparsing.openfoam import foam_file
+
+    # the compiled grammar doesn't keep results, or views on the input
+    compiled = foam_file.compile()
+    path = Path(".") / "tests" / "data" / "binary_vector"
+    with path.open("rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    for _ in range(3):
+        x = parse_bytes(compiled, mm)
+        assert x["data"]["internalField"].shape == (9200, 3)
+    del x
+    gc.collect()
+    mm.close()
+
+    # parsers that are returned repeatedly are compiled
+    p = many_char(choice(ascii_alpha, ascii_num))
+    q = (char('x') >> (lambda _: p)).compile()
+    assert [parse_bytes(q, b"xa1 ") for _ in range(3)] == [b"a1"] * 3
+    assert any(isinstance(r, Span) for c in q.f.cache.values()
+               for r in c[1].parsers)
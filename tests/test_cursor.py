@@ -31,3 +31,25 @@ def test_cursor():
     assert len(d) == len(data)
     assert d.content == data
     assert d.content_str == "Hello, World!"
+
+
+def test_encoding():
+    data = "Hëllo".encode("utf-16")
+    c = Cursor.from_bytes(data, encoding="utf-16")
+    assert c.increment(4).flush().find(b"o").encoding == "utf-16"
+    assert not hasattr(c, "__dict__")
+
+
+def test_scanner():
+    data = b"key = value\nrest"
+    s = Cursor.from_bytes(data).scanner()
+    assert s.find(b" = ")
+    assert s.flush() == b"key"
+    s.advance(3)
+    s.flush()
+    assert not s.find(b"?")
+    assert s.find(b"\n")
+    assert s.flush() == b"value"
+    c = s.cursor()
+    assert c == Cursor(data, 11, 11)
+    assert c.at == ord("\n")
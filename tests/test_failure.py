@@ -0,0 +1,13 @@
+import pickle
+
+from byteparsing.failure import (
+    Failure, EndOfInput, Expected, MultipleFailures)
+
+
+def test_pickle():
+    failures = [Failure("oops"), EndOfInput(), Expected("(", 41),
+                MultipleFailures(EndOfInput(), Expected(")"))]
+    for f in failures:
+        g = pickle.loads(pickle.dumps(f))
+        assert type(g) is type(f)
+        assert str(g) == str(f)
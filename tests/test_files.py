@@ -0,0 +1,85 @@
+import gzip
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from byteparsing.files import (
+    DecompressedCache, map_file, find_file, set_default_cache)
+
+data_path = Path(".") / "tests" / "data"
+
+
+def compress(source: Path, target: Path):
+    with open(source, "rb") as f, gzip.open(target, "wb") as g:
+        shutil.copyfileobj(f, g)
+
+
+def test_map_file(tmp_path):
+    original = (data_path / "binary_vector").read_bytes()
+    compress(data_path / "binary_vector", tmp_path / "U.gz")
+    assert find_file(tmp_path / "U") == tmp_path / "U.gz"
+    assert map_file(tmp_path / "U")[:] == original
+    assert map_file(tmp_path / "U.gz")[:] == original
+
+    (tmp_path / "empty").write_bytes(b"")
+    assert map_file(tmp_path / "empty") == b""
+    with gzip.open(tmp_path / "empty.gz", "wb"):
+        pass
+    assert map_file(tmp_path / "empty.gz") == b""
+
+
+def test_cache(tmp_path):
+    cache = DecompressedCache(tmp_path / "cache", max_size=2**20)
+    for name in ["binary_vector", "binary_scalar", "ascii_scalar"]:
+        compress(data_path / name, tmp_path / (name + ".gz"))
+
+    x = cache.map(tmp_path / "binary_vector.gz")
+    assert x[:] == (data_path / "binary_vector").read_bytes()
+    entries = list((tmp_path / "cache").iterdir())
+    assert len(entries) == 1
+
+    # a second read maps the cached copy
+    os.utime(entries[0], ns=(0, 0))
+    y = cache.map(tmp_path / "binary_vector.gz")
+    assert y[:] == x[:]
+    assert entries[0].stat().st_mtime_ns > 0
+
+    # the least recently used copy is evicted
+    cache.max_size = 224297 + 75036
+    cache.map(tmp_path / "binary_scalar.gz")
+    os.utime(entries[0], ns=(0, 0))
+    cache.map(tmp_path / "ascii_scalar.gz")
+    assert not entries[0].exists()
+    assert len(list((tmp_path / "cache").iterdir())) == 2
+
+    # changing the file invalidates the copy
+    compress(data_path / "ascii_vector", tmp_path / "ascii_scalar.gz")
+    os.utime(tmp_path / "ascii_scalar.gz", ns=(1, 1))
+    z = cache.map(tmp_path / "ascii_scalar.gz")
+    assert z[:] == (data_path / "ascii_vector").read_bytes()
+
+    # files larger than the cache are not kept
+    cache.clear()
+    cache.max_size = 100
+    assert cache.map(tmp_path / "binary_scalar.gz")[:] \
+        == (data_path / "binary_scalar").read_bytes()
+    assert list((tmp_path / "cache").iterdir()) == []
+
+
+def test_default_cache(tmp_path):
+    pytest.importorskip("numpy")
+    from byteparsing.foam_case import FoamCase
+
+    (tmp_path / "case" / "1").mkdir(parents=True)
+    compress(data_path / "binary_vector", tmp_path / "case" / "1" / "U.gz")
+    set_default_cache(DecompressedCache(tmp_path / "cache"))
+    try:
+        case = FoamCase(tmp_path / "case", executor="thread")
+        assert case.fields(1) == ["U"]
+        U = case.read()["1"]["U"]
+        assert U.shape == (9200, 3)
+        assert len(list((tmp_path / "cache").iterdir())) == 1
+    finally:
+        set_default_cache(None)
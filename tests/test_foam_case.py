@@ -0,0 +1,172 @@
+import shutil
+from pathlib import Path
+import mmap
+
+import pytest
+np = pytest.importorskip("numpy")
+
+from byteparsing.failure import EndOfInput
+from byteparsing.parsers import parse_bytes
+from byteparsing.openfoam import foam_file, label_list_file
+from byteparsing.foam_case import FoamCase, processor_directories
+
+
+def make_case(path: Path):
+    data = Path(".") / "tests" / "data"
+    for t in ["0", "0.5", "1", "10"]:
+        (path / t).mkdir(parents=True)
+        shutil.copy(data / "binary_vector", path / t / "U")
+        shutil.copy(data / "ascii_scalar", path / t / "p")
+    (path / "constant").mkdir()
+    (path / "0.orig").mkdir()
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_foam_case(tmp_path, executor):
+    make_case(tmp_path)
+    case = FoamCase(tmp_path, workers=2, executor=executor)
+    assert case.times == ["0", "0.5", "1", "10"]
+    assert case.fields(1) == ["U", "p"]
+
+    result = case.read(times=[0.5, "10"])
+    assert list(result) == ["0.5", "10"]
+    U = result["10"]["U"]
+    assert U.shape == (9200, 3)
+    base = U
+    while isinstance(base, np.ndarray):
+        base = base.base
+    assert isinstance(getattr(base, "obj", base), mmap.mmap)
+    expected = parse_bytes(
+        foam_file, (tmp_path / "1" / "U").read_bytes())["data"]
+    np.testing.assert_array_equal(U, expected["internalField"])
+    assert result["0.5"]["p"].shape == (10,)
+
+    result = case.read(fields=["U"])
+    assert len(result) == 4 and list(result["0"]) == ["U"]
+
+    with pytest.raises(KeyError):
+        case.read(times=[2])
+
+    assert not list(tmp_path.glob("*/*.index"))
+    FoamCase(tmp_path, workers=2, executor=executor,
+             save_index=True).read(times=["1"])
+    assert sorted(p.name for p in tmp_path.glob("*/*.index")) \
+        == ["U.index", "p.index"]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_foam_case_failure(tmp_path, executor):
+    make_case(tmp_path)
+    (tmp_path / "1" / "U").write_bytes(b"")
+    with pytest.raises(EndOfInput):
+        FoamCase(tmp_path, workers=2, executor=executor).read(fields=["U"])
+
+
+def write_label_list(path: Path, labels):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    body = "\n".join(str(i) for i in labels)
+    path.write_bytes(
+        b"FoamFile\n{\n    format ascii;\n    class labelList;\n}\n"
+        + f"{len(labels)}\n(\n{body}\n)\n".encode())
+
+
+def write_piece(path: Path, template: bytes, values):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = template[:template.index(b"internalField")]
+    path.write_bytes(
+        header
+        + f"internalField nonuniform List<vector> {len(values)}\n(".encode()
+        + values.tobytes() + b")\n;\n\nboundaryField\n{\n}\n")
+
+
+def make_decomposed_case(path: Path, n: int):
+    template = (Path(".") / "tests" / "data" / "binary_vector").read_bytes()
+    U = parse_bytes(foam_file, template)["data"]["internalField"]
+    cells = np.random.default_rng(0).permutation(len(U))
+    pieces = np.array_split(cells, n)
+    for i in range(n):
+        proc = path / f"processor{i}"
+        write_label_list(
+            proc / "constant" / "polyMesh" / "cellProcAddressing", pieces[i])
+        for t in ["0", "1"]:
+            write_piece(proc / t / "U", template, U[pieces[i]])
+    return U
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_reconstruct(tmp_path, executor):
+    U = make_decomposed_case(tmp_path, 11)
+    assert [p.name for p in processor_directories(tmp_path)] \
+        == [f"processor{i}" for i in range(11)]
+
+    case = FoamCase(tmp_path, workers=2, executor=executor)
+    assert case.decomposed
+    assert case.times == ["0", "1"]
+    assert case.fields(0) == ["U"]
+
+    result = case.reconstruct("U", 1)
+    np.testing.assert_array_equal(result, U)
+    result = case.read(times=["0"])
+    np.testing.assert_array_equal(result["0"]["U"], U)
+
+    with pytest.raises(ValueError):
+        case.reconstruct("U", 1, entry="dimensions")
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_reconstruct_uniform(tmp_path, executor):
+    U = make_decomposed_case(tmp_path, 3)
+    for i in range(3):
+        (tmp_path / f"processor{i}" / "0" / "p").write_bytes(
+            b"FoamFile\n{\n    format ascii;\n    class volScalarField;\n}\n"
+            b"dimensions [0 2 -2 0 0 0 0];\n"
+            b"internalField uniform 0.5;\n"
+            b"boundaryField\n{\n}\n")
+    case = FoamCase(tmp_path, workers=2, executor=executor)
+    result = case.read(times=["0"])
+    assert result["0"]["p"] == 0.5
+    np.testing.assert_array_equal(result["0"]["U"], U)
+
+    # one processor with a uniform piece
+    piece = tmp_path / "processor1" / "1" / "U"
+    piece.write_bytes(
+        piece.read_bytes()[:piece.read_bytes().index(b"internalField")]
+        + b"internalField uniform (1 2 3);\nboundaryField\n{\n}\n")
+    cells = parse_bytes(label_list_file, (
+        tmp_path / "processor1" / "constant" / "polyMesh"
+        / "cellProcAddressing").read_bytes())["data"]
+    U = U.copy()
+    U[cells] = [1, 2, 3]
+    np.testing.assert_array_equal(case.reconstruct("U", "1"), U)
+
+    # uniform pieces with different values
+    for i, value in enumerate([b"1", b"0", b"1"]):
+        (tmp_path / f"processor{i}" / "1" / "p").write_bytes(
+            b"FoamFile\n{\n    format ascii;\n}\n"
+            b"internalField uniform " + value + b";\n")
+    p = case.reconstruct("p", "1")
+    assert isinstance(p, np.ndarray) and p.shape == (len(U),)
+    cells = [parse_bytes(label_list_file, (
+        tmp_path / f"processor{i}" / "constant" / "polyMesh"
+        / "cellProcAddressing").read_bytes())["data"] for i in range(3)]
+    np.testing.assert_array_equal(p[cells[0]], 1)
+    np.testing.assert_array_equal(p[cells[1]], 0)
+    np.testing.assert_array_equal(p[cells[2]], 1)
+
+
+def test_addressing_read_once(tmp_path, monkeypatch):
+    import byteparsing.foam_case as foam_case
+
+    make_decomposed_case(tmp_path, 4)
+    calls = []
+    original = foam_case.read_labels
+
+    def read_labels(path):
+        calls.append(path)
+        return original(path)
+
+    monkeypatch.setattr(foam_case, "read_labels", read_labels)
+    case = FoamCase(tmp_path, workers=2, executor="thread")
+    result = case.read()
+    assert list(result) == ["0", "1"]
+    assert len(calls) == 4
@@ -0,0 +1,50 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+np = pytest.importorskip("numpy")
+
+from byteparsing.parsers import parse_bytes
+from byteparsing.openfoam import foam_file
+from byteparsing.foam_index import FoamIndex
+
+
+def test_foam_index(tmp_path):
+    for name in ["ascii_scalar", "binary_vector"]:
+        path = tmp_path / name
+        shutil.copy(Path(".") / "tests" / "data" / name, path)
+        full = parse_bytes(foam_file, path.read_bytes())["data"]
+
+        index = FoamIndex.open(path)
+        assert FoamIndex.sidecar(path).exists()
+        assert index.keys()[:3] == ["dimensions", "internalField",
+                                    "boundaryField"]
+        assert "boundaryField/out/type" in index
+        assert index.entries["internalField"].shape[0] == \
+            len(full["internalField"]["data"] if name.startswith("ascii")
+                else full["internalField"])
+
+        # reopen from the sidecar, without parsing
+        index = FoamIndex.open(path)
+        assert index._data is None
+        for key in ["dimensions", "internalField", "boundaryField/out"]:
+            a, b = index[key], full
+            for k in key.split("/"):
+                b = b[k]
+            np.testing.assert_equal(a, b)
+
+
+def test_stale_index(tmp_path):
+    path = tmp_path / "binary_scalar"
+    shutil.copy(Path(".") / "tests" / "data" / "binary_scalar", path)
+    index = FoamIndex.open(path)
+    begin = index.entries["internalField"].begin
+
+    data = path.read_bytes()
+    path.write_bytes(b"\n" + data)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    index = FoamIndex.open(path)
+    assert index.entries["internalField"].begin == begin + 1
+    assert index["internalField"].shape == (9200,)
@@ -0,0 +1,123 @@
+from pathlib import Path
+
+import pytest
+np = pytest.importorskip("numpy")
+
+from byteparsing.failure import Failure
+from byteparsing.foam_mesh import read_poly_mesh, read_labels, faces_file
+from byteparsing.parsers import parse_bytes
+
+points = np.array([[x, y, z] for z in (0, 1) for y in (0, 1)
+                   for x in (0, 0.5, 1)], dtype=float)
+faces = [[1, 4, 10, 7], [0, 3, 9, 6], [2, 8, 11, 5], [0, 1, 2],
+         [3, 4, 5, 11, 10], [6, 7, 8]]
+owner = np.array([0, 0, 1, 0, 1, 1], dtype=np.int32)
+neighbour = np.array([1], dtype=np.int32)
+
+
+def header(cls, format, note="", arch="LSB;label=32;scalar=64"):
+    return (f"FoamFile\n{{\n    version 2.0;\n    format {format};\n"
+            f"    arch \"{arch}\";\n    class {cls};\n"
+            f"{note}    object x;\n}}\n\n").encode()
+
+
+def binary_list(a):
+    return f"{len(a)}\n(".encode() + a.tobytes() + b")\n"
+
+
+def ascii_list(rows):
+    return f"{len(rows)}\n(\n".encode() \
+        + b"".join(row.encode() + b"\n" for row in rows) + b")\n"
+
+
+def write_mesh(path: Path, format):
+    path.mkdir(parents=True)
+    note = "    note \"nPoints:12 nCells:2 nFaces:6 nInternalFaces:1\";\n"
+    if format == "binary":
+        offsets = np.cumsum([0] + [len(f) for f in faces]).astype(np.int32)
+        indices = np.concatenate(faces).astype(np.int32)
+        (path / "points").write_bytes(
+            header("vectorField", format) + binary_list(points))
+        (path / "faces").write_bytes(
+            header("faceCompactList", format)
+            + binary_list(offsets) + binary_list(indices))
+        (path / "owner").write_bytes(
+            header("labelList", format, note) + binary_list(owner))
+        (path / "neighbour").write_bytes(
+            header("labelList", format, note) + binary_list(neighbour))
+        return
+
+    (path / "points").write_bytes(
+        header("vectorField", format)
+        + ascii_list([f"({x} {y} {z})" for x, y, z in points]))
+    (path / "faces").write_bytes(
+        header("faceList", format)
+        + ascii_list([f"{len(f)}(" + " ".join(map(str, f)) + ")"
+                      for f in faces]))
+    (path / "owner").write_bytes(
+        header("labelList", format, note)
+        + ascii_list([str(i) for i in owner]))
+    (path / "neighbour").write_bytes(
+        header("labelList", format, note)
+        + ascii_list([str(i) for i in neighbour]))
+
+
+@pytest.mark.parametrize("format", ["ascii", "binary"])
+def test_read_poly_mesh(tmp_path, format):
+    write_mesh(tmp_path / "constant" / "polyMesh", format)
+    mesh = read_poly_mesh(tmp_path)
+    np.testing.assert_array_equal(mesh.points, points)
+    assert mesh.n_points == 12 and mesh.n_faces == 6
+    assert mesh.n_cells == 2 and mesh.n_internal_faces == 1
+    for i, f in enumerate(faces):
+        np.testing.assert_array_equal(mesh.face(i), f)
+    np.testing.assert_array_equal(mesh.owner, owner)
+    np.testing.assert_array_equal(mesh.neighbour, neighbour)
+    if format == "binary":
+        assert not mesh.face_indices.flags.owndata
+        assert not mesh.points.flags.owndata
+
+    mesh = read_poly_mesh(tmp_path / "constant" / "polyMesh")
+    assert mesh.n_faces == 6
+
+
+def test_empty_lists(tmp_path):
+    for format in ["ascii", "binary"]:
+        path = tmp_path / format
+        path.write_bytes(header("labelList", format) + b"0()\n")
+        assert read_labels(path).shape == (0,)
+
+
+def test_ascii_faces_bytearray():
+    data = header("faceList", "ascii") + ascii_list(
+        [f"{len(f)}(" + " ".join(map(str, f)) + ")" for f in faces])
+    x = parse_bytes(faces_file, bytearray(data))["data"]
+    np.testing.assert_array_equal(x["indices"], np.concatenate(faces))
+    np.testing.assert_array_equal(
+        x["offsets"], np.cumsum([0] + [len(f) for f in faces]))
+
+
+def test_ascii_label_64(tmp_path):
+    big = [2**40, 0, 2**33 + 1]
+    path = tmp_path / "owner"
+    path.write_bytes(header("labelList", "ascii", arch="LSB;label=64")
+                     + ascii_list([str(i) for i in big]))
+    labels = read_labels(path)
+    assert labels.dtype == np.int64
+    np.testing.assert_array_equal(labels, big)
+
+    path.write_bytes(header("labelList", "ascii")
+                     + ascii_list([str(i) for i in big]))
+    with pytest.raises(Failure):
+        read_labels(path)
+
+    path = tmp_path / "faces"
+    path.write_bytes(header("faceList", "ascii", arch="LSB;label=64")
+                     + ascii_list(["3(0 1 8589934593)"]))
+    x = parse_bytes(faces_file, path.read_bytes())["data"]
+    assert x["indices"].dtype == np.int64
+    np.testing.assert_array_equal(x["indices"], [0, 1, 2**33 + 1])
+    path.write_bytes(header("faceList", "ascii")
+                     + ascii_list(["3(0 1 8589934593)"]))
+    with pytest.raises(Failure):
+        parse_bytes(faces_file, path.read_bytes())
@@ -0,0 +1,65 @@
+import gzip
+from pathlib import Path
+
+import pytest
+np = pytest.importorskip("numpy")
+
+from byteparsing.failure import Failure
+from byteparsing.foam_parallel import read_ascii_list
+from byteparsing.openfoam import foam_file
+from byteparsing.parsers import parse_bytes
+
+data = Path(".") / "tests" / "data"
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+@pytest.mark.parametrize("name", ["ascii_scalar", "ascii_vector"])
+def test_read_ascii_list(name, executor):
+    expected = parse_bytes(foam_file, (data / name).read_bytes())
+    expected = expected["data"]["internalField"]["data"]
+    for chunk_size in [1, 20, 2**20]:
+        result = read_ascii_list(data / name, workers=2, executor=executor,
+                                 chunk_size=chunk_size)
+        np.testing.assert_array_equal(result, expected)
+
+
+def test_bare_list(tmp_path):
+    labels = np.arange(1000, dtype=np.int32)[::-1]
+    path = tmp_path / "cellProcAddressing.gz"
+    path.write_bytes(gzip.compress(
+        b"FoamFile\n{\n    format ascii;\n    class labelList;\n}\n"
+        + f"{len(labels)}\n(\n".encode()
+        + "\n".join(map(str, labels)).encode() + b"\n)\n"))
+    result = read_ascii_list(tmp_path / "cellProcAddressing", None,
+                             b"label", workers=3, chunk_size=100)
+    assert result.dtype == np.int32
+    np.testing.assert_array_equal(result, labels)
+
+
+def test_wrong_count(tmp_path):
+    path = tmp_path / "U"
+    path.write_bytes((data / "ascii_vector").read_bytes().replace(
+        b"List<vector>\n10\n", b"List<vector>\n11\n"))
+    with pytest.raises(Failure):
+        read_ascii_list(path, workers=2, executor="thread", chunk_size=50)
+
+
+def test_label_64(tmp_path):
+    big = [2**40, 0, 2**33 + 1]
+    path = tmp_path / "owner"
+    header = b"FoamFile\n{\n    format ascii;\n    arch \"%s\";\n}\n"
+    body = b"3\n(\n" + b"\n".join(b"%d" % i for i in big) + b"\n)\n"
+    path.write_bytes(header % b"LSB;label=64" + body)
+    result = read_ascii_list(path, None, b"label", workers=2,
+                             executor="thread", chunk_size=4)
+    assert result.dtype == np.int64
+    np.testing.assert_array_equal(result, big)
+
+    path.write_bytes(header % b"LSB;label=32" + body)
+    with pytest.raises(Failure):
+        read_ascii_list(path, None, b"label", workers=2, executor="thread")
+
+    path.write_bytes(header.replace(b"ascii", b"binary")
+                     % b"LSB;label=64" + body)
+    with pytest.raises(Failure):
+        read_ascii_list(path, None, b"label", workers=2, executor="thread")
@@ -0,0 +1,87 @@
+import io
+from pathlib import Path
+
+import pytest
+np = pytest.importorskip("numpy")
+
+from byteparsing.parsers import parse_bytes
+from byteparsing.openfoam import foam_file, lazy_foam_file
+from byteparsing.foam_writer import (
+    ChunkedList, foam_file_chunks, write_foam_file)
+
+
+@pytest.mark.parametrize("name", [
+    "ascii_scalar", "ascii_vector", "binary_scalar", "binary_vector",
+    "binary_uniform"])
+def test_round_trip(tmp_path, name):
+    data = (Path(".") / "tests" / "data" / name).read_bytes()
+    x = parse_bytes(foam_file, data)
+    n = write_foam_file(tmp_path / name, x)
+    written = (tmp_path / name).read_bytes()
+    assert n == len(written)
+    np.testing.assert_equal(parse_bytes(foam_file, written), x)
+
+    f = io.BytesIO()
+    write_foam_file(f, x)
+    assert f.getvalue() == written
+
+
+def test_zero_copy():
+    data = (Path(".") / "tests" / "data" / "binary_vector").read_bytes()
+    x = parse_bytes(lazy_foam_file, data)
+    field = np.asarray(x["data"]["internalField"])
+    views = [c for c in foam_file_chunks(x) if isinstance(c, memoryview)]
+    assert any(np.shares_memory(np.asarray(v), field) for v in views)
+
+
+def test_resize(tmp_path):
+    data = (Path(".") / "tests" / "data" / "binary_vector").read_bytes()
+    x = parse_bytes(foam_file, data)
+    U = x["data"]["internalField"]
+    x["data"]["internalField"] = np.concatenate([U, U])[::2].T.copy().T
+    write_foam_file(tmp_path / "U", x)
+    y = parse_bytes(foam_file, (tmp_path / "U").read_bytes())
+    np.testing.assert_array_equal(
+        y["data"]["internalField"], np.concatenate([U, U])[::2])
+
+    labels = np.arange(5, dtype=np.int64)
+    x["data"]["internalField"] = labels
+    write_foam_file(tmp_path / "U", x)
+    assert b"List<label> 5" in (tmp_path / "U").read_bytes()
+
+
+@pytest.mark.parametrize("format", ["ascii", "binary"])
+def test_chunked_list(tmp_path, format):
+    data = (Path(".") / "tests" / "data" / "binary_vector").read_bytes()
+    x = parse_bytes(foam_file, data)
+    x["preamble"]["content"]["format"] = format
+
+    def blocks():
+        for i in range(10):
+            yield np.full((100, 3), i, dtype=float)
+
+    x["data"]["internalField"] = ChunkedList(1000, blocks())
+    write_foam_file(tmp_path / "U", x, chunk_size=1024)
+    y = parse_bytes(foam_file, (tmp_path / "U").read_bytes())
+    field = y["data"]["internalField"]
+    if format == "ascii":
+        field = field["data"]
+    np.testing.assert_array_equal(field, np.repeat(np.arange(10), 100)
+                                  [:, None] * np.ones(3))
+
+    x["data"]["internalField"] = ChunkedList(999, blocks())
+    with pytest.raises(ValueError):
+        write_foam_file(tmp_path / "U", x)
+
+
+def test_arch(tmp_path):
+    data = (Path(".") / "tests" / "data" / "binary_vector").read_bytes()
+    x = parse_bytes(foam_file, data)
+    U = x["data"]["internalField"]
+    x["preamble"]["content"]["arch"] = "MSB;label=32;scalar=32"
+    write_foam_file(tmp_path / "U", x)
+    written = (tmp_path / "U").read_bytes()
+    assert len(written) < len(data) - U.size * 4 + 100
+    y = parse_bytes(foam_file, written)["data"]["internalField"]
+    assert y.dtype == np.dtype(">f4")
+    np.testing.assert_array_equal(y, U.astype(">f4"))
@@ -0,0 +1,84 @@
+import pytest
+from byteparsing.failure import Failure
+from byteparsing.memo import Memo
+from byteparsing.parsers import (
+    parse_bytes, choice, sequence, tokenize, integer, char, memoize,
+    named_sequence, value, push)
+from byteparsing.trampoline import parser
+
+
+def counting(p):
+    calls = []
+
+    @parser
+    def g(c, a):
+        calls.append(c.end)
+        return p(c, a)
+    return g, calls
+
+
+def test_memoize():
+    number, calls = counting(tokenize(integer))
+    number = memoize(number, "number")
+    p = choice(
+        sequence(number, char('a')),
+        sequence(number, char('b')),
+        sequence(number, char('c')))
+
+    assert parse_bytes(p, b"42 c") == ord('c')
+    assert len(calls) == 3
+
+    calls.clear()
+    memo = Memo()
+    assert parse_bytes(p, b"42 c", memo=memo) == ord('c')
+    assert len(calls) == 1
+    assert memo.stats() == {"number": (2, 1)}
+    assert memo.hits == 2 and memo.misses == 1
+    assert len(memo.table) == 0
+
+
+def test_memoize_failure():
+    number, calls = counting(integer)
+    number = memoize(number, "number")
+    p = choice(number, number, value(None))
+    memo = Memo()
+    assert parse_bytes(p, b"x", memo=memo) is None
+    assert len(calls) == 1
+    with pytest.raises(Failure):
+        parse_bytes(number, b"x", memo=memo)
+    assert memo.stats() == {"number": (1, 2)}
+
+
+def test_eviction():
+    memo = Memo(maxsize=2)
+    for i in range(4):
+        memo.store(i, i)
+    assert list(memo.table) == [2, 3]
+    memo.lookup("x", 2)
+    memo.store(4, 4)
+    assert list(memo.table) == [2, 4]
+
+
+def test_named():
+    p = memoize(named_sequence(a=char('a'), b=char('b')))
+    assert parse_bytes(p, b"ab", memo=Memo()) == {"a": 97, "b": 98}
+
+
+def test_different_aux():
+    number, calls = counting(integer)
+    number = memoize(number, "number")
+    p = choice(
+        sequence(push(1), number, char('x')),
+        sequence(push(2), number))
+    memo = Memo()
+    assert parse_bytes(p, b"42", memo=memo) == 42
+    assert len(calls) == 2
+    assert memo.stats() == {"number": (0, 2)}
+
+
+def test_default_name():
+    memo = Memo()
+    p = memoize(named_sequence(a=char('a'), b=char('b')))
+    parse_bytes(p, b"ab", memo=memo)
+    assert list(memo.stats()) == [p.name]
+    assert len(p.name) < 40
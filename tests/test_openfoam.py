@@ -215,3 +215,126 @@ def test_modify_data(tmpdir):
     np.testing.assert_array_equal(
         y["data"]["internalField"][:10],
         np.arange(10))
+
+
+def test_compiled():
+    compiled = foam_file.compile()
+    for name in ["ascii_scalar", "ascii_vector", "binary_uniform"]:
+        test_file = Path(".") / "tests" / "data" / name
+        data = test_file.open(mode="rb").read()
+        np.testing.assert_equal(
+            parse_bytes(compiled, data), parse_bytes(foam_file, data))
+
+
+def test_ascii_array():
+    p = with_config(foam_list(), format="ascii")
+    x = parse_bytes(p, b"a List<scalar> 3 (1 2.5 -3e-2)")
+    assert isinstance(x["data"], np.ndarray)
+    np.testing.assert_equal(x["data"], [1, 2.5, -3e-2])
+    x = parse_bytes(p, b"a List<vector> 2\n(\n(1 2 3)\n(4 5 6)\n)\n")
+    assert x["data"].shape == (2, 3)
+    x = parse_bytes(p, b"a List<symmTensor> 1 ((1 2 3 4 5 6))")
+    assert x["data"].shape == (1, 6)
+
+    # empty lists have the same shape as in binary files
+    x = parse_bytes(p, b"a List<scalar> 0 ()")
+    assert isinstance(x["data"], np.ndarray)
+    assert x["data"].shape == (0,) and x["data"].dtype == float
+    x = parse_bytes(p, b"a List<vector> 0\n(\n)\n")
+    assert isinstance(x["data"], np.ndarray)
+    assert x["data"].shape == (0, 3) and x["data"].dtype == float
+    binary = parse_bytes(with_config(foam_list(), format="binary"),
+                         b"a List<vector> 0 ()")
+    assert x["data"].shape == binary.shape
+
+    # fall back to the slow path
+    x = parse_bytes(p, b"a List<scalar> 3 (1 2)")
+    assert x["data"] == [1, 2]
+    x = parse_bytes(p, b"a List<vector> 2 ((1 2 3) /* c */ (4 5 6))")
+    assert x["data"] == [[1, 2, 3], [4, 5, 6]]
+
+    test_file = Path(".") / "tests" / "data" / "ascii_vector"
+    ascii = parse_bytes(foam_file, test_file.read_bytes())
+    test_file = Path(".") / "tests" / "data" / "binary_vector"
+    binary = parse_bytes(foam_file, test_file.read_bytes())
+    assert ascii["data"]["internalField"]["data"].dtype \
+        == binary["data"]["internalField"].dtype
+
+
+def test_ascii_array_bytearray():
+    from byteparsing.openfoam import label_list_file
+
+    p = with_config(foam_list(), format="ascii")
+    x = parse_bytes(p, bytearray(b"a List<scalar> 3 (1 2 3)"))
+    assert isinstance(x["data"], np.ndarray)
+    np.testing.assert_array_equal(x["data"], [1.0, 2.0, 3.0])
+    x = parse_bytes(p, bytearray(b"a List<vector> 2 ((1 2 3) (4 5 6))"))
+    assert isinstance(x["data"], np.ndarray)
+    np.testing.assert_array_equal(x["data"], [[1, 2, 3], [4, 5, 6]])
+
+    header = b"FoamFile\n{\n    format ascii;\n    class labelList;\n}\n"
+    x = parse_bytes(label_list_file, bytearray(header + b"3\n(\n4\n0\n7\n)\n"))
+    assert isinstance(x["data"], np.ndarray)
+    np.testing.assert_array_equal(x["data"], [4, 0, 7])
+
+
+def test_lazy_foam_file():
+    from byteparsing.openfoam import lazy_foam_file
+    from byteparsing.array import LazyArray
+
+    for name in ["binary_scalar", "binary_vector"]:
+        data = (Path(".") / "tests" / "data" / name).read_bytes()
+        x = parse_bytes(lazy_foam_file, data)
+        field = x["data"]["internalField"]
+        assert isinstance(field, LazyArray)
+        np.testing.assert_array_equal(
+            field, parse_bytes(foam_file, data)["data"]["internalField"])
+
+
+def test_label_list_file():
+    from byteparsing.openfoam import label_list_file
+
+    header = b"FoamFile\n{\n    format %s;\n    class labelList;\n}\n"
+    x = parse_bytes(label_list_file, header % b"ascii" + b"3\n(\n4\n0\n7\n)\n")
+    assert x["data"].dtype == np.int32
+    np.testing.assert_array_equal(x["data"], [4, 0, 7])
+
+    labels = np.array([4, 0, 7], dtype=np.int32)
+    x = parse_bytes(
+        label_list_file,
+        header % b"binary" + b"3\n(" + labels.tobytes() + b")\n")
+    np.testing.assert_array_equal(x["data"], labels)
+
+
+def test_arch():
+    from byteparsing.openfoam import arch_types, lazy_foam_file, \
+        label_list_file
+
+    types = arch_types("MSB;label=64;scalar=32")
+    assert types[b"label"] == np.dtype(">i8")
+    assert types[b"vector"] == np.dtype(">f4")
+    assert arch_types(None)[b"scalar"] == np.dtype("<f8")
+
+    data = (Path(".") / "tests" / "data" / "binary_vector").read_bytes()
+    U = parse_bytes(foam_file, data)["data"]["internalField"]
+    begin = data.index(b"(", data.index(b"internalField")) + 1
+    end = begin + U.nbytes
+    for arch, dtype in [("LSB;label=32;scalar=32", "<f4"),
+                        ("MSB;label=32;scalar=64", ">f8")]:
+        modified = data[:begin].replace(
+            b"LSB;label=32;scalar=64", arch.encode()) \
+            + U.astype(dtype).tobytes() + data[end:end + 3]
+        x = parse_bytes(foam_file, modified)["data"]["internalField"]
+        assert x.dtype == np.dtype(dtype)
+        assert np.shares_memory(x, np.frombuffer(modified, dtype="u1"))
+        np.testing.assert_array_equal(x, U.astype(dtype))
+        y = parse_bytes(lazy_foam_file, modified)["data"]["internalField"]
+        np.testing.assert_array_equal(y, x)
+
+    labels = np.array([4, 0, 7], dtype=">i8")
+    x = parse_bytes(
+        label_list_file,
+        b'FoamFile\n{\n    format binary;\n    arch "MSB;label=64";\n}\n'
+        + b"3\n(" + labels.tobytes() + b")\n")
+    assert x["data"].dtype == np.dtype(">i8")
+    np.testing.assert_array_equal(x["data"], [4, 0, 7])
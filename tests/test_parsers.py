@@ -4,7 +4,9 @@ from byteparsing.parsers import (
     value, parse_bytes, item, fail, char, many_char, flush, sequence,
     literal, text_literal, ignore, tokenize, integer, some, scientific_number,
     choice, ascii_alpha_num, ascii_underscore, named_sequence, some_char,
-    push, pop, quoted_string, with_config, using_config
+    push, pop, quoted_string, with_config, using_config, repeat_n, regex,
+    whitespace, keep_left, keep_middle, between, lexeme, many, get_aux,
+    iter_parse
 )
 
 
@@ -71,6 +73,34 @@ def test_tokenize():
     assert parse_bytes(some(tokenize(integer)), b"3 42 -67") == [3, 42, -67]
 
 
+def test_repeat_n():
+    assert parse_bytes(repeat_n(item, 3), data) == list(data[:3])
+    with pytest.raises(EndOfInput):
+        parse_bytes(repeat_n(item, 20), data)
+
+
+def test_regex(tmp_path):
+    import mmap
+    number = regex(rb"[0-9]+", int)
+    assert parse_bytes(number, b"123abc") == 123
+    assert parse_bytes(sequence(number, flush()), b"123abc") == b""
+    assert parse_bytes(number, bytearray(b"42")) == 42
+    with pytest.raises(Failure):
+        parse_bytes(number, b"abc")
+    with pytest.raises(EndOfInput):
+        parse_bytes(number, b"")
+    with pytest.raises(Failure):
+        parse_bytes(regex(rb"[0-9.]+", float), b"1.2.3")
+
+    path = tmp_path / "data"
+    path.write_bytes(b"  3 42 -67")
+    with path.open("rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        p = sequence(whitespace, some(tokenize(integer)))
+        assert parse_bytes(p, mm) == [3, 42, -67]
+        mm.close()
+
+
 def test_scientific():
     assert parse_bytes(scientific_number, b"3.1415") == pytest.approx(3.1415)
     with pytest.raises(Failure):
@@ -121,3 +151,75 @@ def test_config():
     assert parse_bytes(
         with_config(sequence(integer >> set_cap, get_text())),
         b'1hello') == "HELLO"
+
+
+def test_choice_dispatch():
+    from byteparsing.ir import first_set, EMPTY
+    from byteparsing.trampoline import parser
+
+    assert first_set(char('a')) == {ord('a')}
+    assert first_set(many_char(char('a'))) == {ord('a'), EMPTY}
+    assert first_set(tokenize(integer)) == set(b"-0123456789")
+    assert first_set(text_literal("x"), "utf-16-le") == {ord('x')}
+
+    calls = []
+
+    @parser
+    def opaque(c, a):
+        calls.append(c.end)
+        return Failure("opaque")
+
+    assert first_set(opaque) is None
+    p = choice(char('a'), sequence(char('b'), value(1)), opaque, value(2))
+    assert parse_bytes(p, b"a") == ord('a')
+    assert parse_bytes(p, b"b") == 1
+    assert calls == []
+    assert parse_bytes(p, b"c") == 2
+    assert parse_bytes(p, b"") == 2
+    assert calls == [0, 0]
+
+    with pytest.raises(Failure):
+        parse_bytes(choice(char('a'), char('b')), b"c")
+    with pytest.raises(EndOfInput):
+        parse_bytes(choice(char('a'), char('b')), b"")
+
+
+def test_keep():
+    assert parse_bytes(keep_left(integer, char(';')), b"42;") == 42
+    assert parse_bytes(keep_middle(char('-'), integer, char(';')),
+                       b"-42;") == 42
+    numbers = between(char('('), many(tokenize(integer)), char(')'))
+    assert parse_bytes(numbers, b"(1 2 3)") == [1, 2, 3]
+    assert parse_bytes(sequence(numbers, get_aux()), b"(1 2 3)") == []
+
+    comma = lexeme(integer, skip=many(char(',')))
+    assert parse_bytes(many(comma), b"1,,2,3") == [1, 2, 3]
+    assert parse_bytes(many(lexeme(integer)), b"1 2\n3") == [1, 2, 3]
+
+
+def test_iter_parse(tmp_path):
+    import io
+    import mmap
+
+    numbers = tokenize(integer)
+    assert list(iter_parse(numbers, b"1 2 3 x")) == [1, 2, 3]
+    assert list(numbers.iter(io.BytesIO(b"1 2 3"), chunk_size=1)) \
+        == [1, 2, 3]
+
+    # a memory map is parsed in place, not read as a stream
+    with tmp_path.joinpath("numbers").open("wb") as f:
+        f.write(b"1 2 3")
+    with tmp_path.joinpath("numbers").open("rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        assert list(iter_parse(numbers, m)) == [1, 2, 3]
+
+    # the auxiliary stack is kept between items
+    depth = sequence(numbers >> push, get_aux() >> (lambda a: value(len(a))))
+    assert list(iter_parse(depth, b"4 5 6")) == [1, 2, 3]
+
+    # early termination
+    it = iter_parse(numbers, b" ".join(b"%d" % i for i in range(1000)))
+    assert next(it) == 0 and next(it) == 1
+    it.close()
+    with pytest.raises(StopIteration):
+        next(it)
@@ -0,0 +1,76 @@
+import pytest
+
+from byteparsing.parsers import (
+    parse_bytes, many, choice, sequence, tokenize, integer, text_literal,
+    char)
+from byteparsing.profile import Profile, named
+
+
+def test_profile():
+    number = named(tokenize(integer), "number")
+    word = named(tokenize(text_literal("abc")), "word")
+    pair = named(sequence(number, number, tokenize(char(';'))), "pair")
+    item = choice(pair, word, number)
+    p = many(item)
+
+    func, leaf = number.func, number.leaf
+    with Profile() as prof:
+        assert parse_bytes(p, b"1 2; abc 3 4 5 6;") \
+            == [59, b"abc", 3, 4, 59]
+        with pytest.raises(RuntimeError):
+            with Profile():
+                pass
+    assert number.func is func and number.leaf is leaf
+    assert parse_bytes(p, b"1 2;") == [59]
+
+    stats = prof.stats
+    assert stats["pair"].calls == 4
+    assert stats["pair"].failures == 2
+    assert stats["pair"].bytes == len(b"1 2; ") + len(b"5 6;")
+    assert stats["pair"].backtracked == len(b"3 4 ") + len(b"4 5 ")
+    assert stats["word"].calls == 1 and stats["word"].bytes == 4
+    assert stats["number"].calls == 10 and stats["number"].failures == 0
+    assert [name for name, _ in prof.sorted("calls")][0] == "number"
+
+    report = prof.report()
+    assert report.splitlines()[0].split()[:3] == ["name", "calls", "failures"]
+    lines = prof.collapsed().splitlines()
+    assert "pair;number" in [line.split()[0] for line in lines]
+    assert all(int(line.split()[1]) >= 0 for line in lines)
+
+
+def test_profile_openfoam():
+    pytest.importorskip("numpy")
+    from pathlib import Path
+    from byteparsing.openfoam import foam_file
+
+    data = (Path(".") / "tests" / "data" / "ascii_scalar").read_bytes()
+    with Profile() as prof:
+        parse_bytes(foam_file, data)
+    assert prof.stats["preamble"].calls == 1
+    assert prof.stats["key_value_pair"].calls > 1
+
+
+def test_profile_compiled():
+    number = named(tokenize(integer), "number")
+    pair = named(sequence(number, number, tokenize(char(';'))), "pair")
+    p = sequence(pair, many(choice(pair, number)))
+    with Profile() as expected:
+        parse_bytes(p, b"1 2; 3 4; 5")
+    compiled = p.compile()
+    with Profile() as prof:
+        assert parse_bytes(compiled, b"1 2; 3 4; 5") == [59, 5]
+    for name in ["pair", "number"]:
+        assert prof.stats[name].calls == expected.stats[name].calls
+        assert prof.stats[name].failures == expected.stats[name].failures
+
+    pytest.importorskip("numpy")
+    from pathlib import Path
+    from byteparsing.openfoam import foam_file
+
+    data = (Path(".") / "tests" / "data" / "ascii_scalar").read_bytes()
+    compiled = foam_file.compile()
+    with Profile() as prof:
+        parse_bytes(compiled, data)
+    assert prof.stats["preamble"].calls == 1
+    assert prof.stats["key_value_pair"].calls > 1
@@ -0,0 +1,40 @@
+import pytest
+
+from byteparsing.stack import Stack
+from byteparsing.parsers import (
+    parse_bytes, sequence, push, pop, get_aux, set_aux, with_config,
+    using_config, value, integer, tokenize, many)
+
+
+def test_stack():
+    s = Stack()
+    assert len(s) == 0 and not s
+    with pytest.raises(IndexError):
+        s.pop()
+    with pytest.raises(IndexError):
+        s[-1]
+
+    t = s.push(1).push(2).push(3)
+    assert len(t) == 3
+    assert t[-1] == 3 and t[0] == 1 and t[1] == 2
+    assert list(t) == [1, 2, 3]
+    assert t.pop() == [1, 2]
+    assert t[:-1] is t.pop()
+    assert t[1:] == Stack([2, 3])
+    assert t + [4, 5] == Stack([1, 2, 3, 4, 5])
+    # persistence
+    assert list(t.pop().push(4)) == [1, 2, 4]
+    assert list(t) == [1, 2, 3]
+
+
+def test_aux_stack():
+    assert isinstance(parse_bytes(get_aux(), b""), Stack)
+    p = sequence(set_aux([1, 2]), push(3), pop() >> push, get_aux())
+    assert parse_bytes(p, b"") == [1, 2, 3]
+
+    @using_config
+    def numbers(config):
+        return many(tokenize(integer)) >> (
+            lambda x: value(config["scale"] * sum(x)))
+
+    assert parse_bytes(with_config(numbers(), scale=2), b"1 2 3") == 12
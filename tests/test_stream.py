@@ -0,0 +1,141 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from byteparsing.failure import Failure
+from byteparsing.parsers import (
+    parse_bytes, many, keep_left, tokenize, integer, quoted_string, sequence,
+    choice, text_literal)
+from byteparsing.stream import parse_io, commit
+from byteparsing.trampoline import parser
+
+
+def test_parse_io():
+    data = b'"hello" 1 2 3 "a long string that spans many chunks"'
+    p = many(tokenize(choice(integer, quoted_string())))
+    for chunk_size in (1, 3, 1024):
+        assert parse_io(p, io.BytesIO(data), chunk_size=chunk_size,
+                        lookahead=2) == parse_bytes(p, data)
+
+    # a regex that matches up to the end of the buffer reads on
+    assert parse_io(integer, io.BytesIO(b"1234567890"), chunk_size=2,
+                    lookahead=1) == 1234567890
+
+    # a regex that misses because the buffer ends too soon reads on as well
+    assert parse_io(many(tokenize(integer)), io.BytesIO(b"0 2 -2 0 0"),
+                    chunk_size=1) == [0, 2, -2, 0, 0]
+
+
+def test_commit():
+    n = 10000
+    data = b"".join(b"%d\n" % i for i in range(n))
+    sizes = []
+
+    @parser
+    def probe(c, a):
+        sizes.append(len(c.stream.buffer))
+        return None, c, a
+
+    record = keep_left(tokenize(integer), commit, probe)
+    assert parse_io(many(record), io.BytesIO(data), chunk_size=64) \
+        == list(range(n))
+    assert max(sizes) <= 3 * 64
+
+    # commit does nothing on a normal cursor
+    record = keep_left(tokenize(integer), commit)
+    assert parse_bytes(many(record), b"1 2 3") == [1, 2, 3]
+
+
+def test_backtrack_past_commit():
+    p = choice(sequence(text_literal("a"), commit, text_literal("b")),
+               text_literal("ac"))
+    with pytest.raises(Failure):
+        parse_io(p, io.BytesIO(b"ac"), chunk_size=1)
+    assert parse_bytes(p, b"ac") == b"ac"
+
+
+def test_openfoam_stream():
+    np = pytest.importorskip("numpy")
+    from byteparsing.openfoam import foam_file
+
+    digits = b"FoamFile\n{\n    format ascii;\n}\n" \
+        b"internalField nonuniform List<scalar> 4 (1 2 3 4);\n"
+    inputs = [(Path(".") / "tests" / "data" / name).read_bytes()
+              for name in ["ascii_vector", "binary_vector"]] + [digits]
+    for data in inputs:
+        with io.BytesIO(data) as f:
+            x = parse_io(foam_file, f, chunk_size=100, lookahead=16)
+        expected = parse_bytes(foam_file, data)
+        np.testing.assert_equal(x, expected)
+        with io.BytesIO(data) as f:
+            np.testing.assert_equal(
+                parse_io(foam_file, f, chunk_size=1), expected)
+        field = x["data"]["internalField"]
+        field = field["data"] if isinstance(field, dict) else field
+        assert isinstance(field, np.ndarray)
+
+    with io.BytesIO(digits) as f:
+        x = parse_io(foam_file, f, chunk_size=100, lookahead=16)
+    np.testing.assert_array_equal(
+        x["data"]["internalField"]["data"], [1.0, 2.0, 3.0, 4.0])
+
+
+def test_parse_stream():
+    import asyncio
+    from byteparsing.stream import parse_stream
+
+    np = pytest.importorskip("numpy")
+    from byteparsing.array import array
+
+    values = np.arange(1000, dtype=float)
+    data = b"1 2 3 " + values.tobytes() + b" 4"
+    p = sequence(
+        many(tokenize(integer)),
+        keep_left(array(np.dtype(float), 1000), tokenize(text_literal(" "))),
+        many(tokenize(integer)))
+    expected = parse_bytes(p, data)
+    assert expected == [4]
+
+    async def main():
+        reader = asyncio.StreamReader()
+        task = asyncio.ensure_future(parse_stream(p, reader, chunk_size=64))
+        head = data[:-1]
+        for i in range(0, len(head), 100):
+            reader.feed_data(head[i:i+100])
+            await asyncio.sleep(0.001)
+        assert not task.done()
+        reader.feed_data(data[-1:])
+        reader.feed_eof()
+        return await task
+
+    assert asyncio.run(main()) == expected
+
+
+def test_parse_stream_threads():
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from byteparsing.stream import parse_stream
+
+    p = many(tokenize(integer))
+
+    async def main():
+        # an idle stream doesn't hold up the default executor
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+        idle, busy = asyncio.StreamReader(), asyncio.StreamReader()
+        first = asyncio.ensure_future(parse_stream(p, idle))
+        busy.feed_data(b"1 2 3")
+        busy.feed_eof()
+        second = await asyncio.wait_for(parse_stream(p, busy), 5)
+        idle.feed_data(b"4")
+        idle.feed_eof()
+
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"5 6")
+        reader.feed_eof()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            third = await parse_stream(p, reader, executor=executor)
+        return await first, second, third
+
+    assert asyncio.run(main()) == ([4], [1, 2, 3], [5, 6])
@@ -38,3 +38,57 @@ def test_choice():
     assert isinstance(x, tuple)
     assert x[0] == c.at
     assert x[1] == c.increment()
+
+
+def test_frame():
+    from byteparsing.trampoline import Frame
+    from byteparsing.failure import Failure
+
+    c = Cursor.from_bytes(b"ab")
+    f = Frame(item(c, None), lambda x, c, a: (chr(x), c, a))
+    assert f.invoke()[0] == "a"
+    assert f()[0] == "a"
+
+    g = Frame(char('x')(c, None), None, lambda failure: ("failed", c, None))
+    assert g.invoke()[0] == "failed"
+    assert g()[0] == "failed"
+
+    h = Frame(char('x')(c, None), lambda x, c, a: (x, c, a))
+    with pytest.raises(Failure):
+        h.invoke()
+
+
+def test_deep_nesting():
+    from byteparsing.parsers import sequence, value, flush, parse_bytes
+
+    nested = Parser(None)
+    nested.func = choice(
+        sequence(char('('), nested, char(')')),
+        value(0)).func
+    n = 10000
+    p = sequence(nested, flush(len))
+    assert parse_bytes(p, b"(" * n + b")" * n) == 2 * n
+
+    long = sequence(*(char('a') for _ in range(n)), flush(len))
+    assert parse_bytes(long, b"a" * n) == n
+
+
+def test_returned_failure():
+    from byteparsing.trampoline import parser
+    from byteparsing.parsers import sequence, parse_bytes, many, flush
+    from byteparsing.failure import Failure, Expected, MultipleFailures
+
+    c = Cursor.from_bytes(b"x")
+    assert isinstance(char('a').func(c, None), Expected)
+
+    @parser
+    def never(c, a):
+        return Failure("never")
+
+    assert parse_bytes(choice(never, char('x')), b"x") == ord('x')
+    assert parse_bytes(sequence(many(never), flush()), b"x") == b""
+    with pytest.raises(Failure, match="never"):
+        parse_bytes(sequence(item, never), b"x")
+    with pytest.raises(MultipleFailures) as e:
+        parse_bytes(choice(never, sequence(item, never)), b"x")
+    assert len(e.value.failures) == 2